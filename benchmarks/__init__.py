@@ -0,0 +1 @@
+""" Performance benchmarks. Run each one as a module from project's root directory """
@@ -0,0 +1,76 @@
+""" Benchmark: RuleEngine lines vs aggregate pricing modes on large carts
+Run: 'python -m benchmarks.aggregate_pricing_benchmark' from project's root directory
+Notes:
+    - A single cart holds LINES distinct items spread over CODES item codes, each code having an offer rule
+    - lines mode fetches every cart line, aggregate mode fetches one GROUP BY row per code
+"""
+import asyncio
+import os
+import random
+import time
+
+os.environ.setdefault('DATABASE_ECHO', 'false')
+
+from src.main.application.rule_catalogue import RULE_CATALOGUE  # noqa: E402
+from src.main.application.rules_service import PRICING_MODES, RuleEngine  # noqa: E402
+from src.main.domain.cart_entity import Cart  # noqa: E402
+from src.main.domain.cart_item_entity import CartItem  # noqa: E402
+from src.main.domain.item_entity import Item  # noqa: E402
+from src.main.domain.rule_entity import Rule  # noqa: E402
+from src.main.infrastructure.database.setup import get_async_engine, init_db, shutdown_db  # noqa: E402
+from src.main.infrastructure.database.transaction import Transaction  # noqa: E402
+
+CODES = 100
+REPEAT = 5
+
+
+def build_cart(lines: int) -> None:
+    """ Inserts a cart of the given amount of lines, one per item, and a rule per item code """
+    shutdown_db()
+    init_db()
+    RULE_CATALOGUE.invalidate()
+    with Transaction() as t:
+        t.session.bulk_insert_mappings(Item, [
+            {'id': item_id, 'code': f'C{item_id % CODES}', 'name': 'name', 'price': 100 + item_id % CODES}
+            for item_id in range(1, lines + 1)
+        ])
+        t.session.bulk_insert_mappings(Cart, [{'id': 1}])
+        t.session.bulk_insert_mappings(CartItem, [
+            {'carts_id': 1, 'items_id': item_id, 'quantity': random.randint(1, 5)} for item_id in range(1, lines + 1)
+        ])
+        t.session.bulk_insert_mappings(Rule, [
+            {'item_code': f'C{code}', 'name': f'rule_{code}', 'firing_condition_operator': '>=',
+             'firing_condition_quantity': 3, 'effect_type': 'one_free' if code % 2 else 'update_prices',
+             'effect_percentage': 0.1, 'version': 1}
+            for code in range(0, CODES)
+        ])
+
+
+async def time_modes() -> dict:
+    """ Prices the cart REPEAT times in every mode, returns the best seconds per mode """
+    timings = dict()
+    for mode in PRICING_MODES:
+        engine = RuleEngine(mode=mode)
+        await engine.apply(1)
+        best = None
+        for _ in range(0, REPEAT):
+            start = time.perf_counter()
+            await engine.apply(1)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[mode] = best
+    await get_async_engine().dispose()
+    return timings
+
+
+def main() -> None:
+    """ Prices carts of 10k and 100k lines in every mode and prints the timings """
+    random.seed(0)
+    for lines in (10000, 100000):
+        build_cart(lines)
+        timings = asyncio.run(time_modes())
+        print(' '.join(f'{mode}: {seconds * 1e3:9.2f} ms' for mode, seconds in timings.items()), f'(lines={lines})')
+
+
+if __name__ == '__main__':
+    main()
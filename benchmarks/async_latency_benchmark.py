@@ -0,0 +1,87 @@
+""" Benchmark: latency of light requests while heavy requests are being served by the same worker
+Run: 'python -m benchmarks.async_latency_benchmark' from project's root directory
+Notes:
+    - A single uvicorn worker serves both kinds of request, so blocking database I/O would serialise them
+    - Light requests read one item, heavy requests load and price a cart holding CART_LINES lines
+    - Light latency percentiles are reported idle and under heavy load: with a true async database path light
+      requests interleave with heavy ones instead of queueing behind them. What remains is the CPU bound ORM work
+      (row processing, pricing) of the heavy requests, which still runs on the event loop
+"""
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.backend_throughput_benchmark import BASE_URL, start_server
+
+CART_LINES = 2000
+LIGHT_REQUESTS = 300
+HEAVY_CLIENTS = 8
+LIGHT_PATH = '/items/?limit=1'
+HEAVY_PATHS = ('/carts/id/?cart_id=1', '/rules/apply?cart_id=1')
+
+
+def fill_cart() -> None:
+    """ Adds CART_LINES lines, cycling through the challenge items, to the first cart """
+    session = requests.Session()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(
+            lambda line: session.post(f'{BASE_URL}/items/add_to_cart',
+                                      params={'item_id': line % 3 + 1, 'cart_id': 1}).raise_for_status(),
+            range(0, CART_LINES)))
+
+
+def light_latencies() -> list:
+    """ Fires LIGHT_REQUESTS sequential light requests, returns their latencies in milliseconds """
+    session = requests.Session()
+    latencies = []
+    for _ in range(0, LIGHT_REQUESTS):
+        start = time.perf_counter()
+        session.get(f'{BASE_URL}{LIGHT_PATH}').raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def heavy_load(stop: threading.Event, latencies: list) -> None:
+    """ Keeps firing heavy requests until stopped, recording their latencies in milliseconds """
+    session = requests.Session()
+    while not stop.is_set():
+        for path in HEAVY_PATHS:
+            start = time.perf_counter()
+            session.request('POST' if 'apply' in path else 'GET', f'{BASE_URL}{path}').raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+
+def report(name: str, latencies: list) -> None:
+    """ Prints p50 and p99 of the given latencies """
+    percentiles = statistics.quantiles(latencies, n=100)
+    print(f'{name:28s}: p50 {percentiles[49]:8.2f} ms  p99 {percentiles[98]:8.2f} ms  ({len(latencies)} requests)')
+
+
+def main() -> None:
+    """ Measures light request latency idle and while HEAVY_CLIENTS keep the worker busy """
+    server = start_server('sqlite:///:memory:', 1)
+    try:
+        fill_cart()
+        report('light, idle', light_latencies())
+
+        stop, heavy = threading.Event(), []
+        clients = [threading.Thread(target=heavy_load, args=(stop, heavy)) for _ in range(0, HEAVY_CLIENTS)]
+        for client in clients:
+            client.start()
+        try:
+            report('light, under heavy load', light_latencies())
+        finally:
+            stop.set()
+            for client in clients:
+                client.join()
+        report('heavy', heavy)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+""" Benchmark: REST request throughput across database backends
+Run: 'python -m benchmarks.backend_throughput_benchmark' from project's root directory
+Notes:
+    - Compares in-memory SQLite, file SQLite (WAL) and, when BENCHMARK_POSTGRES_URL is set, PostgreSQL
+    - Set BENCHMARK_WORKERS to run the file based backends with several uvicorn workers
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+PORT = 8765
+BASE_URL = f'http://127.0.0.1:{PORT}'
+REQUESTS = 2000
+CONCURRENCY = 16
+ENDPOINTS = ('/carts/id/?cart_id=1', '/users/?limit=10')
+
+
+def start_server(url: str, workers: int) -> subprocess.Popen:
+    """ Launches the application against the given database URL and waits until it answers """
+    env = dict(os.environ, DATABASE_URL=url, DATABASE_ECHO='false', APP_PORT=str(PORT), APP_WORKERS=str(workers))
+    server = subprocess.Popen([sys.executable, '-m', 'src.main'], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(0, 100):
+        try:
+            requests.get(BASE_URL)
+            return server
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError(f'Server did not start for {url}')
+
+
+def throughput(path: str) -> float:
+    """ Fires REQUESTS requests to the given path from CONCURRENCY threads, returns requests per second """
+    session = requests.Session()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+        start = time.perf_counter()
+        list(executor.map(lambda _: session.get(f'{BASE_URL}{path}').raise_for_status(), range(0, REQUESTS)))
+        return REQUESTS / (time.perf_counter() - start)
+
+
+def main() -> None:
+    """ Measures the throughput of every endpoint on every available backend """
+    workers = int(os.environ.get('BENCHMARK_WORKERS', 1))
+    with tempfile.TemporaryDirectory() as directory:
+        backends = {
+            'sqlite-memory': ('sqlite:///:memory:', 1),
+            'sqlite-file-wal': (f'sqlite:///{os.path.join(directory, "benchmark.db")}', workers),
+        }
+        if 'BENCHMARK_POSTGRES_URL' in os.environ:
+            backends['postgresql'] = (os.environ['BENCHMARK_POSTGRES_URL'], workers)
+
+        for name, (url, backend_workers) in backends.items():
+            server = start_server(url, backend_workers)
+            try:
+                for path in ENDPOINTS:
+                    print(f'{name:16s} workers={backend_workers} {path:24s}: {throughput(path):8.1f} req/s')
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == '__main__':
+    main()
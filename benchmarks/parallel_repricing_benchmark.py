@@ -0,0 +1,41 @@
+""" Benchmark: ParallelRepricer wall time as worker processes grow, from 1 to every CPU
+Run: 'python -m benchmarks.parallel_repricing_benchmark' from project's root directory
+"""
+import asyncio
+import os
+import tempfile
+import time
+
+from src.main.application.parallel_repricing import ParallelRepricer
+from src.main.application.prefill_service import Prefill
+from src.main.application.rules_service import PRICING_AGGREGATE, PRICING_LINES
+from src.main.infrastructure.database.config import DatabaseSettings
+from src.main.infrastructure.database.setup import configure_db, get_async_engine, init_db
+
+CARTS = 20000
+
+
+async def run(carts: int, max_workers: int) -> None:
+    """ Generates carts in a file database and reprices them with 1 up to max_workers processes, in both modes """
+    await Prefill.generate(users=carts // 10, items=200, carts=carts, lines=carts * 8, rules=400, seed=0)
+    for mode in (PRICING_LINES, PRICING_AGGREGATE):
+        baseline = None
+        for workers in range(1, max_workers + 1):
+            start = time.perf_counter()
+            await ParallelRepricer(workers=workers, mode=mode, progress=None).reprice()
+            seconds = time.perf_counter() - start
+            baseline = baseline or seconds
+            print(f'{mode:9s} workers={workers:2d} carts={carts}: {seconds:7.3f} s ({baseline / seconds:4.2f}x)')
+    await get_async_engine().dispose()
+
+
+def main(carts: int = CARTS, max_workers: int = None) -> None:
+    """ Times the repricing of the given carts, against a temporary file database (in-memory ones are per process) """
+    with tempfile.TemporaryDirectory() as directory:
+        configure_db(DatabaseSettings(url=f'sqlite:///{os.path.join(directory, "benchmark.db")}', echo=False))
+        init_db()
+        asyncio.run(run(carts, max_workers or os.cpu_count() or 1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+""" Benchmark: RuleEngine in memory pricing cost as cart lines and rules grow
+Run: 'python -m benchmarks.pricing_scaling_benchmark' from project's root directory
+"""
+import random
+import timeit
+from collections import Counter
+
+from src.main.application.rule_plans import CompiledRule, index_by_item_code
+from src.main.application.rules_service import RuleEngine
+from src.main.domain.rule_entity import Rule
+
+
+def build_cart(units: int, codes: int):
+    """ Builds the (code, price, quantity) lines of a cart holding the given amount of units of the given codes """
+    quantities = Counter(random.randrange(0, codes) for _ in range(0, units))
+    return [(f'C{code}', 100 + code, quantity) for code, quantity in quantities.items()]
+
+
+def build_plans(rules: int):
+    """ Builds and indexes the given amount of compiled rules, one per code """
+    return index_by_item_code(
+        CompiledRule(Rule(item_code=f'C{code}', name=f'rule_{code}', firing_condition_operator='>=',
+                          firing_condition_quantity=3, effect_type='update_prices', effect_percentage=0.1))
+        for code in range(0, rules)
+    )
+
+
+def main(number: int = 20) -> None:
+    """ Prices carts of growing size against growing rule sets and prints the per cart timings """
+    random.seed(0)
+    engine = RuleEngine()
+    for rules in (10, 100, 500):
+        plans_by_code = build_plans(rules)
+        for units in (100, 1000, 10000):
+            lines = build_cart(units, rules)
+            seconds = timeit.timeit(lambda: engine._price(engine._bucket_by_code(lines), plans_by_code),
+                                    number=number)
+            print(f'rules={rules:4d} units={units:6d} lines={len(lines):4d}: {seconds / number * 1e3:8.3f} ms/cart')
+
+
+if __name__ == '__main__':
+    main()
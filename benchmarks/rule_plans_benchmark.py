@@ -0,0 +1,48 @@
+""" Microbenchmark: compiled rule plans vs the former per cart eval() firing evaluation
+Run: 'python -m benchmarks.rule_plans_benchmark' from project's root directory
+"""
+import timeit
+
+from src.main.application.rule_plans import RulePlanCache
+from src.main.domain.item_entity import Item
+from src.main.domain.rule_entity import Rule
+from src.main.infrastructure.database import setup  # noqa: F401 (registers every mapped entity)
+
+RULES = [
+    Rule(id=rule_id, version=1, item_code=f'C{rule_id}', name=f'rule_{rule_id}', firing_condition_operator='>=',
+         firing_condition_quantity=3, effect_type='update_prices', effect_percentage=0.1)
+    for rule_id in range(1, 11)
+]
+ITEMS = [Item(code='C1', name='name', price=100) for _ in range(0, 5)]
+LINES = [(item.price, 1) for item in ITEMS]
+
+
+def eval_path() -> None:
+    """ Former path: build a source string and eval it, then resolve the effect with if/elif dispatch """
+    for rule in RULES:
+        if eval(f'{len(ITEMS)} {rule.firing_condition_operator} {rule.firing_condition_quantity}'):
+            if rule.effect_type == 'update_prices':
+                [item.price - (item.price * rule.effect_percentage) for item in ITEMS]
+
+
+def compiled_path(plans: RulePlanCache) -> None:
+    """ Current path: fetch cached plans and run their predicate and effect """
+    for rule in RULES:
+        plan = plans.get(rule)
+        if plan.fires(len(ITEMS)):
+            plan.resolve(LINES)
+
+
+def main(number: int = 20000) -> None:
+    """ Runs both paths and prints their per call timings """
+    plans = RulePlanCache()
+    eval_seconds = timeit.timeit(eval_path, number=number)
+    compiled_seconds = timeit.timeit(lambda: compiled_path(plans), number=number)
+
+    print(f'eval:     {eval_seconds / number * 1e6:8.2f} us/cart ({len(RULES)} rules)')
+    print(f'compiled: {compiled_seconds / number * 1e6:8.2f} us/cart ({len(RULES)} rules)')
+    print(f'speedup:  {eval_seconds / compiled_seconds:8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
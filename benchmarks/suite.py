@@ -0,0 +1,313 @@
+""" Benchmark suite: pricing engine, serialisation, transactions and REST hot paths
+Run: 'python -m benchmarks.suite' from project's root directory
+Notes:
+    - '--output results.json' stores machine readable results, '--baseline baseline.json' compares against stored ones
+      and exits with status 1 when any workload is slower than the baseline by more than '--threshold'
+    - '--filter apply' only runs the workloads whose name contains 'apply'
+    - Timings are the median and best of REPEAT rounds, in microseconds per operation
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+os.environ.setdefault('DATABASE_ECHO', 'false')
+
+import sqlalchemy  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from src.main.application.columnar_pricing import ColumnarRuleEngine  # noqa: E402
+from src.main.application.prefill_service import Prefill  # noqa: E402
+from src.main.application.priced_cart_cache import PRICED_CARTS, PricedCartCache  # noqa: E402
+from src.main.application.rule_catalogue import RULE_CATALOGUE  # noqa: E402
+from src.main.application.rule_plans import RULE_PLANS  # noqa: E402
+from src.main.application.rules_service import PRICING_MODES, RuleEngine  # noqa: E402
+from src.main.domain import to_dicts  # noqa: E402
+from src.main.domain.cart_entity import Cart  # noqa: E402
+from src.main.domain.cart_item_entity import CartItem  # noqa: E402
+from src.main.domain.item_entity import Item  # noqa: E402
+from src.main.domain.rule_entity import Rule  # noqa: E402
+from src.main.domain.user_entity import User  # noqa: E402
+from src.main.infrastructure.database.setup import get_async_engine, init_db, shutdown_db  # noqa: E402
+from src.main.infrastructure.database.transaction import AsyncTransaction, Transaction  # noqa: E402
+from src.main.infrastructure.logging.logger import LoggingSettings, configure_logging  # noqa: E402
+from src.main.presentation.rest.setup import app  # noqa: E402
+
+REPEAT = 5
+DEFAULT_THRESHOLD = 0.2
+LOOP = asyncio.new_event_loop()
+
+
+class Workload(object):
+    """ A named, timed operation. See "notes" for its lifecycle.
+    Notes:
+        - setup runs once, before timing, and may seed the database
+        - run is timed number times per round, returned coroutines are run to completion on the suite event loop
+    """
+
+    __slots__ = ('name', 'run', 'setup', 'number')
+
+    def __init__(self, name: str, run: Callable, setup: Callable[[], None] = None, number: int = 100):
+        """
+        Initializer
+        Args:
+            name: Unique workload name, '/' separated from the general to the particular
+            run: Timed operation, a function with no arguments (which may return a coroutine)
+            setup: Untimed preparation
+            number: Operations per round
+        """
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.number = number
+
+    def measure(self) -> Dict[str, float]:
+        """
+        Runs the workload REPEAT rounds
+        Returns: dict with the median and best microseconds per operation, and the operations per round
+
+        """
+        if self.setup is not None:
+            self.setup()
+
+        def run():
+            result = self.run()
+            if asyncio.iscoroutine(result):
+                LOOP.run_until_complete(result)
+
+        run()
+        rounds = []
+        for _ in range(0, REPEAT):
+            start = time.perf_counter()
+            for _ in range(0, self.number):
+                run()
+            rounds.append((time.perf_counter() - start) / self.number * 1e6)
+
+        return {'median_us': statistics.median(rounds), 'min_us': min(rounds), 'number': self.number}
+
+
+def reset_db() -> None:
+    """ Recreates an empty database, dropping every cache built against the previous one """
+    LOOP.run_until_complete(get_async_engine().dispose())
+    shutdown_db()
+    init_db()
+    RULE_PLANS.clear()
+    RULE_CATALOGUE.invalidate()
+    PRICED_CARTS.clear()
+
+
+def seed_cart(lines: int, rules: int, distribution: str) -> None:
+    """
+    Seeds a single cart of the given amount of lines, whose items are spread over 100 codes
+    Args:
+        lines: Number of cart lines (distinct items)
+        rules: Number of offer rules, one per code
+        distribution: 'uniform' spreads items evenly over codes, 'skewed' piles them on a few codes (Zipf like)
+
+    Returns: None
+
+    """
+    reset_db()
+    rng = random.Random(0)
+    codes = [f'C{code}' for code in range(0, 100)]
+    weights = [1.0] * len(codes) if distribution == 'uniform' else [1.0 / (rank + 1) ** 2 for rank in range(0, 100)]
+    with Transaction() as t:
+        t.session.bulk_insert_mappings(User, [{'id': 1, 'name': 'name', 'fullname': 'full', 'nickname': 'nick'}])
+        t.session.bulk_insert_mappings(Cart, [{'id': 1, 'user_id': 1, 'total_price': 0}])
+        t.session.bulk_insert_mappings(Item, [
+            {'id': item_id, 'code': code, 'name': 'name', 'price': rng.randint(100, 2000)}
+            for item_id, code in enumerate(rng.choices(codes, weights, k=lines), start=1)
+        ])
+        t.session.bulk_insert_mappings(CartItem, [
+            {'carts_id': 1, 'items_id': item_id, 'quantity': rng.randint(1, 5)} for item_id in range(1, lines + 1)
+        ])
+        t.session.bulk_insert_mappings(Rule, [
+            {'item_code': codes[rule % len(codes)], 'name': f'rule_{rule}', 'firing_condition_operator': '>=',
+             'firing_condition_quantity': 3, 'effect_type': ('update_prices', 'one_free')[rule % 2],
+             'effect_percentage': 0.1, 'version': 1}
+            for rule in range(0, rules)
+        ])
+
+
+def apply_workloads() -> List[Workload]:
+    """ RuleEngine.apply across pricing modes, cart sizes, rule counts and code distributions, uncached """
+    workloads = []
+    for mode in PRICING_MODES:
+        engine = RuleEngine(mode=mode, priced_carts=PricedCartCache(maxsize=0))
+        for lines in (10, 100, 1000):
+            for rules in (3, 100):
+                for distribution in ('uniform', 'skewed'):
+                    workloads.append(Workload(
+                        f'apply/{mode}/lines={lines}/rules={rules}/{distribution}',
+                        lambda engine=engine: engine.apply(1),
+                        lambda lines=lines, rules=rules, distribution=distribution: seed_cart(lines, rules,
+                                                                                             distribution),
+                        number=20 if lines == 1000 else 100,
+                    ))
+
+    cached_engine = RuleEngine()
+    workloads.append(Workload('apply/cached/lines=1000', lambda: cached_engine.apply(1),
+                              lambda: seed_cart(1000, 100, 'uniform')))
+    return workloads
+
+
+def bulk_workloads() -> List[Workload]:
+    """ Repricing of 10000 generated carts (100000 lines, 300 rules): RuleEngine.apply_many and ColumnarRuleEngine """
+    def seed():
+        reset_db()
+        LOOP.run_until_complete(Prefill.generate(users=1000, items=1000, carts=10000, lines=100000, rules=300,
+                                                 seed=0))
+
+    workloads = []
+    for mode in PRICING_MODES:
+        engine = RuleEngine(mode=mode)
+        columnar_engine = ColumnarRuleEngine(mode=mode)
+        workloads.append(Workload(f'bulk/apply_many/{mode}/carts=10000',
+                                  lambda engine=engine: engine.apply_many(range(1, 10001)), seed, number=1))
+        workloads.append(Workload(f'bulk/columnar/{mode}/carts=10000',
+                                  lambda engine=columnar_engine: engine.price_carts(range(1, 10001)), seed, number=1))
+    return workloads
+
+
+def to_dict_workloads() -> List[Workload]:
+    """ Entity.to_dict and to_dicts serialisation of loaded entities """
+    items = [Item(id=item_id, code='C1', name='name', price=100) for item_id in range(0, 1000)]
+    return [
+        Workload('to_dict/items=1000', lambda: [item.to_dict() for item in items], number=20),
+        Workload('to_dicts/items=1000', lambda: to_dicts(items), number=20),
+    ]
+
+
+def transaction_workloads() -> List[Workload]:
+    """ Transaction and AsyncTransaction open/commit overhead, with no statement inside """
+    def sync_transaction():
+        with Transaction():
+            pass
+
+    async def async_transaction():
+        async with AsyncTransaction():
+            pass
+
+    return [
+        Workload('transaction/sync', sync_transaction, reset_db, number=1000),
+        Workload('transaction/async', async_transaction, reset_db, number=1000),
+    ]
+
+
+def rest_workloads() -> List[Workload]:
+    """ End to end requests through FastAPI's TestClient, on a cart of 100 lines (and 100 items to list) """
+    client = TestClient(app)
+
+    def get_cart():
+        client.get('/carts/id/', params={'cart_id': 1}).raise_for_status()
+
+    def get_items():
+        client.get('/items/', params={'limit': 100}).raise_for_status()
+
+    def post_apply():
+        client.post('/rules/apply', params={'cart_id': 1}).raise_for_status()
+
+    def seed():
+        seed_cart(100, 100, 'uniform')
+
+    return [
+        Workload('rest/carts/id', get_cart, seed),
+        Workload('rest/rules/apply', post_apply, seed),
+        Workload('rest/items', get_items, seed),
+    ]
+
+
+WORKLOADS: Dict[str, Callable[[], List[Workload]]] = {
+    'apply': apply_workloads,
+    'bulk': bulk_workloads,
+    'to_dict': to_dict_workloads,
+    'transaction': transaction_workloads,
+    'rest': rest_workloads,
+}
+
+
+def run(name_filter: str = None) -> Dict:
+    """
+    Runs every workload (whose name contains name_filter, if given)
+    Args:
+        name_filter: Substring workload names must contain
+
+    Returns: dict with the environment (meta) and the results of every workload by name
+
+    """
+    results = dict()
+    for build in WORKLOADS.values():
+        for workload in build():
+            if name_filter is None or name_filter in workload.name:
+                results[workload.name] = workload.measure()
+                print(f'{workload.name:48s} {results[workload.name]["median_us"]:12.1f} us/op', flush=True)
+
+    meta = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'sqlalchemy': sqlalchemy.__version__,
+        'platform': platform.platform(),
+        'repeat': REPEAT,
+    }
+    return {'meta': meta, 'results': results}
+
+
+def compare(results: Dict, baseline: Dict, threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """
+    Compares results against a baseline
+    Args:
+        results: Current results (see run)
+        baseline: Stored results (see run)
+        threshold: Allowed slowdown ratio (0.2 means 20% slower) before flagging a regression
+
+    Returns: List of regressed workload names, workloads missing from either side are ignored
+
+    """
+    regressions = []
+    for name, current in results['results'].items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            continue
+
+        ratio = current['median_us'] / previous['median_us']
+        flag = 'REGRESSION' if ratio > 1 + threshold else ''
+        print(f'{name:48s} {previous["median_us"]:12.1f} -> {current["median_us"]:12.1f} us/op ({ratio:5.2f}x) {flag}')
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    """ Runs the suite, stores and compares its results as requested. Returns the process exit status """
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite')
+    parser.add_argument('--output', help='Path where the JSON results are written')
+    parser.add_argument('--baseline', help='Path of stored JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='Allowed slowdown ratio')
+    parser.add_argument('--filter', dest='name_filter', help='Only run workloads whose name contains this')
+    args = parser.parse_args(argv)
+
+    # Per statement and per transaction logging would dominate the timings
+    configure_logging(LoggingSettings(level='WARNING'))
+    results = run(args.name_filter)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(results, json.load(baseline), args.threshold)
+        if regressions:
+            print(f'{len(regressions)} regression(s) over {args.threshold:.0%}: {", ".join(regressions)}')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,13 @@
 """ Use case: CRUD operations for the Cart Entity """
-from sqlalchemy.orm import Query
+from typing import AsyncIterator, Callable
+from sqlalchemy import select
+from sqlalchemy.engine import Result, ScalarResult
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql import Select
 from ..domain.cart_entity import Cart
-from ..infrastructure.database.transaction import Transaction
+from ..domain.cart_item_entity import CartItem
+from ..infrastructure.database.pagination import keyset
+from ..infrastructure.database.transaction import AsyncTransaction, fetch_rows, stream_scalars
 
 
 class CartService(object):
@@ -16,36 +22,84 @@ class CartService(object):
         Returns: None
 
         """
-        with Transaction() as t:
+        async with AsyncTransaction() as t:
             t.session.add(Cart(user_id=user_id))
 
-    async def read_cart(self, filter_params: dict = None) -> Query:
+    async def read_cart(self, filter_params: dict = None, loader: Callable = selectinload) -> ScalarResult:
         """
         Finds a cart at the database according to the provided filters
         Args:
             filter_params: dict
+            loader: SQL Alchemy loader strategy (selectinload, joinedload...) for the cart items and their item.
+                None to leave them unloaded
 
-        Returns: SQL Alchemy Query instance
+        Returns: SQL Alchemy ScalarResult instance
 
         """
-        with Transaction() as t:
-            return t.session.query(Cart).filter_by(**filter_params)
+        async with AsyncTransaction() as t:
+            result = await t.session.execute(self._load_items(select(Cart), loader).filter_by(**filter_params))
+            return result.unique().scalars()
 
-    async def read_carts(self) -> Query:
+    async def read_carts(self, loader: Callable = None, after: int = None, limit: int = None) -> ScalarResult:
         """
-        Retrieves all carts from the database
-        Returns: SQL Alchemy Query instance
+        Retrieves carts from the database sorted by id, paginated by id if requested
+        Args:
+            loader: SQL Alchemy loader strategy (selectinload, joinedload...) for the cart items and their item.
+                None (default) to leave them unloaded
+            after: Only carts whose id is greater than this one are retrieved
+            limit: Maximum number of carts to retrieve, None (default) to retrieve all of them
+
+        Returns: SQL Alchemy ScalarResult instance
+
+        """
+        async with AsyncTransaction() as t:
+            result = await t.session.execute(keyset(self._load_items(select(Cart), loader), Cart.id, after, limit))
+            return result.unique().scalars()
+
+    async def read_cart_rows(self, after: int = None, limit: int = None) -> Result:
+        """
+        Retrieves the columns of carts from the database sorted by id, as plain rows (see read_carts)
+        Args:
+            after: Only carts whose id is greater than this one are retrieved
+            limit: Maximum number of carts to retrieve, None (default) to retrieve all of them
+
+        Returns: SQL Alchemy Result instance of (id, total_price, user_id) rows
+
+        """
+        return await fetch_rows(keyset(select(*Cart.__table__.columns), Cart.id, after, limit))
+
+    def stream_carts(self, after: int = None) -> AsyncIterator[Cart]:
+        """
+        Streams carts from the database sorted by id, fetching them in batches
+        Args:
+            after: Only carts whose id is greater than this one are streamed
+
+        Returns: Asynchronous iterator of Cart Entities
+
+        """
+        return stream_scalars(keyset(select(Cart), Cart.id, after))
+
+    @staticmethod
+    def _load_items(statement: Select, loader: Callable = None) -> Select:
+        """
+        Applies the given loader strategy to the cart items and their item, avoiding a query per cart line
+        Args:
+            statement: Cart select statement
+            loader: SQL Alchemy loader strategy, None to leave them unloaded
+
+        Returns: SQL Alchemy Select instance
 
         """
-        with Transaction() as t:
-            return t.session.query(Cart)
+        if loader is None:
+            return statement
+        return statement.options(loader(Cart.items).options(loader(CartItem.item)))
 
     def update_cart(self, cart_id: int, total_price: int = 0) -> None:
         """
         Updates an existing cart by id
         Args:
             cart_id: Existing cart's id
-            total_price: Cart's total price
+            total_price: Cart's total price, in cents
 
         Returns: None
 
@@ -0,0 +1,242 @@
+""" Use Case: price many carts at once from columnar (NumPy) cart lines, for catalogue wide promo simulations """
+from collections import Counter
+from itertools import chain
+from typing import AsyncIterator, Iterable, List, Mapping, NamedTuple, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..domain.cart_entity import Cart
+from ..domain.cart_item_entity import CartItem
+from ..domain.item_entity import Item
+from .rule_catalogue import RULE_CATALOGUE, RuleCatalogue
+from .rule_plans import CompiledRule
+from .rules_service import PRICING_AGGREGATE, PRICING_LINES, PRICING_MODES
+from ..infrastructure.database.transaction import AsyncTransaction
+
+COLUMNAR_CHUNK_SIZE = 100000
+# Maximum number of ids per IN lookup, well below the bound parameters limit of every backend
+LOOKUP_CHUNK_SIZE = 500
+
+
+class CartLines(NamedTuple):
+    """ Cart lines of some carts as columns, one element per line in line (insertion) order. See "notes".
+    Notes:
+        - cart_ids holds the ids of the carts being priced, sorted. Carts holding no line are priced at 0
+        - cart is the position in cart_ids of the cart of every line, code the position in codes of its item code
+        - quantity and price (cents) are the line units and unit price
+    """
+    cart_ids: np.ndarray
+    cart: np.ndarray
+    code: np.ndarray
+    quantity: np.ndarray
+    price: np.ndarray
+    codes: List[str]
+
+
+class ColumnarRuleEngine(object):
+    """ Columnar Rules Engine. Prices carts like RuleEngine, a whole chunk of carts per NumPy operation. See "notes".
+    Notes:
+        - Lines are grouped by (cart, item code) with a stable sort and np.add.reduceat: quantity, subtotal and the
+          price of the unit one_free effects make free (the last line one in lines mode, the cheapest one in
+          aggregate mode)
+        - Every compiled rule is fired on the groups of its item code at once: firing operators, effects and
+          rounding policies work on integer arrays as they do on ints, so totals match RuleEngine to the cent
+        - Group totals are summed per cart with np.add.at on int64 cents, so cart totals are exact
+        - Prices are int64 cents: a discounted subtotal must stay below 2 ** 63 / money.RATE_SCALE cents (about
+          92 million in currency units)
+        - Nothing is written, totals are returned
+    """
+
+    def __init__(self, catalogue: RuleCatalogue = None, mode: str = PRICING_LINES):
+        """
+        Initializer
+        Args:
+            catalogue: Rules catalogue cache, shared by every engine by default
+            mode: Pricing mode, one of PRICING_MODES (see RuleEngine)
+        Notes:
+             Injectable catalogue to aid Inversion of Control (IoC)
+        """
+        if mode not in PRICING_MODES:
+            raise RuntimeError(f'Unknown pricing mode: {mode}')
+
+        self.catalogue = catalogue if catalogue is not None else RULE_CATALOGUE
+        self.mode = mode
+
+    async def price_carts(self, cart_ids: Iterable[int] = None,
+                          chunk_size: int = COLUMNAR_CHUNK_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Computes the final price of many carts, within a single transaction (a consistent snapshot)
+        Args:
+            cart_ids: Carts' IDs, every cart by default. Non existent carts are skipped
+            chunk_size: Number of carts whose lines are loaded (and held in memory) at once
+
+        Returns: Tuple of arrays: the priced cart ids (sorted) and their total prices in cents
+
+        """
+        async with AsyncTransaction() as t:
+            plans_by_code = await self.catalogue.get_async(t.session)
+            priced_ids, totals = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+            async for lines in self.stream_lines(t.session, cart_ids, chunk_size):
+                priced_ids.append(lines.cart_ids)
+                totals.append(self.price(lines, plans_by_code))
+
+        return np.concatenate(priced_ids), np.concatenate(totals)
+
+    async def stream_lines(self, session: AsyncSession, cart_ids: Iterable[int] = None,
+                           chunk_size: int = COLUMNAR_CHUNK_SIZE) -> AsyncIterator[CartLines]:
+        """
+        Fetches the lines of many carts as columns, a chunk of carts at a time
+        Args:
+            session: SQL Alchemy AsyncSession instance
+            cart_ids: Carts' IDs, every cart by default. Non existent carts are skipped
+            chunk_size: Number of carts whose lines are loaded (and held in memory) at once
+
+        Returns: Async iterator of CartLines, one per chunk of existing carts in id order
+
+        """
+        existing_ids = await self._existing_cart_ids(session, cart_ids)
+        for start in range(0, len(existing_ids), chunk_size):
+            yield await self.load(session, existing_ids[start:start + chunk_size])
+
+    async def load(self, session: AsyncSession, cart_ids: np.ndarray) -> CartLines:
+        """
+        Fetches the lines of the given carts as columns
+        Args:
+            session: SQL Alchemy AsyncSession instance
+            cart_ids: Carts' IDs, sorted
+
+        Notes:
+            - Lines are selected by cart id, in chunks of LOOKUP_CHUNK_SIZE, so only the requested carts lines are read
+            - Only integer columns are selected per line, item codes are fetched once per distinct item (by id, in
+              chunks of LOOKUP_CHUNK_SIZE)
+
+        Returns: CartLines
+
+        """
+        if not len(cart_ids):
+            empty = np.zeros(0, dtype=np.int64)
+            return CartLines(cart_ids=cart_ids, cart=empty, code=empty, quantity=empty, price=empty, codes=[])
+
+        connection = await session.connection()
+        rows = list()
+        for start in range(0, len(cart_ids), LOOKUP_CHUNK_SIZE):
+            rows.extend((await connection.execute(
+                select(CartItem.carts_id, CartItem.items_id, Item.price, CartItem.quantity)
+                .join(Item, CartItem.items_id == Item.id)
+                .filter(CartItem.carts_id.in_(cart_ids[start:start + LOOKUP_CHUNK_SIZE].tolist()))
+                .order_by(CartItem.id)
+            )).all())
+        line_cart, line_item, price, quantity = np.fromiter(chain.from_iterable(rows), dtype=np.int64,
+                                                            count=4 * len(rows)).reshape(-1, 4).T
+
+        item_ids = np.unique(line_item)
+        item_codes = dict()
+        for start in range(0, len(item_ids), LOOKUP_CHUNK_SIZE):
+            item_codes.update((await connection.execute(
+                select(Item.id, Item.code).filter(Item.id.in_(item_ids[start:start + LOOKUP_CHUNK_SIZE].tolist()))
+            )).all())
+        codes = dict()
+        code_by_item = np.fromiter((codes.setdefault(item_codes[item_id], len(codes)) for item_id in item_ids.tolist()),
+                                   dtype=np.int64, count=len(item_ids))
+        code = code_by_item[np.searchsorted(item_ids, line_item)]
+
+        return CartLines(cart_ids=cart_ids, cart=np.searchsorted(cart_ids, line_cart), code=code,
+                         quantity=quantity, price=price, codes=list(codes))
+
+    def price(self, lines: CartLines, plans_by_code: Mapping[str, Sequence[CompiledRule]],
+              firings: Counter = None) -> np.ndarray:
+        """
+        Computes the final price of every cart of the given lines, firing every applicable rule
+        Args:
+            lines: Columnar cart lines
+            plans_by_code: Compiled rules indexed by item code (see RuleCatalogue)
+            firings: Counter of the carts every compiled rule fires on, updated when given
+
+        Returns: Array of total prices in cents, aligned with lines.cart_ids
+
+        """
+        if not len(lines.cart):
+            return np.zeros(len(lines.cart_ids), dtype=np.int64)
+
+        key = lines.cart * len(lines.codes) + lines.code
+        order = np.argsort(key, kind='stable')
+        key = key[order]
+        starts = np.flatnonzero(np.concatenate(([True], key[1:] != key[:-1])))
+
+        price = lines.price[order]
+        quantity = np.add.reduceat(lines.quantity[order], starts)
+        subtotal = np.add.reduceat(price * lines.quantity[order], starts)
+        if self.mode == PRICING_AGGREGATE:
+            unit_price = np.minimum.reduceat(price, starts)
+        else:
+            unit_price = price[np.append(starts[1:], len(key)) - 1]
+
+        group_cart, group_code = np.divmod(key[starts], len(lines.codes))
+        total = self._fire(group_code, quantity, subtotal, unit_price, lines.codes, plans_by_code, firings)
+        cart_totals = np.zeros(len(lines.cart_ids), dtype=np.int64)
+        np.add.at(cart_totals, group_cart, total)
+        return cart_totals
+
+    @staticmethod
+    def _fire(group_code: np.ndarray, quantity: np.ndarray, subtotal: np.ndarray, unit_price: np.ndarray,
+              codes: List[str], plans_by_code: Mapping[str, Sequence[CompiledRule]],
+              firings: Counter = None) -> np.ndarray:
+        """
+        Computes the contribution of every (cart, item code) group to its cart total price (see RuleEngine._price_code)
+        Args:
+            group_code: Position in codes of the item code of every group
+            quantity: Number of units of every group
+            subtotal: Sum of the base prices of every unit of every group
+            unit_price: Price of the unit made free by one_free effects, for every group
+            codes: Item codes
+            plans_by_code: Compiled rules indexed by item code (see RuleCatalogue)
+            firings: Counter of the groups (carts) every compiled rule fires on, updated when given
+
+        Returns: Array of contributions in cents, one per group
+
+        """
+        total = subtotal.copy()
+        by_code = np.argsort(group_code, kind='stable')
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(group_code, minlength=len(codes)))))
+        for code_index, code in enumerate(codes):
+            plans = plans_by_code.get(code, ())
+            if not plans:
+                continue
+
+            groups = by_code[bounds[code_index]:bounds[code_index + 1]]
+            fired_total = np.zeros(len(groups), dtype=np.int64)
+            fired_any = np.zeros(len(groups), dtype=bool)
+            for plan in plans:
+                fired = plan.fires(quantity[groups])
+                if firings is not None:
+                    firings[plan] += int(np.count_nonzero(fired))
+                if fired.any():
+                    fired_total += np.where(fired, plan.resolve_aggregate(subtotal[groups], unit_price[groups]), 0)
+                    fired_any |= fired
+            total[groups] = np.where(fired_any, fired_total, subtotal[groups])
+
+        return total
+
+    @staticmethod
+    async def _existing_cart_ids(session: AsyncSession, cart_ids: Iterable[int] = None) -> np.ndarray:
+        """
+        Retrieves the ids of the existing carts among the given ones
+        Args:
+            session: SQL Alchemy AsyncSession instance
+            cart_ids: Carts' IDs, every cart by default. Looked up by id, in chunks of LOOKUP_CHUNK_SIZE
+
+        Returns: Array of cart ids, sorted and unique
+
+        """
+        if cart_ids is None:
+            return np.array((await session.execute(select(Cart.id).order_by(Cart.id))).scalars().all(), dtype=np.int64)
+
+        requested = np.unique(np.fromiter(cart_ids, dtype=np.int64))
+        existing = list()
+        for start in range(0, len(requested), LOOKUP_CHUNK_SIZE):
+            existing.extend((await session.execute(
+                select(Cart.id).filter(Cart.id.in_(requested[start:start + LOOKUP_CHUNK_SIZE].tolist()))
+            )).scalars().all())
+        return np.unique(np.array(existing, dtype=np.int64))
@@ -1,26 +1,40 @@
 """ Use case: CRUD operations for the Item Entity """
+from typing import AsyncIterator
+from sqlalchemy import delete, literal, select, update
+from sqlalchemy.engine import Result, ScalarResult
 from sqlalchemy.orm import Query
 from ..domain.cart_item_entity import CartItem
 from ..domain.cart_entity import Cart
 from ..domain.item_entity import Item
-from ..infrastructure.database.transaction import Transaction
+from .rules_service import RuleEngine
+from ..infrastructure.database.pagination import keyset
+from ..infrastructure.database.upsert import insert_on_conflict
+from ..infrastructure.database.transaction import AsyncTransaction, Transaction, fetch_rows, stream_scalars
 
 
 class ItemService(object):
     """ Item Service class """
 
-    async def create_item(self, code: str, name: str, price: float) -> None:
+    def __init__(self, engine: RuleEngine = None):
+        """
+        Initializer
+        Args:
+            engine: Rules engine keeping cart total prices current, injectable to aid Inversion of Control (IoC)
+        """
+        self.engine = engine if engine is not None else RuleEngine()
+
+    async def create_item(self, code: str, name: str, price: int) -> None:
         """
         Creates a new item and inserts it to the database
         Args:
             name: item's name
             code: item's code
-            price: item's price
+            price: item's price, in cents
 
         Returns: None
 
         """
-        with Transaction() as t:
+        async with AsyncTransaction() as t:
             t.session.add(Item(code=code, name=name, price=price))
 
     def read_item(self, filter_params: dict = None) -> Query:
@@ -35,14 +49,41 @@ class ItemService(object):
         with Transaction() as t:
             return t.session.query(Item).filter_by(**filter_params)
 
-    async def read_items(self) -> Query:
+    async def read_items(self, after: int = None, limit: int = None) -> ScalarResult:
         """
-        Retrieves all items from the database
-        Returns: SQL Alchemy Query instance
+        Retrieves items from the database sorted by id, paginated by id if requested
+        Args:
+            after: Only items whose id is greater than this one are retrieved
+            limit: Maximum number of items to retrieve, None (default) to retrieve all of them
+
+        Returns: SQL Alchemy ScalarResult instance
 
         """
-        with Transaction() as t:
-            return t.session.query(Item)
+        async with AsyncTransaction() as t:
+            return (await t.session.execute(keyset(select(Item), Item.id, after, limit))).scalars()
+
+    async def read_item_rows(self, after: int = None, limit: int = None) -> Result:
+        """
+        Retrieves the columns of items from the database sorted by id, as plain rows (see read_items)
+        Args:
+            after: Only items whose id is greater than this one are retrieved
+            limit: Maximum number of items to retrieve, None (default) to retrieve all of them
+
+        Returns: SQL Alchemy Result instance of (id, code, name, price) rows
+
+        """
+        return await fetch_rows(keyset(select(*Item.__table__.columns), Item.id, after, limit))
+
+    def stream_items(self, after: int = None) -> AsyncIterator[Item]:
+        """
+        Streams items from the database sorted by id, fetching them in batches
+        Args:
+            after: Only items whose id is greater than this one are streamed
+
+        Returns: Asynchronous iterator of Item Entities
+
+        """
+        return stream_scalars(keyset(select(Item), Item.id, after))
 
     def update_item(self, item_id: int, name: str = None, fullname: str = None, nickname: str = None) -> None:
         """
@@ -69,36 +110,80 @@ class ItemService(object):
         """
         raise NotImplementedError
 
-    async def add_to_cart(self, item_id: int, cart_id: int):
+    async def add_to_cart(self, item_id: int, cart_id: int, quantity: int = 1) -> None:
         """
-        Adds an item to a cart
+        Adds an item to a cart, increasing its quantity if the cart already holds it, and reprices the cart
         Args:
             item_id: Item's ID
             cart_id: Cart's ID
+            quantity: Number of units to add
+
+        Notes:
+            - The line is written with a single INSERT ... SELECT ... ON CONFLICT DO UPDATE statement: the SELECT only
+              yields a row when the cart exists, the conflict on (carts_id, items_id) turns it into an increment
+            - The cart total price is kept current incrementally (see RuleEngine.update_code_total)
 
         Returns: None
 
         """
-        with Transaction() as t:
-            cart = t.session.query(Cart).filter_by(id=cart_id).first()
-            item_to_cart = CartItem()
-            item = t.session.query(Item).filter_by(id=item_id).first()
-            item_to_cart.item = item
-            cart.items.append(item_to_cart)
-
-    async def remove_from_cart(self, item_id: int, cart_id: int):
+        if quantity < 1:
+            raise RuntimeError(f'Quantity must be positive, got {quantity}')
+
+        async with AsyncTransaction() as t:
+            item = (await t.session.execute(select(Item.code, Item.price).filter_by(id=item_id))).first()
+            if item is None:
+                raise RuntimeError(f'No Item with id {item_id} was found')
+
+            insert = insert_on_conflict(t.session.bind.dialect.name, CartItem).from_select(
+                ['carts_id', 'items_id', 'quantity'],
+                select(literal(cart_id), literal(item_id), literal(quantity)).where(
+                    select(Cart.id).filter_by(id=cart_id).exists()
+                )
+            )
+            result = await t.session.execute(insert.on_conflict_do_update(
+                index_elements=[CartItem.carts_id, CartItem.items_id],
+                set_={'quantity': CartItem.quantity + insert.excluded.quantity},
+            ))
+
+            if result.rowcount == 0:
+                raise RuntimeError(f'No Cart with id {cart_id} was found')
+
+            await self.engine.update_code_total(t.session, cart_id, item.code, item.price, quantity)
+
+    async def remove_from_cart(self, item_id: int, cart_id: int, quantity: int = 1) -> None:
         """
-        Removes an item from a cart
+        Removes an item from a cart, dropping the cart line once its quantity reaches zero, and reprices the cart
         Args:
             item_id: Item's ID
             cart_id: Cart's ID
+            quantity: Number of units to remove, at most every unit of the line is removed
+
+        Notes:
+            - The line is decremented with a single UPDATE, or deleted when it would be left empty
+            - The cart total price is kept current incrementally (see RuleEngine.update_code_total)
 
         Returns: None
 
         """
-        with Transaction() as t:
-            cart_item = \
-                t.session.query(CartItem).filter_by(**{'carts_id': cart_id, 'items_id': item_id}).first()
-
-            if cart_item:
-                t.session.delete(cart_item)
+        if quantity < 1:
+            raise RuntimeError(f'Quantity must be positive, got {quantity}')
+
+        async with AsyncTransaction() as t:
+            line = (CartItem.carts_id == cart_id, CartItem.items_id == item_id)
+            cart_item = (await t.session.execute(
+                select(CartItem.quantity, Item.code, Item.price).join(Item, CartItem.items_id == Item.id).where(*line)
+            )).first()
+
+            if cart_item is None:
+                return
+
+            if cart_item.quantity > quantity:
+                await t.session.execute(
+                    update(CartItem).where(*line).values(quantity=CartItem.quantity - quantity)
+                    .execution_options(synchronize_session=False)
+                )
+            else:
+                await t.session.execute(delete(CartItem).where(*line).execution_options(synchronize_session=False))
+
+            removed = min(quantity, cart_item.quantity)
+            await self.engine.update_code_total(t.session, cart_id, cart_item.code, cart_item.price, -removed)
@@ -0,0 +1,173 @@
+""" Use Case: reprice every cart across a pool of worker processes, one shard of carts at a time """
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+
+from ..domain.cart_entity import Cart
+from .rule_catalogue import RULE_CATALOGUE, RuleCatalogue
+from .rule_plans import CompiledRule
+from .rules_service import PRICING_LINES, PRICING_MODES, RuleEngine, store_totals
+from ..infrastructure.database.config import DatabaseSettings
+from ..infrastructure.database.setup import configure_db, get_database_settings
+from ..infrastructure.database.transaction import AsyncTransaction, fetch_rows
+from ..infrastructure.logging.logger import RULES_LOGGER
+
+REPRICING_SHARD_SIZE = 1000
+
+PlansByCode = Mapping[str, Sequence[CompiledRule]]
+
+
+def log_progress(repriced: int, total: int) -> None:
+    """
+    Default progress callback: logs how many carts were repriced so far
+    Args:
+        repriced: Number of carts repriced (and written) so far
+        total: Number of carts to reprice
+
+    Returns: None
+
+    """
+    RULES_LOGGER.info('Repriced %d of %d carts', repriced, total)
+
+
+class ParallelRepricer(object):
+    """ Parallel repricing driver. Prices shards of carts in worker processes and writes them back. See "notes".
+    Notes:
+        - Rules are read once: the compiled catalogue snapshot is shipped to every worker when it starts, so every
+          shard is priced against the same rules
+        - Each worker builds its own engines and sessions (see configure_db) and event loop, and only reads: totals
+          travel back to the driver, which merges every shard with a bulk UPDATE as soon as it is priced
+        - Workers are spawned, not forked: neither pooled connections nor the driver event loop are inherited
+        - In-memory databases are private to each process, they are always repriced in-process
+    """
+
+    def __init__(self, workers: int = None, shard_size: int = REPRICING_SHARD_SIZE, mode: str = PRICING_LINES,
+                 progress: Callable[[int, int], None] = log_progress, catalogue: RuleCatalogue = None):
+        """
+        Initializer
+        Args:
+            workers: Number of worker processes, one per CPU by default. 1 prices every shard in-process
+            shard_size: Number of carts priced per task (and written per transaction)
+            mode: Pricing mode, one of PRICING_MODES (see RuleEngine)
+            progress: Called with the number of carts repriced so far and the total after every shard, None to skip
+            catalogue: Rules catalogue cache, shared by every engine by default
+        Notes:
+             Injectable catalogue and progress callback to aid Inversion of Control (IoC)
+        """
+        if mode not in PRICING_MODES:
+            raise RuntimeError(f'Unknown pricing mode: {mode}')
+        if shard_size < 1:
+            raise RuntimeError(f'Shard size must be positive, got {shard_size}')
+
+        self.workers = max(1, workers if workers is not None else os.cpu_count() or 1)
+        self.shard_size = shard_size
+        self.mode = mode
+        self.progress = progress
+        self.catalogue = catalogue if catalogue is not None else RULE_CATALOGUE
+
+    async def reprice(self, cart_ids: Iterable[int] = None) -> Dict[int, int]:
+        """
+        Applies existing rules to many carts, updating their total prices
+        Args:
+            cart_ids: Carts' IDs, every cart by default. Non existent carts are skipped
+
+        Returns: dict mapping every repriced cart id to its new total price
+
+        """
+        async with AsyncTransaction() as t:
+            plans_by_code = dict(await self.catalogue.get_async(t.session))
+        if cart_ids is None:
+            cart_ids = (await fetch_rows(select(Cart.id).order_by(Cart.id))).scalars().all()
+        shards = self.shard(cart_ids)
+        total = sum(len(shard) for shard in shards)
+
+        settings = get_database_settings()
+        workers = min(self.workers, len(shards))
+        if workers > 1 and settings.is_in_memory:
+            RULES_LOGGER.warning('In-memory databases are private to each process, repricing in-process')
+            workers = 1
+
+        totals = dict()
+        async for shard_totals in self._priced_shards(shards, plans_by_code, settings, workers):
+            async with AsyncTransaction() as t:
+                await store_totals(t.session, shard_totals, plans_by_code)
+            totals.update(shard_totals)
+            if self.progress is not None:
+                self.progress(len(totals), total)
+
+        return totals
+
+    def shard(self, cart_ids: Iterable[int]) -> List[List[int]]:
+        """
+        Partitions cart ids into shards of consecutive ids
+        Args:
+            cart_ids: Carts' IDs
+
+        Returns: List of shards, lists of at most shard_size sorted and unique cart ids
+
+        """
+        cart_ids = sorted(set(cart_ids))
+        return [cart_ids[start:start + self.shard_size] for start in range(0, len(cart_ids), self.shard_size)]
+
+    async def _priced_shards(self, shards: List[List[int]], plans_by_code: PlansByCode, settings: DatabaseSettings,
+                             workers: int):
+        """
+        Prices every shard, in worker processes when more than one worker is requested
+        Args:
+            shards: Shards of cart ids (see shard)
+            plans_by_code: Compiled rules indexed by item code, the catalogue snapshot
+            settings: Database settings the workers connect with
+            workers: Number of worker processes
+
+        Returns: Async iterator of dicts mapping cart id to total price, one per shard, in completion order
+
+        """
+        if workers <= 1:
+            engine = RuleEngine(mode=self.mode)
+            for shard in shards:
+                yield await engine.price_carts(shard, plans_by_code)
+            return
+
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(workers, mp_context=get_context('spawn'), initializer=_init_worker,
+                                 initargs=(settings, plans_by_code, self.mode)) as pool:
+            futures = [loop.run_in_executor(pool, _price_shard, shard) for shard in shards]
+            for future in asyncio.as_completed(futures):
+                yield await future
+
+
+# Per process state of a repricing worker: its event loop, rule engine and rules snapshot (see _init_worker)
+_worker: Optional[Tuple[asyncio.AbstractEventLoop, RuleEngine, PlansByCode]] = None
+
+
+def _init_worker(settings: DatabaseSettings, plans_by_code: PlansByCode, mode: str) -> None:
+    """
+    Worker process initializer: connects to the driver database and keeps the rules snapshot
+    Args:
+        settings: Database settings of the driver
+        plans_by_code: Compiled rules indexed by item code
+        mode: Pricing mode
+
+    Returns: None
+
+    """
+    global _worker
+    configure_db(settings)
+    _worker = (asyncio.new_event_loop(), RuleEngine(mode=mode), plans_by_code)
+
+
+def _price_shard(cart_ids: List[int]) -> Dict[int, int]:
+    """
+    Worker process task: prices a shard of carts, without writing them
+    Args:
+        cart_ids: Carts' IDs
+
+    Returns: dict mapping every existing cart id to its total price
+
+    """
+    loop, engine, plans_by_code = _worker
+    return loop.run_until_complete(engine.price_carts(cart_ids, plans_by_code))
@@ -1,9 +1,57 @@
 """ Use Case: populate/prefill the database with random data for testing purposes """
+import random
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List
+
+from sqlalchemy import func, insert, select
+
+from ..domain.cart_code_total_entity import CartCodeTotal
 from ..domain.cart_entity import Cart
+from ..domain.cart_item_entity import CartItem
 from ..domain.item_entity import Item
+from ..domain.money import DEFAULT_ROUNDING
 from ..domain.rule_entity import Rule
 from ..domain.user_entity import User
 from ..infrastructure.database.transaction import Transaction
+from .rule_catalogue import RULE_CATALOGUE
+
+PREFILL_CHUNK_SIZE = 10000
+
+
+def _chunks(rows: Iterable[Dict], chunk_size: int) -> Iterator[List[Dict]]:
+    """
+    Splits rows in lists of at most chunk_size rows, lazily
+    Args:
+        rows: Iterable of rows
+        chunk_size: Maximum number of rows per chunk
+
+    Returns: Iterator of lists of rows
+
+    """
+    rows = iter(rows)
+    chunk = list(islice(rows, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(rows, chunk_size))
+
+
+def _insert_rows(session, entity, rows: Iterable[Dict], chunk_size: int = PREFILL_CHUNK_SIZE) -> None:
+    """
+    Inserts rows with a Core executemany INSERT statement per chunk: no ORM object is built and the statement is
+    compiled once (SQL Alchemy compiled cache), so rows go straight to the driver
+    Args:
+        session: SQL Alchemy Session instance
+        entity: Entity whose table receives the rows
+        rows: Iterable of dicts mapping column names to values, every row with the same columns
+        chunk_size: Number of rows per statement (and held in memory at once)
+
+    Returns: None
+
+    """
+    connection = session.connection()
+    statement = insert(entity.__table__)
+    for chunk in _chunks(rows, chunk_size):
+        connection.execute(statement, chunk)
 
 
 class Prefill(object):
@@ -23,20 +71,21 @@ class Prefill(object):
 
         """
         with Transaction() as t:
-            for i in range(0, amount):
-                t.session.add(User(name=f'name_{i}', fullname=f'full_{i}', nickname=f'nick_{i}'))
+            _insert_rows(t.session, User, (
+                {'name': f'name_{i}', 'fullname': f'full_{i}', 'nickname': f'nick_{i}'} for i in range(0, amount)
+            ))
 
     @staticmethod
     async def items() -> None:
         """
-        Inserts challenge defined items to the database
+        Inserts challenge defined items to the database, priced in cents
         Returns: None
 
         """
         challenge_items = [
-            {'code': 'GR1', 'name': 'Green Tea', 'price': 3.11},
-            {'code': 'SR1', 'name': 'Strawberries', 'price': 5.00},
-            {'code': 'CF1', 'name': 'Coffee', 'price': 11.23},
+            {'code': 'GR1', 'name': 'Green Tea', 'price': 311},
+            {'code': 'SR1', 'name': 'Strawberries', 'price': 500},
+            {'code': 'CF1', 'name': 'Coffee', 'price': 1123},
         ]
 
         with Transaction() as t:
@@ -87,6 +136,7 @@ class Prefill(object):
         with Transaction() as t:
             for challenge_rule in challenge_rules:
                 t.session.add(Rule(**challenge_rule))
+        RULE_CATALOGUE.invalidate()
 
     @staticmethod
     async def carts() -> None:
@@ -96,9 +146,7 @@ class Prefill(object):
 
         """
         with Transaction() as t:
-            users = t.session.query(User).all()
-            for user in users:
-                t.session.add(Cart(user=user))
+            t.session.execute(insert(Cart).from_select(['user_id'], select(User.id)))
 
     @staticmethod
     async def all() -> None:
@@ -111,3 +159,136 @@ class Prefill(object):
         await Prefill.items()
         await Prefill.rules()
         await Prefill.carts()
+
+    @staticmethod
+    async def generate(
+            users: int = 0,
+            items: int = 0,
+            carts: int = 0,
+            lines: int = 0,
+            rules: int = 0,
+            seed: int = 0,
+            chunk_size: int = PREFILL_CHUNK_SIZE
+    ) -> None:
+        """
+        Synthetic load generator: inserts the given amount of random users, items, carts, cart lines and rules
+        Args:
+            users: Number of users to insert
+            items: Number of items to insert, each one with its own code
+            carts: Number of carts to insert, each one owned by a random (new or existing) user
+            lines: Number of cart lines to insert, spread evenly over the new carts, each one a distinct random item
+                with a random quantity
+            rules: Number of offer rules to insert, each one for the code of a random new item (of a random existing
+                item when no item is requested)
+            seed: Random seed, the same seed generates the same data
+            chunk_size: Number of rows per INSERT statement
+
+        Notes:
+            - Rows are generated lazily and inserted with Core executemany INSERT statements, so millions of rows
+              only take seconds and memory stays bounded by chunk_size
+            - Rows are appended to the existing ones
+            - Cart total prices are not computed: carts are inserted at 0 and their incremental pricing states stale
+              (total None). RuleEngine.apply_many (or ParallelRepricer) prices both. Until then, a cart is priced as
+              a whole by its next add to or remove from cart, or by a write of the rules of a code it holds
+
+        Returns: None
+
+        """
+        rng = random.Random(seed)
+
+        with Transaction() as t:
+            first_user, first_item, first_cart = (
+                (t.session.execute(select(func.max(entity.id))).scalar() or 0) + 1 for entity in (User, Item, Cart)
+            )
+            last_user = first_user + users - 1
+            last_item = first_item + items - 1
+
+            _insert_rows(t.session, User, (
+                {'id': i, 'name': f'name_{i}', 'fullname': f'full_{i}', 'nickname': f'nick_{i}'}
+                for i in range(first_user, last_user + 1)
+            ), chunk_size)
+            _insert_rows(t.session, Item, (
+                {'id': i, 'code': f'I{i}', 'name': f'item_{i}', 'price': rng.randint(50, 5000)}
+                for i in range(first_item, last_item + 1)
+            ), chunk_size)
+
+            if carts > 0:
+                if last_user < 1:
+                    raise RuntimeError('Carts need users, none exists nor was requested')
+
+                _insert_rows(t.session, Cart, (
+                    {'id': i, 'user_id': int(rng.random() * last_user) + 1, 'total_price': 0}
+                    for i in range(first_cart, first_cart + carts)
+                ), chunk_size)
+
+            if lines > 0:
+                if carts < 1 or lines > carts * last_item:
+                    raise RuntimeError(f'{lines} cart lines do not fit in {carts} new carts of {last_item} items')
+
+                _insert_rows(t.session, CartItem, Prefill._cart_lines(rng, first_cart, carts, lines, last_item),
+                             chunk_size)
+                t.session.execute(insert(CartCodeTotal).from_select(
+                    ['carts_id', 'code', 'quantity', 'subtotal', 'unit_price'],
+                    select(CartItem.carts_id, Item.code, func.sum(CartItem.quantity),
+                           func.sum(Item.price * CartItem.quantity), func.min(Item.price))
+                    .join(Item, CartItem.items_id == Item.id)
+                    .where(CartItem.carts_id >= first_cart)
+                    .group_by(CartItem.carts_id, Item.code)
+                ))
+
+            if rules > 0:
+                item_codes = [f'I{i}' for i in range(first_item, last_item + 1)] if items > 0 else (
+                    t.session.execute(select(Item.code).distinct().order_by(Item.code)).scalars().all()
+                )
+                if not item_codes:
+                    raise RuntimeError('Rules need items, none exists nor was requested')
+
+                _insert_rows(t.session, Rule, (Prefill._rule(rng, rng.choice(item_codes), i)
+                                               for i in range(0, rules)), chunk_size)
+        RULE_CATALOGUE.invalidate()
+
+    @staticmethod
+    def _cart_lines(rng: random.Random, first_cart: int, carts: int, lines: int, last_item: int) -> Iterator[Dict]:
+        """
+        Generates cart lines spread evenly over the given carts: each cart holds consecutive (distinct) items from a
+        random one on
+        Args:
+            rng: Random generator
+            first_cart: ID of the first cart
+            carts: Number of carts
+            lines: Number of lines
+            last_item: ID of the last item (items are picked from 1 to last_item)
+
+        Returns: Iterator of cart line rows
+
+        """
+        for offset in range(0, carts):
+            cart_lines = lines // carts + (1 if offset < lines % carts else 0)
+            first_item = int(rng.random() * last_item)
+            for item_id in ((first_item + line) % last_item + 1 for line in range(0, cart_lines)):
+                yield {'carts_id': first_cart + offset, 'items_id': item_id, 'quantity': int(rng.random() * 5) + 1}
+
+    @staticmethod
+    def _rule(rng: random.Random, item_code: str, i: int) -> Dict:
+        """
+        Generates a random offer rule row
+        Args:
+            rng: Random generator
+            item_code: Code of the item the rule applies to
+            i: Rule number, used to name it
+
+        Returns: Rule row
+
+        """
+        effect_type = rng.choice(['update_prices', 'one_free'])
+        return {
+            'item_code': item_code,
+            'name': f'rule_{i}',
+            'description': f'Generated rule {i}',
+            'firing_condition_operator': '>=',
+            'firing_condition_quantity': rng.randint(2, 5),
+            'effect_type': effect_type,
+            'effect_percentage': round(rng.uniform(0.05, 0.5), 2) if effect_type == 'update_prices' else None,
+            'rounding': DEFAULT_ROUNDING,
+            'version': 1,
+        }
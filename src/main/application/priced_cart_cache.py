@@ -0,0 +1,141 @@
+""" Use case support: bounded LRU cache of cart total prices, keyed by cart contents fingerprint """
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Hashable, Optional
+
+PRICED_CART_CACHE_SIZE = 10000
+
+
+class PricedCartCache(object):
+    """ Thread safe, bounded LRU cache of cart total prices. See "notes" for its keys and lifecycle.
+    Notes:
+        - Keys are cart contents fingerprints: carts holding the same items are priced once
+        - The cache is bound to a rule catalogue version: any other version clears it, so totals priced with
+          changed rules are never served
+        - Once full, the least recently used total is evicted
+    """
+
+    def __init__(self, maxsize: int = PRICED_CART_CACHE_SIZE):
+        """
+        Initializer
+        Args:
+            maxsize: Maximum number of cached totals
+        """
+        self.maxsize = maxsize
+        self._totals: OrderedDict = OrderedDict()
+        self._lock = Lock()
+        self._version = None
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def hits(self) -> int:
+        """ Number of lookups served from the cache """
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """ Number of lookups not found in the cache """
+        return self._misses
+
+    @property
+    def evictions(self) -> int:
+        """ Number of totals dropped to keep the cache bounded """
+        return self._evictions
+
+    @property
+    def hit_ratio(self) -> float:
+        """ Ratio of lookups served from the cache, 0 when nothing was looked up yet """
+        lookups = self._hits + self._misses
+        return self._hits / lookups if lookups else 0.0
+
+    def get(self, version: int, fingerprint: Hashable) -> Optional[int]:
+        """
+        Retrieves the cached total price of a cart
+        Args:
+            version: Rule catalogue version the total must have been priced with, newer versions clear the cache
+            fingerprint: Cart contents fingerprint
+
+        Returns: int (cents), or None on a cache miss
+
+        """
+        with self._lock:
+            total = self._totals.get(fingerprint) if self._bind(version) else None
+            if total is None:
+                self._misses += 1
+                return None
+
+            self._hits += 1
+            self._totals.move_to_end(fingerprint)
+            return total
+
+    def put(self, version: int, fingerprint: Hashable, total: int) -> None:
+        """
+        Caches the total price of a cart, evicting the least recently used one when full
+        Args:
+            version: Rule catalogue version the total was priced with, older versions are not cached
+            fingerprint: Cart contents fingerprint
+            total: Cart total price, in cents
+
+        Returns: None
+
+        """
+        with self._lock:
+            if not self._bind(version):
+                return
+
+            self._totals[fingerprint] = total
+            self._totals.move_to_end(fingerprint)
+            while len(self._totals) > self.maxsize:
+                self._totals.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        """
+        Drops every cached total, keeping the metrics
+        Returns: None
+
+        """
+        with self._lock:
+            self._totals.clear()
+
+    def metrics(self) -> Dict[str, float]:
+        """
+        Snapshot of the cache metrics
+        Returns: dict with size, maxsize, hits, misses, hit_ratio and evictions
+
+        """
+        return {
+            'size': len(self),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hit_ratio,
+            'evictions': self.evictions,
+        }
+
+    def _bind(self, version: int) -> bool:
+        """
+        Binds the cache to the given rule catalogue version, clearing it if it was bound to an older one. Must be
+        called holding the lock
+        Args:
+            version: Rule catalogue version
+
+        Returns: bool, False when the given version is older than the bound one (it must not be served nor cached)
+
+        """
+        if self._version is not None and version < self._version:
+            return False
+
+        if version != self._version:
+            self._totals.clear()
+            self._version = version
+        return True
+
+    def __len__(self) -> int:
+        """ Number of cached totals """
+        return len(self._totals)
+
+
+PRICED_CARTS = PricedCartCache()
@@ -0,0 +1,183 @@
+""" Use Case: read-only "what-if" simulation of a candidate offer rule set over every cart """
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from ..domain.money import ROUNDING_POLICIES
+from ..domain.rule_entity import Rule
+from .columnar_pricing import COLUMNAR_CHUNK_SIZE, ColumnarRuleEngine
+from .rule_catalogue import RULE_CATALOGUE, RuleCatalogue
+from .rule_plans import EFFECT_RESOLVERS, FIRING_OPERATORS, CompiledRule, index_by_item_code
+from .rules_service import PRICING_LINES
+from ..infrastructure.database.transaction import AsyncTransaction
+from ..infrastructure.logging.logger import RULES_LOGGER
+
+
+class RuleFirings(object):
+    """ Number of carts a rule fires on, under the current and the candidate rule sets """
+
+    __slots__ = ('id', 'name', 'item_code', 'candidate', 'baseline_carts', 'simulated_carts')
+
+    def __init__(self, plan: CompiledRule, candidate: bool, baseline_carts: int, simulated_carts: int):
+        """
+        Initializer
+        Args:
+            plan: Compiled rule
+            candidate: Whether the rule is a candidate one (or a current one)
+            baseline_carts: Carts the rule fires on under the current rules
+            simulated_carts: Carts the rule fires on under the candidate rules
+        """
+        self.id = plan.id
+        self.name = plan.name
+        self.item_code = plan.item_code
+        self.candidate = candidate
+        self.baseline_carts = baseline_carts
+        self.simulated_carts = simulated_carts
+
+    def to_dict(self) -> Dict:
+        """
+        JSON serializable representation
+        Returns: dict
+
+        """
+        return {attribute: getattr(self, attribute) for attribute in self.__slots__}
+
+
+class PromotionSimulation(object):
+    """ Outcome of a simulation: carts and revenue (cents) under the current (baseline) and the candidate rules """
+
+    __slots__ = ('carts', 'affected_carts', 'baseline_revenue', 'simulated_revenue', 'rules')
+
+    def __init__(self):
+        """ Initializer """
+        self.carts = 0
+        self.affected_carts = 0
+        self.baseline_revenue = 0
+        self.simulated_revenue = 0
+        self.rules: List[RuleFirings] = list()
+
+    @property
+    def revenue_delta(self) -> int:
+        """ Revenue change (cents) the candidate rules would bring, negative for a loss """
+        return self.simulated_revenue - self.baseline_revenue
+
+    def to_dict(self) -> Dict:
+        """
+        JSON serializable representation
+        Returns: dict
+
+        """
+        return {
+            'carts': self.carts,
+            'affected_carts': self.affected_carts,
+            'baseline_revenue': self.baseline_revenue,
+            'simulated_revenue': self.simulated_revenue,
+            'revenue_delta': self.revenue_delta,
+            'rules': [rule.to_dict() for rule in self.rules],
+        }
+
+
+class PromotionSimulator(object):
+    """ What-if simulator. Prices every cart against the current and a candidate rule set. See "notes".
+    Notes:
+        - Nothing is written: neither rules nor cart totals. Carts are read within a single transaction
+        - Carts are streamed a chunk at a time as columns (see ColumnarRuleEngine), each chunk is priced twice
+        - The baseline is recomputed with the current rules, stored cart totals may be stale
+        - By default candidate rules are added to the current ones, a candidate holding the id of a current rule
+          simulates an update of that rule. replace simulates the candidate rules as the whole rule set
+    """
+
+    def __init__(self, catalogue: RuleCatalogue = None, mode: str = PRICING_LINES,
+                 chunk_size: int = COLUMNAR_CHUNK_SIZE):
+        """
+        Initializer
+        Args:
+            catalogue: Rules catalogue cache, shared by every engine by default
+            mode: Pricing mode, one of PRICING_MODES (see RuleEngine)
+            chunk_size: Number of carts whose lines are loaded (and held in memory) at once
+        Notes:
+             Injectable catalogue to aid Inversion of Control (IoC)
+        """
+        self.catalogue = catalogue if catalogue is not None else RULE_CATALOGUE
+        self.engine = ColumnarRuleEngine(catalogue=self.catalogue, mode=mode)
+        self.chunk_size = chunk_size
+
+    async def simulate(self, candidates: Iterable[Rule], replace: bool = False,
+                       cart_ids: Iterable[int] = None) -> PromotionSimulation:
+        """
+        Simulates a candidate rule set over many carts
+        Args:
+            candidates: Candidate Rule Entities, not persisted
+            replace: Whether candidates replace every current rule instead of being added to them
+            cart_ids: Carts' IDs, every cart by default. Non existent carts are skipped
+
+        Returns: PromotionSimulation
+
+        """
+        candidate_plans = [self.compile(rule) for rule in candidates]
+        replaced_ids = {plan.id for plan in candidate_plans if plan.id is not None}
+        simulation = PromotionSimulation()
+        baseline_firings, simulated_firings = Counter(), Counter()
+
+        async with AsyncTransaction() as t:
+            baseline_by_code = await self.catalogue.get_async(t.session)
+            current_plans = [plan for plans in baseline_by_code.values() for plan in plans]
+            kept_plans = [] if replace else [plan for plan in current_plans if plan.id not in replaced_ids]
+            simulated_by_code = index_by_item_code(kept_plans + candidate_plans)
+
+            async for lines in self.engine.stream_lines(t.session, cart_ids, self.chunk_size):
+                baseline = self.engine.price(lines, baseline_by_code, baseline_firings)
+                simulated = self.engine.price(lines, simulated_by_code, simulated_firings)
+                simulation.carts += len(lines.cart_ids)
+                simulation.affected_carts += int(np.count_nonzero(baseline != simulated))
+                simulation.baseline_revenue += int(baseline.sum())
+                simulation.simulated_revenue += int(simulated.sum())
+                RULES_LOGGER.debug('Simulated %d carts', simulation.carts)
+
+        simulation.rules = [
+            RuleFirings(plan, False, baseline_firings[plan], simulated_firings[plan]) for plan in current_plans
+        ] + [
+            RuleFirings(plan, True, 0, simulated_firings[plan]) for plan in candidate_plans
+        ]
+        return simulation
+
+    @staticmethod
+    def compile(rule: Rule) -> CompiledRule:
+        """
+        Compiles a candidate rule, checking it upfront: a simulation must not fail halfway through the carts
+        Args:
+            rule: Candidate Rule Entity
+
+        Returns: CompiledRule
+
+        """
+        problem = _candidate_problem(rule)
+        if problem is not None:
+            raise RuntimeError(f'Invalid candidate rule {rule.name}: {problem}')
+        return CompiledRule(rule)
+
+
+def _candidate_problem(rule: Rule) -> Optional[str]:
+    """
+    Checks a candidate rule
+    Args:
+        rule: Candidate Rule Entity
+
+    Returns: Description of what is wrong with the rule, None if nothing is
+
+    """
+    if not rule.item_code:
+        return 'no item code'
+    if rule.firing_condition_operator not in FIRING_OPERATORS:
+        return f'unknown firing condition operator {rule.firing_condition_operator}'
+    if rule.firing_condition_quantity is None:
+        return 'no firing condition quantity'
+    if rule.effect_type not in EFFECT_RESOLVERS:
+        return f'unknown effect type {rule.effect_type}'
+    if rule.effect_type == 'update_prices' and not (rule.effect_percentage is not None
+                                                    and 0 <= rule.effect_percentage <= 1):
+        return f'effect percentage {rule.effect_percentage} is not between 0 and 1'
+    if rule.rounding is not None and rule.rounding not in ROUNDING_POLICIES:
+        return f'unknown rounding policy {rule.rounding}'
+    return None
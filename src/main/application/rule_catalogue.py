@@ -0,0 +1,205 @@
+""" Use case support: in-process cache of the offer rules catalogue, indexed by item code """
+import time
+from threading import Lock
+from types import MappingProxyType
+from typing import Callable, FrozenSet, Mapping, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..domain.rule_entity import Rule
+from ..infrastructure.logging.logger import RULES_LOGGER
+from .rule_plans import RULE_PLANS, CompiledRule, RulePlanCache, index_by_item_code
+
+RULE_CATALOGUE_TTL = 60.0
+
+
+class RuleCatalogue(object):
+    """ Thread safe snapshot of every offer rule, compiled and indexed by item code. See "notes" for its lifecycle.
+    Notes:
+        - The snapshot is read-only: a mapping proxy of item code to a tuple of CompiledRule
+        - RuleService writes invalidate the snapshot, which is then reloaded by the next reader
+        - Writes made by other processes are picked up once the snapshot is older than its TTL
+        - Every invalidation, and every reload reading other rules (ids and versions) than the previous one,
+          increases the catalogue version. Reloads of unchanged rules (TTL refreshes) keep it
+        - Readers pricing with a snapshot must tag prices with the version returned along it (see get_versioned)
+    """
+
+    def __init__(self, ttl: float = RULE_CATALOGUE_TTL, plans: RulePlanCache = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initializer
+        Args:
+            ttl: Seconds a snapshot is served before being reloaded, None to disable the TTL fallback
+            plans: Compiled rules cache, shared by every catalogue by default
+            clock: Monotonic clock in seconds, injectable to aid testing
+        """
+        self.ttl = ttl
+        self.plans = plans if plans is not None else RULE_PLANS
+        self._clock = clock
+        self._lock = Lock()
+        self._snapshot: Optional[Mapping[str, Tuple[CompiledRule, ...]]] = None
+        self._loaded_at = 0.0
+        self._version = 0
+        self._rule_versions: Optional[FrozenSet[Tuple[int, int]]] = None
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def version(self) -> int:
+        """ Catalogue version, increased every time the snapshot is invalidated or reloaded with other rules """
+        return self._version
+
+    @property
+    def hits(self) -> int:
+        """ Number of reads served from the current snapshot """
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """ Number of reads that had to reload the snapshot from the database """
+        return self._misses
+
+    def get(self, session: Session) -> Mapping[str, Tuple[CompiledRule, ...]]:
+        """
+        Retrieves the current rules snapshot, reloading it with the given session when missing or expired
+        Args:
+            session: SQL Alchemy Session instance
+
+        Returns: Read-only mapping of item code to a tuple of CompiledRule
+
+        """
+        return self.get_versioned(session)[1]
+
+    def get_versioned(self, session: Session) -> Tuple[int, Mapping[str, Tuple[CompiledRule, ...]]]:
+        """
+        Retrieves the current rules snapshot along its catalogue version (see get)
+        Args:
+            session: SQL Alchemy Session instance
+
+        Returns: Tuple of the catalogue version and the read-only mapping of item code to a tuple of CompiledRule
+
+        """
+        versioned = self._fresh_snapshot()
+        if versioned is not None:
+            return versioned
+
+        with self._lock:
+            if self._snapshot is not None and not self._expired():
+                self._hits += 1
+                return self._version, self._snapshot
+
+            self._misses += 1
+            return self._install(session.query(Rule).all())
+
+    async def get_async(self, session: AsyncSession) -> Mapping[str, Tuple[CompiledRule, ...]]:
+        """
+        Asyncio counterpart of get
+        Args:
+            session: SQL Alchemy AsyncSession instance
+
+        Returns: Read-only mapping of item code to a tuple of CompiledRule
+
+        """
+        return (await self.get_versioned_async(session))[1]
+
+    async def get_versioned_async(self, session: AsyncSession) -> Tuple[int, Mapping[str, Tuple[CompiledRule, ...]]]:
+        """
+        Asyncio counterpart of get_versioned
+        Args:
+            session: SQL Alchemy AsyncSession instance
+
+        Notes:
+            - The lock is never held while awaiting the database: it would block the whole event loop. Concurrent
+              misses may thus load the rules more than once
+            - Rules read while the catalogue gets invalidated are served but not installed, along the version
+              before the invalidation (so prices computed with them are never cached, see PricedCartCache)
+
+        Returns: Tuple of the catalogue version and the read-only mapping of item code to a tuple of CompiledRule
+
+        """
+        versioned = self._fresh_snapshot()
+        if versioned is not None:
+            return versioned
+
+        version = self._version
+        rules = (await session.execute(select(Rule))).scalars().all()
+        with self._lock:
+            self._misses += 1
+            if self._version != version:
+                return version, self._index(rules)
+            return self._install(rules)
+
+    def _fresh_snapshot(self) -> Optional[Tuple[int, Mapping[str, Tuple[CompiledRule, ...]]]]:
+        """
+        Retrieves the current snapshot along its version (counting a hit) unless it is missing or expired
+        Returns: Tuple of the catalogue version and the read-only mapping of item code to a tuple of CompiledRule,
+            or None
+
+        """
+        if self._snapshot is None or self._expired():
+            return None
+
+        with self._lock:
+            if self._snapshot is None:
+                return None
+            self._hits += 1
+            return self._version, self._snapshot
+
+    def _install(self, rules) -> Tuple[int, Mapping[str, Tuple[CompiledRule, ...]]]:
+        """
+        Compiles and installs the given rules as the current snapshot. Must be called holding the lock
+        Args:
+            rules: Iterable of Rule Entities
+
+        Notes:
+            - The version is only increased when the rules (ids and versions) differ from the previously installed
+              ones, so TTL refreshes of unchanged rules keep priced carts cached
+
+        Returns: Tuple of the catalogue version and the read-only mapping of item code to a tuple of CompiledRule
+
+        """
+        rules = list(rules)
+        rule_versions = frozenset((rule.id, rule.version) for rule in rules)
+        self._snapshot = self._index(rules)
+        self._loaded_at = self._clock()
+        if rule_versions != self._rule_versions:
+            self._rule_versions = rule_versions
+            self._version += 1
+        RULES_LOGGER.debug('Rules catalogue reloaded: %d item codes, version %d', len(self._snapshot), self._version)
+        return self._version, self._snapshot
+
+    def _index(self, rules) -> Mapping[str, Tuple[CompiledRule, ...]]:
+        """
+        Compiles the given rules and indexes them by item code
+        Args:
+            rules: Iterable of Rule Entities
+
+        Returns: Read-only mapping of item code to a tuple of CompiledRule
+
+        """
+        plans_by_code = index_by_item_code(self.plans.get(rule) for rule in rules)
+        return MappingProxyType({code: tuple(plans) for code, plans in plans_by_code.items()})
+
+    def invalidate(self, rule_id: int = None) -> None:
+        """
+        Drops the current snapshot so the next reader reloads it
+        Args:
+            rule_id: ID of the written rule, if given its compiled plans are evicted too
+
+        Returns: None
+
+        """
+        with self._lock:
+            self._snapshot = None
+            self._version += 1
+            if rule_id is not None:
+                self.plans.evict(rule_id)
+
+    def _expired(self) -> bool:
+        """ Whether the current snapshot has outlived its TTL """
+        return self.ttl is not None and self._clock() - self._loaded_at > self.ttl
+
+
+RULE_CATALOGUE = RuleCatalogue()
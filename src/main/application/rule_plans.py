@@ -0,0 +1,255 @@
+""" Use case support: compile offer rules once into reusable firing predicates and effect resolvers """
+import operator
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from ..domain.money import DEFAULT_ROUNDING, RATE_SCALE, apply_rate, to_rate
+from ..domain.rule_entity import Rule
+
+# A cart line priced by the engine: unit price (cents) and number of units
+Line = Tuple[int, int]
+
+FIRING_OPERATORS: Dict[str, Callable[[int, int], bool]] = {
+    '>=': operator.ge,
+    '>': operator.gt,
+    '<=': operator.le,
+    '<': operator.lt,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+
+def _update_prices(lines: List[Line], rate: int, rounding: str) -> List[Line]:
+    """
+    Discounts the given cart lines by the given rate. See "notes" for its rounding.
+    Args:
+        lines: List of (price, quantity) cart lines
+        rate: Fixed point discount rate (see money.to_rate)
+        rounding: Rounding policy of the discounted amount (see money.ROUNDING_POLICIES)
+
+    Notes:
+        - The lines subtotal is discounted and rounded once, as a single line of one unit. So the discount is the
+          same whether the code is priced from its lines or from its aggregates
+
+    Returns: List of (price, quantity) tuples
+
+    """
+    subtotal = sum(price * quantity for price, quantity in lines)
+    return [(apply_rate(subtotal, RATE_SCALE - rate, rounding), 1)]
+
+
+def _one_free(lines: List[Line], rate: int, rounding: str) -> List[Line]:
+    """
+    Removes one unit from the last given cart line (that unit is free)
+    Args:
+        lines: List of (price, quantity) cart lines
+        rate: Unused, kept so every effect shares the same signature
+        rounding: Unused, kept so every effect shares the same signature
+
+    Returns: List of (price, quantity) tuples
+
+    """
+    new_lines = list(lines)
+    price, quantity = new_lines.pop()
+    if quantity > 1:
+        new_lines.append((price, quantity - 1))
+    return new_lines
+
+
+EFFECT_RESOLVERS: Dict[str, Callable[[List[Line], int, str], List[Line]]] = {
+    'update_prices': _update_prices,
+    'one_free': _one_free,
+}
+
+
+def _update_subtotal(subtotal: int, unit_price: int, rate: int, rounding: str) -> int:
+    """
+    Discounts a subtotal by the given rate
+    Args:
+        subtotal: Sum of the prices of every unit of an item code
+        unit_price: Unused, kept so every aggregate effect shares the same signature
+        rate: Fixed point discount rate (see money.to_rate)
+        rounding: Rounding policy of the discounted subtotal (see money.ROUNDING_POLICIES)
+
+    Returns: int
+
+    """
+    return apply_rate(subtotal, RATE_SCALE - rate, rounding)
+
+
+def _one_free_subtotal(subtotal: int, unit_price: int, rate: int, rounding: str) -> int:
+    """
+    Removes one unit price from a subtotal (that unit is free)
+    Args:
+        subtotal: Sum of the prices of every unit of an item code
+        unit_price: Price of the free unit
+        rate: Unused, kept so every aggregate effect shares the same signature
+        rounding: Unused, kept so every aggregate effect shares the same signature
+
+    Returns: int
+
+    """
+    return subtotal - unit_price
+
+
+AGGREGATE_EFFECT_RESOLVERS: Dict[str, Callable[[int, int, int, str], int]] = {
+    'update_prices': _update_subtotal,
+    'one_free': _one_free_subtotal,
+}
+
+
+class CompiledRule(object):
+    """ Immutable, ready to run plan of a Rule Entity: a firing predicate plus an effect resolver
+    Notes:
+        - Operators and effects are looked up in whitelisted tables, no source code is ever evaluated
+        - Unknown operators or effect types raise RuntimeError when used, as the former eval based path did
+        - Percentages are compiled to fixed point rates, effects work on integer cents only (see money module)
+    """
+
+    __slots__ = ('id', 'version', 'item_code', 'name', '_operator', '_quantity', '_effect', '_aggregate_effect',
+                 '_rate', '_rounding')
+
+    def __init__(self, rule: Rule):
+        """
+        Initializer
+        Args:
+            rule: Rule Entity to compile
+        """
+        self.id = rule.id
+        self.version = rule.version
+        self.item_code = rule.item_code
+        self.name = rule.name
+        self._operator = FIRING_OPERATORS.get(rule.firing_condition_operator, self._unknown_operator(rule))
+        self._quantity = rule.firing_condition_quantity
+        self._effect = EFFECT_RESOLVERS.get(rule.effect_type, self._unknown_effect(rule))
+        self._aggregate_effect = AGGREGATE_EFFECT_RESOLVERS.get(rule.effect_type, self._unknown_effect(rule))
+        self._rate = to_rate(rule.effect_percentage)
+        self._rounding = rule.rounding or DEFAULT_ROUNDING
+
+    def fires(self, quantity: int) -> bool:
+        """
+        Whether this rule must be fired for the given amount of matching items
+        Args:
+            quantity: Number of cart items matching this rule's item code, or an integer array of them
+
+        Returns: bool, or a boolean array
+
+        """
+        return self._operator(quantity, self._quantity)
+
+    def resolve(self, lines: List[Line]) -> List[Line]:
+        """
+        Applies this rule's effect to the given cart lines
+        Args:
+            lines: List of (price, quantity) cart lines matching this rule's item code
+
+        Returns: List of (price, quantity) tuples
+
+        """
+        return self._effect(lines, self._rate, self._rounding)
+
+    def resolve_aggregate(self, subtotal: int, unit_price: int) -> int:
+        """
+        Applies this rule's effect to the aggregated prices of an item code
+        Args:
+            subtotal: Sum of the prices of every unit matching this rule's item code
+            unit_price: Price of a single unit, the one made free by one_free effects
+
+        Notes:
+            - subtotal and unit_price may be integer arrays, resolved elementwise
+
+        Returns: int, or an integer array
+
+        """
+        return self._aggregate_effect(subtotal, unit_price, self._rate, self._rounding)
+
+    @staticmethod
+    def _unknown_operator(rule: Rule) -> Callable[[int, int], bool]:
+        """ Builds a predicate failing on use for a non whitelisted firing condition operator """
+        def _raise(quantity, threshold):
+            raise RuntimeError(f'Unknown firing condition operator: {rule.firing_condition_operator}')
+        return _raise
+
+    @staticmethod
+    def _unknown_effect(rule: Rule) -> Callable:
+        """ Builds a resolver failing on use for an unknown effect type """
+        def _raise(*args):
+            raise RuntimeError(f'Unknown effect type: {rule.effect_type}')
+        return _raise
+
+
+class RulePlanCache(object):
+    """ Thread safe cache of compiled rules, keyed by rule id and version
+    Notes:
+        - A rule update bumps its version, so stale plans are never served
+        - Transient (not yet persisted) rules have no id and are compiled on every call
+    """
+
+    def __init__(self):
+        """ Initializer """
+        self._plans: Dict[Tuple[int, int], CompiledRule] = dict()
+        self._lock = Lock()
+
+    def get(self, rule: Rule) -> CompiledRule:
+        """
+        Retrieves the compiled plan of a rule, compiling it on a cache miss
+        Args:
+            rule: Rule Entity
+
+        Returns: CompiledRule
+
+        """
+        if rule.id is None:
+            return CompiledRule(rule)
+
+        key = (rule.id, rule.version)
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = CompiledRule(rule)
+            with self._lock:
+                self._plans[key] = plan
+        return plan
+
+    def evict(self, rule_id: int) -> None:
+        """
+        Drops every compiled plan (any version) of a rule
+        Args:
+            rule_id: Rule's ID
+
+        Returns: None
+
+        """
+        with self._lock:
+            for key in [key for key in self._plans if key[0] == rule_id]:
+                del self._plans[key]
+
+    def clear(self) -> None:
+        """
+        Drops every compiled plan
+        Returns: None
+
+        """
+        with self._lock:
+            self._plans.clear()
+
+    def __len__(self) -> int:
+        """ Number of cached plans """
+        return len(self._plans)
+
+
+def index_by_item_code(plans: Iterable[CompiledRule]) -> Dict[str, List[CompiledRule]]:
+    """
+    Indexes compiled rules by the item code they target, keeping their original order
+    Args:
+        plans: Iterable of CompiledRule
+
+    Returns: dict mapping item code to the list of its compiled rules
+
+    """
+    plans_by_code = dict()
+    for plan in plans:
+        plans_by_code.setdefault(plan.item_code, []).append(plan)
+    return plans_by_code
+
+
+RULE_PLANS = RulePlanCache()
@@ -1,12 +1,190 @@
 """ Use Cases: Apply offer rules to a shopping cart to get the final price, CRUD operations for Offers  """
-from itertools import groupby
+from time import perf_counter
+from typing import AsyncIterator, Dict, Hashable, Iterable, List, Sequence, Tuple
+from sqlalchemy import bindparam, delete, func, or_, select, update
+from sqlalchemy.engine import Result, ScalarResult
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
 from ..domain.cart_entity import Cart
+from ..domain.cart_code_total_entity import CartCodeTotal
+from ..domain.cart_item_entity import CartItem
+from ..domain.item_entity import Item
+from ..domain.money import DEFAULT_ROUNDING
 from ..domain.rule_entity import Rule
-from ..infrastructure.database.setup import build_session
-from ..infrastructure.database.transaction import Transaction
-
-
-class RuleService(Transaction):
+from .priced_cart_cache import PRICED_CARTS, PricedCartCache
+from .rule_catalogue import RULE_CATALOGUE, RuleCatalogue
+from .rule_plans import RULE_PLANS, CompiledRule, Line, index_by_item_code
+from ..infrastructure.database.pagination import keyset
+from ..infrastructure.database.upsert import insert_on_conflict
+from ..infrastructure.logging.logger import RULES_LOGGER
+from ..infrastructure.metrics.registry import REGISTRY
+from ..infrastructure.database.transaction import AsyncTransaction, Transaction, fetch_rows, stream_scalars
+
+APPLY_MANY_CHUNK_SIZE = 500
+
+# Pricing modes: cart lines priced in Python, or per item code aggregates computed by the database
+PRICING_LINES = 'lines'
+PRICING_AGGREGATE = 'aggregate'
+PRICING_MODES = (PRICING_LINES, PRICING_AGGREGATE)
+
+APPLY_STAGE_SECONDS = REGISTRY.histogram(
+    'rule_engine_apply_stage_seconds', 'RuleEngine.apply latency by stage (rules_load, items_load, evaluation, '
+    'write_back)', ('stage',))
+
+
+def _price_code_total(plans: Sequence[CompiledRule], quantity: int, subtotal: int, unit_price: int) -> int:
+    """
+    Computes the contribution of an item code to its cart total price, firing every applicable rule
+    Args:
+        plans: Compiled rules of the item code
+        quantity: Number of units of the code
+        subtotal: Sum of the base prices of every unit of the code
+        unit_price: Price of the unit made free by one_free effects
+
+    Returns: int, cents
+
+    """
+    total_price = 0
+    fired = False
+    for plan in plans:
+        if plan.fires(quantity) is True:
+            total_price += plan.resolve_aggregate(subtotal, unit_price)
+            fired = True
+
+    return total_price if fired is True else subtotal
+
+
+def _reprice_code_totals(session, codes: Iterable[str]) -> None:
+    """
+    Reprices, with the current rules, the incremental pricing state of the given item codes in every cart holding
+    them, and then the total price of those carts. See "notes".
+    Args:
+        session: SQL Alchemy Session instance, the one writing the rules
+        codes: Item codes whose rules changed
+
+    Notes:
+        - Runs within the rule write transaction, so cart total prices are current as soon as the rules are
+        - Stale states (total None) of those carts are priced too, as update_code_total does: the cart total price
+          is the sum of every state
+        - Cost grows with the number of carts holding the codes, not with their lines: only per code states are read
+
+    Returns: None
+
+    """
+    codes = set(codes)
+    session.flush()
+    carts = select(CartCodeTotal.carts_id).where(CartCodeTotal.code.in_(codes))
+    states = session.execute(
+        select(CartCodeTotal.id, CartCodeTotal.code, CartCodeTotal.quantity, CartCodeTotal.subtotal,
+               CartCodeTotal.unit_price)
+        .where(or_(CartCodeTotal.code.in_(codes), CartCodeTotal.total.is_(None) & CartCodeTotal.carts_id.in_(carts)))
+    ).all()
+    plans_by_code = index_by_item_code(RULE_PLANS.get(rule) for rule in session.query(Rule).filter(
+        Rule.item_code.in_(codes | {code for _, code, *_ in states})))
+    _store_code_totals(session, states, plans_by_code)
+    cart_total = select(func.sum(CartCodeTotal.total)).where(CartCodeTotal.carts_id == Cart.id).scalar_subquery()
+    session.execute(
+        update(Cart).where(Cart.id.in_(carts))
+        .values(total_price=func.coalesce(cart_total, 0))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _execute_many(session, statement, parameters: List[dict]) -> None:
+    """
+    Runs a statement once per set of parameters, compiled once for the session dialect and executed at the driver
+    level: no per row bind processing, so only for plain values
+    Args:
+        session: SQL Alchemy Session instance
+        statement: SQL Alchemy statement, with a bind parameter per key of the parameters
+        parameters: Bind parameters of every run, nothing is run when empty
+
+    Returns: None
+
+    """
+    if parameters:
+        connection = session.connection()
+        compiled = statement.compile(dialect=connection.dialect)
+        if compiled.positional:
+            parameters = [tuple(row[name] for name in compiled.positiontup) for row in parameters]
+        connection.exec_driver_sql(str(compiled), parameters)
+
+
+def _store_code_totals(session, states: Iterable[tuple], plans_by_code) -> None:
+    """
+    Prices incremental pricing states and writes their totals with a single executemany UPDATE (see execute_many)
+    Args:
+        session: SQL Alchemy Session instance
+        states: (id, code, quantity, subtotal, unit price) CartCodeTotal rows
+        plans_by_code: Compiled rules indexed by item code (see RuleCatalogue)
+
+    Returns: None
+
+    """
+    table = CartCodeTotal.__table__
+    _execute_many(session, update(table).where(table.c.id == bindparam('state_id')).values(
+        total=bindparam('state_total')
+    ), [
+        {'state_id': state_id, 'state_total': _price_code_total(plans_by_code.get(code, ()), *aggregate)}
+        for state_id, code, *aggregate in states
+    ])
+
+
+async def store_totals(session: AsyncSession, totals: Dict[int, int], plans_by_code,
+                       aggregates_by_cart: Dict[int, Dict[str, Tuple[int, int, int]]] = None) -> None:
+    """
+    Writes cart total prices, along the totals of the carts incremental pricing states. See "notes".
+    Args:
+        session: SQL Alchemy AsyncSession instance
+        totals: dict mapping cart id to its new total price
+        plans_by_code: Compiled rules indexed by item code the totals were priced with (see RuleCatalogue)
+        aggregates_by_cart: dict mapping cart id to its (quantity, base price sum, unit price) per item code, the
+            ones the totals were priced from. States are read back from the database when missing
+
+    Notes:
+        - Carts and their states are written with an executemany UPDATE each (see execute_many), states read (when
+          needed) in chunks of APPLY_MANY_CHUNK_SIZE carts. No state is left stale, so later incremental and rule
+          write repricings sum current totals
+        - Given aggregates rewrite their states as a whole (see RuleEngine.code_aggregates), so each state total
+          matches its own aggregate. States read back keep their unit price, the one of the last line of a code
+
+    Returns: None
+
+    """
+    def write(sync_session) -> None:
+        carts, code_totals = Cart.__table__, CartCodeTotal.__table__
+        _execute_many(sync_session, update(carts).where(carts.c.id == bindparam('cart_id')).values(
+            total_price=bindparam('cart_total')
+        ), [{'cart_id': cart_id, 'cart_total': total} for cart_id, total in totals.items()])
+        if aggregates_by_cart is not None:
+            _execute_many(sync_session, update(code_totals).where(
+                code_totals.c.carts_id == bindparam('state_cart'), code_totals.c.code == bindparam('state_code')
+            ).values(
+                quantity=bindparam('state_quantity'), subtotal=bindparam('state_subtotal'),
+                unit_price=bindparam('state_unit_price'), total=bindparam('state_total')
+            ), [
+                {'state_cart': cart_id, 'state_code': code, 'state_quantity': quantity, 'state_subtotal': subtotal,
+                 'state_unit_price': unit_price,
+                 'state_total': _price_code_total(plans_by_code.get(code, ()), quantity, subtotal, unit_price)}
+                for cart_id, aggregates in aggregates_by_cart.items()
+                for code, (quantity, subtotal, unit_price) in aggregates.items()
+            ])
+            return
+
+        cart_ids = list(totals)
+        for start in range(0, len(cart_ids), APPLY_MANY_CHUNK_SIZE):
+            states = sync_session.execute(
+                select(CartCodeTotal.id, CartCodeTotal.code, CartCodeTotal.quantity, CartCodeTotal.subtotal,
+                       CartCodeTotal.unit_price)
+                .where(CartCodeTotal.carts_id.in_(cart_ids[start:start + APPLY_MANY_CHUNK_SIZE]))
+            ).all()
+            _store_code_totals(sync_session, states, plans_by_code)
+
+    await session.run_sync(write)
+
+
+class RuleService(object):
     """ Offer Rules Service (CRUD operations for Rule Entity) """
 
     def create_offer_rule(
@@ -16,7 +194,8 @@ class RuleService(Transaction):
             firing_condition_operator,
             firing_condition_quantity,
             effect_type,
-            effect_percentage
+            effect_percentage,
+            rounding=DEFAULT_ROUNDING
     ):
         """ Creates a new OfferRule and inserts it to the database """
         with Transaction() as t:
@@ -27,8 +206,11 @@ class RuleService(Transaction):
                 firing_condition_operator=firing_condition_operator,
                 firing_condition_quantity=firing_condition_quantity,
                 effect_type=effect_type,
-                effect_percentage=effect_percentage
+                effect_percentage=effect_percentage,
+                rounding=rounding
             ))
+            _reprice_code_totals(t.session, [item_code])
+        RULE_CATALOGUE.invalidate()
 
     def read_offer_rule(self, filter_params: dict = None):
         """
@@ -42,23 +224,95 @@ class RuleService(Transaction):
         with Transaction() as t:
             return t.session.query(Rule).filter_by(**filter_params)
 
-    async def read_offer_rules(self):
-        """ Retrieves all rules from the database """
-        with Transaction() as t:
-            return t.session.query(Rule)
+    async def read_offer_rules(self, after: int = None, limit: int = None) -> ScalarResult:
+        """
+        Retrieves rules from the database sorted by id, paginated by id if requested
+        Args:
+            after: Only rules whose id is greater than this one are retrieved
+            limit: Maximum number of rules to retrieve, None (default) to retrieve all of them
+
+        Returns: SQL Alchemy ScalarResult instance
+
+        """
+        async with AsyncTransaction() as t:
+            return (await t.session.execute(keyset(select(Rule), Rule.id, after, limit))).scalars()
+
+    async def read_offer_rule_rows(self, after: int = None, limit: int = None) -> Result:
+        """
+        Retrieves the columns of rules from the database sorted by id, as plain rows (see read_offer_rules)
+        Args:
+            after: Only rules whose id is greater than this one are retrieved
+            limit: Maximum number of rules to retrieve, None (default) to retrieve all of them
 
-    def update_offer_rule(self, id: int):
+        Returns: SQL Alchemy Result instance of rows holding every Rule column
+
+        """
+        return await fetch_rows(keyset(select(*Rule.__table__.columns), Rule.id, after, limit))
+
+    def stream_offer_rules(self, after: int = None) -> AsyncIterator[Rule]:
         """
-        Updates an existing rule by id
+        Streams rules from the database sorted by id, fetching them in batches
+        Args:
+            after: Only rules whose id is greater than this one are streamed
+
+        Returns: Asynchronous iterator of Rule Entities
+
+        """
+        return stream_scalars(keyset(select(Rule), Rule.id, after))
+
+    def update_offer_rule(
+            self,
+            id: int,
+            item_code: str = None,
+            name: str = None,
+            description: str = None,
+            firing_condition_operator: str = None,
+            firing_condition_quantity: int = None,
+            effect_type: str = None,
+            effect_percentage: float = None,
+            rounding: str = None
+    ) -> None:
+        """
+        Updates an existing rule by id. Only the given (not None) fields are updated
         Args:
             id: Rule's ID
+            item_code: Rule's new item code
+            name: Rule's new name
+            description: Rule's new description
+            firing_condition_operator: Rule's new firing condition operator
+            firing_condition_quantity: Rule's new firing condition quantity
+            effect_type: Rule's new effect type
+            effect_percentage: Rule's new effect percentage
+            rounding: Rule's new rounding policy (see money.ROUNDING_POLICIES)
 
         Returns: None
 
         """
-        raise NotImplementedError
+        fields = {
+            'item_code': item_code,
+            'name': name,
+            'description': description,
+            'firing_condition_operator': firing_condition_operator,
+            'firing_condition_quantity': firing_condition_quantity,
+            'effect_type': effect_type,
+            'effect_percentage': effect_percentage,
+            'rounding': rounding,
+        }
+
+        with Transaction() as t:
+            rule = t.session.query(Rule).filter_by(id=id).first()
 
-    def delete_rule(self, id):
+            if rule is None:
+                raise RuntimeError(f'No Rule with id {id} was found')
+
+            codes = [code for code in (rule.item_code, item_code) if code is not None]
+            for key, value in fields.items():
+                if value is not None:
+                    setattr(rule, key, value)
+            _reprice_code_totals(t.session, codes)
+        RULE_CATALOGUE.invalidate(id)
+
+    def delete_rule(self, id: int) -> None:
         """
         Deletes an existing rule by id
         Args:
@@ -67,21 +321,44 @@ class RuleService(Transaction):
         Returns: None
 
         """
-        raise NotImplementedError
-
-
-class RuleEngine(Transaction):
-    """ Rules Engine. Applies rules on carts to compute the final price of the cart """
-    def __init__(self, session=None):
+        with Transaction() as t:
+            rule = t.session.query(Rule).filter_by(id=id).first()
+
+            if rule is None:
+                raise RuntimeError(f'No Rule with id {id} was found')
+
+            t.session.delete(rule)
+            _reprice_code_totals(t.session, [rule.item_code])
+        RULE_CATALOGUE.invalidate(id)
+
+
+class RuleEngine(object):
+    """ Rules Engine. Applies rules on carts to compute the final price of the cart. See "notes" for its modes.
+    Notes:
+        - lines (default): every cart line (code, price, quantity) is fetched and rules are resolved line by line
+        - aggregate: a GROUP BY query fetches, per item code, its quantity, base price sum and cheapest unit price.
+          Rules are resolved on those aggregates, so the rows fetched only grow with the number of distinct codes.
+          one_free effects make the cheapest unit of the code free (lines mode frees a unit of the last line)
+    """
+    def __init__(self, catalogue: RuleCatalogue = None, mode: str = PRICING_LINES,
+                 priced_carts: PricedCartCache = None):
         """
         Initializer
         Args:
-            session: SQL Alchemy Session instance
+            catalogue: Rules catalogue cache (compiling rules through the shared compiled rules cache), shared by
+                every engine by default
+            mode: Pricing mode, one of PRICING_MODES
+            priced_carts: Cart total prices cache used by apply, shared by every engine by default
         Notes:
-             Injectable session to aid Inversion of Control (IoC)
+             Injectable catalogue and priced carts caches to aid Inversion of Control (IoC). Engines hold no
+             session: every method opens its own (async) transaction
         """
-        super().__init__()
-        self.session = session if session is not None else build_session()
+        if mode not in PRICING_MODES:
+            raise RuntimeError(f'Unknown pricing mode: {mode}')
+
+        self.catalogue = catalogue if catalogue is not None else RULE_CATALOGUE
+        self.mode = mode
+        self.priced_carts = priced_carts if priced_carts is not None else PRICED_CARTS
 
     async def apply(self, cart_id) -> None:
         """
@@ -89,82 +366,388 @@ class RuleEngine(Transaction):
         Args:
             cart_id: Cart's ID
 
+        Notes:
+            - Carts whose contents were already priced with the current rules are served from the priced carts cache
+            - Latencies of every stage (rules_load, items_load, evaluation, write_back) are recorded as metrics
+
         Returns: None
 
         """
+        start = perf_counter()
+        async with AsyncTransaction() as t:
+            version, plans_by_code = await self.catalogue.get_versioned_async(t.session)
+            rules_loaded = perf_counter()
+            APPLY_STAGE_SECONDS.observe(rules_loaded - start, 'rules_load')
 
-        with Transaction() as t:
-            rules = t.session.query(Rule).all()
-            cart = t.session.query(Cart).filter_by(**{'id': cart_id}).first()
-
+            cart = await t.session.get(Cart, cart_id)
             if cart is None:
                 raise RuntimeError(f'No Cart with id {cart_id} was found')
 
-            items_with_offers = list()
-            applied_offers = list()
-            computed_offers_prices = 0
-            cart_items = [cart_item.item for cart_item in cart.items]
+            rows = (await self._rows_by_cart(t.session, [cart_id])).get(cart_id, [])
+            items_loaded = perf_counter()
+            APPLY_STAGE_SECONDS.observe(items_loaded - rules_loaded, 'items_load')
+
+            fingerprint = self._fingerprint(rows)
+            total = self.priced_carts.get(version, fingerprint)
+            if total is None:
+                total = self._price_rows(rows, plans_by_code)
+                self.priced_carts.put(version, fingerprint, total)
+            evaluated = perf_counter()
+            APPLY_STAGE_SECONDS.observe(evaluated - items_loaded, 'evaluation')
+
+            cart.total_price = total
+        APPLY_STAGE_SECONDS.observe(perf_counter() - evaluated, 'write_back')
+
+    async def apply_many(self, cart_ids: Iterable[int], chunk_size: int = APPLY_MANY_CHUNK_SIZE) -> Dict[int, int]:
+        """
+        Applies existing rules to many carts by id, updating their total prices. See "notes" for its cost.
+        Args:
+            cart_ids: Carts' IDs
+            chunk_size: Number of carts priced (and committed) together
+
+        Notes:
+            - Rules are read once for the whole batch
+            - Each chunk loads its cart lines (or aggregates) with a single query and is written back with a bulk
+              UPDATE
+            - Non existent carts are skipped
+
+        Returns: dict mapping every priced cart id to its new total price
+
+        """
+        async with AsyncTransaction() as t:
+            plans_by_code = await self.catalogue.get_async(t.session)
+
+        cart_ids = list(cart_ids)
+        totals = dict()
+        for start in range(0, len(cart_ids), chunk_size):
+            chunk = cart_ids[start:start + chunk_size]
+            async with AsyncTransaction() as t:
+                rows_by_cart = await self._rows_by_cart(t.session, chunk)
+                chunk_totals = await self._existing_cart_totals(t.session, chunk, plans_by_code, rows_by_cart)
+                await store_totals(t.session, chunk_totals, plans_by_code, {
+                    cart_id: self._code_aggregates(rows) for cart_id, rows in rows_by_cart.items()
+                })
+            totals.update(chunk_totals)
+            RULES_LOGGER.debug('Repriced %d of %d carts', len(totals), len(cart_ids))
+
+        return totals
+
+    async def price_carts(self, cart_ids: List[int], plans_by_code=None) -> Dict[int, int]:
+        """
+        Computes the total price of many carts by id in this engine's mode, within a single query. Nothing is written
+        Args:
+            cart_ids: Carts' IDs, non existent carts are skipped
+            plans_by_code: Compiled rules indexed by item code (see RuleCatalogue), the catalogue ones by default
+
+        Returns: dict mapping every existing cart id to its total price
+
+        """
+        async with AsyncTransaction() as t:
+            plans_by_code = plans_by_code if plans_by_code is not None else await self.catalogue.get_async(t.session)
+            return await self._existing_cart_totals(t.session, cart_ids, plans_by_code)
+
+    async def update_code_total(self, session: AsyncSession, cart_id: int, code: str, price: int,
+                                quantity: int) -> None:
+        """
+        Incrementally reprices a cart once some units of an item were added to (or removed from) it. See "notes".
+        Args:
+            session: SQL Alchemy AsyncSession instance, the one adding or removing the units
+            cart_id: Cart's ID
+            code: Item's code
+            price: Item's price
+            quantity: Number of units added, negative when removed
 
-            for rule in rules:
-                groups = self._sorted_group_by(cart_items, lambda i, r=rule: i.code == r.item_code)
-                for key, group in groups:
-                    if key is True:
-                        list_group = list(group)
-                        if self._rule_firing_evaluator(list_group, rule) is True:
-                            items_with_offers += list_group
-                            new_prices = self._rule_effect_resolver(list_group, rule)
-                            computed_offers_prices += sum(new_prices)
-                            applied_offers.append(rule.name)
+        Notes:
+            - The code's pricing state (CartCodeTotal) is upserted and only its rules are fired again, along with the
+              stale codes of the cart (e.g. bulk generated ones). The only cart line read is the last one of the
+              code, whose unit is the one made free by one_free effects (as lines mode does)
+            - The cart total price is then the sum of its codes contributions
+
+        Returns: None
+
+        """
+        plans_by_code = await self.catalogue.get_async(session)
+        state = (CartCodeTotal.carts_id == cart_id, CartCodeTotal.code == code)
+        last_unit_price = (
+            select(Item.price).join(CartItem, CartItem.items_id == Item.id)
+            .where(CartItem.carts_id == cart_id, Item.code == code)
+            .order_by(CartItem.id.desc()).limit(1).scalar_subquery()
+        )
+        if quantity > 0:
+            insert = insert_on_conflict(session.bind.dialect.name, CartCodeTotal).values(
+                carts_id=cart_id, code=code, quantity=quantity, subtotal=price * quantity,
+                unit_price=func.coalesce(last_unit_price, price)
+            )
+            await session.execute(insert.on_conflict_do_update(
+                index_elements=[CartCodeTotal.carts_id, CartCodeTotal.code],
+                set_={
+                    'quantity': CartCodeTotal.quantity + insert.excluded.quantity,
+                    'subtotal': CartCodeTotal.subtotal + insert.excluded.subtotal,
+                    'unit_price': insert.excluded.unit_price,
+                },
+            ))
+        else:
+            await session.execute(
+                update(CartCodeTotal).where(*state)
+                .values(quantity=CartCodeTotal.quantity + quantity, subtotal=CartCodeTotal.subtotal + price * quantity,
+                        unit_price=func.coalesce(last_unit_price, CartCodeTotal.unit_price))
+                .execution_options(synchronize_session=False)
+            )
+            await session.execute(
+                delete(CartCodeTotal).where(*state, CartCodeTotal.quantity <= 0)
+                .execution_options(synchronize_session=False)
+            )
+
+        rows = await session.execute(
+            select(CartCodeTotal.id, CartCodeTotal.code, CartCodeTotal.quantity, CartCodeTotal.subtotal,
+                   CartCodeTotal.unit_price)
+            .where(CartCodeTotal.carts_id == cart_id, or_(CartCodeTotal.code == code, CartCodeTotal.total.is_(None)))
+        )
+        for state_id, state_code, *aggregate in rows.all():
+            await session.execute(
+                update(CartCodeTotal).where(CartCodeTotal.id == state_id)
+                .values(total=self._price_code(state_code, *aggregate, plans_by_code))
+                .execution_options(synchronize_session=False)
+            )
+
+        total = await session.scalar(select(func.sum(CartCodeTotal.total)).where(CartCodeTotal.carts_id == cart_id))
+        await session.execute(
+            update(Cart).where(Cart.id == cart_id).values(total_price=total or 0)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def check_totals(self, cart_ids: Iterable[int],
+                           chunk_size: int = APPLY_MANY_CHUNK_SIZE) -> Dict[int, Tuple[int, int]]:
+        """
+        Consistency checker: compares the stored (incrementally maintained) cart total prices against a full
+        repricing in this engine's mode. Nothing is written
+        Args:
+            cart_ids: Carts' IDs
+            chunk_size: Number of carts checked together
 
-            items_with_no_offers = [item for item in cart_items if item not in items_with_offers]
-            computed_offers_prices += sum([item.price for item in items_with_no_offers])
+        Notes:
+            - Incremental pricing frees the unit of the last line of a code, check in lines mode for an exact match
 
-            cart.total_price = round(computed_offers_prices, 2)
+        Returns: dict mapping the id of every inconsistent cart to its (stored, expected) total prices
 
-    def _sorted_group_by(self, iterable, expression):
         """
-        This method exist because of this reason: https://docs.python.org/3/library/itertools.html#itertools.groupby
-        Assure grouping works irrespectively of the given iterable, previously sorting the iterable with the same
-        expression used by the group by
+        cart_ids = list(cart_ids)
+        mismatches = dict()
+        async with AsyncTransaction() as t:
+            plans_by_code = await self.catalogue.get_async(t.session)
+            for start in range(0, len(cart_ids), chunk_size):
+                chunk = cart_ids[start:start + chunk_size]
+                stored = await t.session.execute(select(Cart.id, Cart.total_price).filter(Cart.id.in_(chunk)))
+                expected = await self._price_carts(t.session, chunk, plans_by_code)
+                mismatches.update({cart_id: (total, expected.get(cart_id, 0)) for cart_id, total in stored
+                                   if total != expected.get(cart_id, 0)})
+
+        return mismatches
+
+    async def _existing_cart_totals(self, session: AsyncSession, cart_ids: List[int], plans_by_code,
+                                    rows_by_cart: Dict[int, List[tuple]] = None) -> Dict[int, int]:
+        """
+        Computes the final price of the existing carts among the given ones (see price_carts)
         Args:
-            iterable: Iterable
-            expression: Expression
+            session: SQL Alchemy AsyncSession instance
+            cart_ids: Carts' IDs
+            plans_by_code: Compiled rules indexed by item code (see RuleCatalogue)
+            rows_by_cart: Pricing rows of those carts already fetched (see rows_by_cart), fetched when missing
 
-        Returns: Iterator
+        Returns: dict mapping every existing cart id to its total price, 0 for carts holding no line
 
         """
-        return groupby(sorted(iterable, key=expression), expression)
+        carts = await session.execute(select(Cart.id).filter(Cart.id.in_(cart_ids)))
+        if rows_by_cart is None:
+            priced = await self._price_carts(session, cart_ids, plans_by_code)
+        else:
+            priced = {cart_id: self._price_rows(rows, plans_by_code) for cart_id, rows in rows_by_cart.items()}
+        return {cart_id: priced.get(cart_id, 0) for (cart_id,) in carts}
 
-    def _rule_firing_evaluator(self, items, rule) -> bool:
+    async def _price_carts(self, session: AsyncSession, cart_ids: List[int], plans_by_code) -> Dict[int, int]:
         """
-        Wether a rule must be fired or not, this method computes the rule precondition returning True if the rule must
-        be applied or False otherwise
+        Computes the final price of the given carts according to this engine's mode
         Args:
-            items: List of Item Entities
-            rule: Rule Entity
+            session: SQL Alchemy AsyncSession instance
+            cart_ids: Carts' IDs
+            plans_by_code: Compiled rules indexed by item code (see RuleCatalogue)
 
-        Returns: bool
+        Returns: dict mapping the id of every cart holding at least one line to its total price
 
         """
-        return eval(f'{len(items)} {rule.firing_condition_operator} {rule.firing_condition_quantity}')
+        rows_by_cart = await self._rows_by_cart(session, cart_ids)
+        return {cart_id: self._price_rows(rows, plans_by_code) for cart_id, rows in rows_by_cart.items()}
 
-    def _rule_effect_resolver(self, items, rule):
+    async def _rows_by_cart(self, session: AsyncSession, cart_ids: List[int]) -> Dict[int, List[tuple]]:
         """
-        Applies the rule to the given set of items and computes what price should add this items to the Cart
+        Fetches the pricing rows of the given carts according to this engine's mode
         Args:
-            items: List of Item Entities
-            rule: Rule Entity
+            session: SQL Alchemy AsyncSession instance
+            cart_ids: Carts' IDs
 
-        Returns: List of int
+        Returns: dict mapping the id of every cart holding at least one line to its (code, price, quantity) lines,
+            or to its (code, quantity, base price sum, cheapest unit price) aggregates in aggregate mode
 
         """
-        new_prices = list()
-        if rule.effect_type == 'update_prices':
-            new_prices = [item.price - (item.price * rule.effect_percentage) for item in items]
-        elif rule.effect_type == 'one_free':
-            new_prices = [item.price for item in items]
-            new_prices.pop()
+        if self.mode == PRICING_AGGREGATE:
+            statement = self._aggregates_statement(cart_ids)
         else:
-            raise RuntimeError(f'Unknown effect type: {rule.effect_type}')
+            statement = self._lines_statement(cart_ids)
+
+        rows_by_cart = dict()
+        for cart_id, *row in await session.execute(statement):
+            rows_by_cart.setdefault(cart_id, []).append(tuple(row))
+        return rows_by_cart
+
+    def _price_rows(self, rows: List[tuple], plans_by_code) -> int:
+        """
+        Computes the final price of a cart from its pricing rows (see rows_by_cart)
+        Args:
+            rows: Cart pricing rows
+            plans_by_code: Compiled rules indexed by item code (see RuleCatalogue)
 
-        return new_prices
+        Returns: int, cents
+
+        """
+        if self.mode == PRICING_AGGREGATE:
+            return self._price_aggregates({code: aggregate for code, *aggregate in rows}, plans_by_code)
+        return self._price(self._bucket_by_code(rows), plans_by_code)
+
+    def _code_aggregates(self, rows: List[tuple]) -> Dict[str, Tuple[int, int, int]]:
+        """
+        Computes the per item code aggregates of a cart from its pricing rows (see rows_by_cart), as stored by its
+        incremental pricing states
+        Args:
+            rows: Cart pricing rows
+
+        Returns: dict mapping item code to its (quantity, base price sum, unit price), the unit price being the one of
+            the last line of the code in lines mode and the cheapest one in aggregate mode
+
+        """
+        if self.mode == PRICING_AGGREGATE:
+            return {code: tuple(aggregate) for code, *aggregate in rows}
+
+        aggregates = dict()
+        for code, price, quantity in rows:
+            code_quantity, subtotal, _ = aggregates.get(code, (0, 0, price))
+            aggregates[code] = (code_quantity + quantity, subtotal + price * quantity, price)
+        return aggregates
+
+    def _fingerprint(self, rows: List[tuple]) -> Hashable:
+        """
+        Cheap fingerprint of a cart contents: its pricing rows as a sorted multiset (prices included, so a price
+        change is a different cart)
+        Args:
+            rows: Cart pricing rows (see rows_by_cart)
+
+        Returns: Hashable fingerprint
+
+        """
+        return self.mode, tuple(sorted(rows))
+
+    @staticmethod
+    def _aggregates_statement(cart_ids: List[int]) -> Select:
+        """
+        Builds the statement selecting the (cart id, item code, quantity, base price sum, cheapest unit price)
+        aggregates of the given carts, one row per cart and item code
+        Args:
+            cart_ids: Carts' IDs
+
+        Returns: SQL Alchemy Select instance
+
+        """
+        return (
+            select(CartItem.carts_id, Item.code, func.sum(CartItem.quantity),
+                   func.sum(Item.price * CartItem.quantity), func.min(Item.price))
+            .join(Item, CartItem.items_id == Item.id)
+            .filter(CartItem.carts_id.in_(cart_ids))
+            .group_by(CartItem.carts_id, Item.code)
+        )
+
+    @staticmethod
+    def _lines_statement(cart_ids: List[int]) -> Select:
+        """
+        Builds the statement selecting the (cart id, item code, price, quantity) lines of the given carts
+        Args:
+            cart_ids: Carts' IDs
+
+        Returns: SQL Alchemy Select instance
+
+        """
+        return (
+            select(CartItem.carts_id, Item.code, Item.price, CartItem.quantity)
+            .join(Item, CartItem.items_id == Item.id)
+            .filter(CartItem.carts_id.in_(cart_ids))
+            .order_by(CartItem.id)
+        )
+
+    def _price(self, lines_by_code: Dict[str, List[Line]], plans_by_code) -> int:
+        """
+        Computes the final price of a cart, firing every applicable rule
+        Args:
+            lines_by_code: Cart lines bucketed by item code (see bucket_by_code)
+            plans_by_code: Compiled rules indexed by item code (see RuleCatalogue)
+
+        Notes:
+            - Cost grows with the number of distinct items, not with their quantities: rules are fired on the
+              quantity of each code and their effects priced per line (price * quantity)
+            - Prices are integer cents, so the total is exact: rounding only happens within rule effects
+
+        Returns: int, cents
+
+        """
+        total_price = 0
+        for code, lines in lines_by_code.items():
+            quantity = sum(line_quantity for _, line_quantity in lines)
+            fired = False
+            for plan in plans_by_code.get(code, ()):
+                if plan.fires(quantity) is True:
+                    total_price += sum(price * line_quantity for price, line_quantity in plan.resolve(lines))
+                    fired = True
+
+            if fired is False:
+                total_price += sum(price * line_quantity for price, line_quantity in lines)
+
+        return total_price
+
+    def _price_aggregates(self, aggregates_by_code: Dict[str, Tuple[int, int, int]], plans_by_code) -> int:
+        """
+        Computes the final price of a cart from its per item code aggregates, firing every applicable rule
+        Args:
+            aggregates_by_code: dict mapping item code to its (quantity, base price sum, cheapest unit price)
+            plans_by_code: Compiled rules indexed by item code (see RuleCatalogue)
+
+        Returns: int, cents
+
+        """
+        return sum(self._price_code(code, quantity, subtotal, unit_price, plans_by_code)
+                   for code, (quantity, subtotal, unit_price) in aggregates_by_code.items())
+
+    def _price_code(self, code: str, quantity: int, subtotal: int, unit_price: int, plans_by_code) -> int:
+        """
+        Computes the contribution of an item code to its cart total price, firing every applicable rule
+        Args:
+            code: Item code
+            quantity: Number of units of the code
+            subtotal: Sum of the base prices of every unit of the code
+            unit_price: Cheapest unit price of the code
+            plans_by_code: Compiled rules indexed by item code (see RuleCatalogue)
+
+        Returns: int, cents
+
+        """
+        return _price_code_total(plans_by_code.get(code, ()), quantity, subtotal, unit_price)
+
+    def _bucket_by_code(self, lines: Iterable[Tuple[str, int, int]]) -> Dict[str, List[Line]]:
+        """
+        Groups cart lines by item code in a single pass, keeping the order in which codes were first seen
+        Args:
+            lines: Iterable of (item code, price, quantity) cart lines
+
+        Returns: dict mapping item code to the list of its (price, quantity) lines
+
+        """
+        buckets = dict()
+        for code, price, quantity in lines:
+            buckets.setdefault(code, []).append((price, quantity))
+        return buckets
@@ -1,8 +1,12 @@
 """ Use case: CRUD operations for the User Entity """
-from sqlalchemy.orm import Query
+from typing import AsyncIterator, Callable
+from sqlalchemy import select
+from sqlalchemy.engine import ScalarResult
+from sqlalchemy.orm import Query, selectinload
 
 from ..domain.user_entity import User
-from ..infrastructure.database.transaction import Transaction
+from ..infrastructure.database.pagination import keyset
+from ..infrastructure.database.transaction import AsyncTransaction, Transaction, stream_scalars
 
 
 class UserService(object):
@@ -34,14 +38,46 @@ class UserService(object):
         with Transaction() as t:
             return t.session.query(User).filter_by(**filter_params)
 
-    async def read_users(self) -> Query:
+    async def read_users(self, loader: Callable = selectinload, after: int = None, limit: int = None) -> ScalarResult:
         """
-        Retrieves all users from the database
-        Returns: SQL Alchemy Query instance
+        Retrieves users from the database sorted by id, paginated by id if requested
+        Args:
+            loader: SQL Alchemy loader strategy (selectinload, joinedload...) for the users cart. None to leave it
+                unloaded
+            after: Only users whose id is greater than this one are retrieved
+            limit: Maximum number of users to retrieve, None (default) to retrieve all of them
+
+        Returns: SQL Alchemy ScalarResult instance
 
         """
-        with Transaction() as t:
-            return t.session.query(User)
+        async with AsyncTransaction() as t:
+            result = await t.session.execute(keyset(self._load_cart(select(User), loader), User.id, after, limit))
+            return result.unique().scalars()
+
+    def stream_users(self, loader: Callable = selectinload, after: int = None) -> AsyncIterator[User]:
+        """
+        Streams users from the database sorted by id, fetching them in batches
+        Args:
+            loader: SQL Alchemy loader strategy for the users cart (selectinload, the default, is batch friendly)
+            after: Only users whose id is greater than this one are streamed
+
+        Returns: Asynchronous iterator of User Entities
+
+        """
+        return stream_scalars(keyset(self._load_cart(select(User), loader), User.id, after))
+
+    @staticmethod
+    def _load_cart(statement, loader: Callable = None):
+        """
+        Applies the given loader strategy to the users cart, avoiding a query per user
+        Args:
+            statement: User select statement
+            loader: SQL Alchemy loader strategy, None to leave it unloaded
+
+        Returns: SQL Alchemy Select instance
+
+        """
+        return statement if loader is None else statement.options(loader(User.cart))
 
     def update_user(self, user_id: int, name: str = None, fullname: str = None, nickname: str = None) -> None:
         """
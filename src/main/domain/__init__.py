@@ -1,7 +1,8 @@
 """ Domain Layer. Chosen modelling tool is sqlalchemy, so declarative base definition goes here """
-from typing import Dict
-from sqlalchemy import inspect
-from sqlalchemy.orm import declarative_base
+from operator import attrgetter, itemgetter
+from typing import Callable, Dict, Iterable, List, Tuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Mapper, declarative_base
 
 from ..infrastructure.logging.logger import LOGGER
 
@@ -35,7 +36,20 @@ class Entity(object):
         Returns: dict representing User Entity
 
         """
-        return {c.key: getattr(self, c.key) for c in inspect(self).mapper.column_attrs}
+        keys, values = self._columns()
+        return dict(zip(keys, values(self)))
+
+    @classmethod
+    def _columns(cls) -> Tuple[Tuple[str, ...], Callable[['Entity'], Tuple]]:
+        """
+        Column keys of this class and an accessor returning their values, compiled once per class
+        Returns: Tuple of the column keys tuple and the values accessor
+
+        """
+        columns = cls.__dict__.get('_compiled_columns')
+        if columns is None:
+            columns = _compile_columns(inspect(cls), cls)
+        return columns
 
     @classmethod
     def enroll(cls) -> None:
@@ -45,3 +59,59 @@ class Entity(object):
 
         """
         LOGGER.debug(f'Enrolling {cls.__name__}')
+
+
+def _compile_columns(mapper: Mapper, cls) -> Tuple[Tuple[str, ...], Callable[[Entity], Tuple]]:
+    """
+    Compiles the column keys of a mapped Entity class and an accessor returning their values as a tuple
+    Args:
+        mapper: Mapper of the class
+        cls: Mapped Entity class
+
+    Notes:
+        - Loaded values are read straight from the instance __dict__, skipping SQL Alchemy's attribute instrumentation
+        - Entities with unloaded (expired, deferred or never set) columns fall back to attribute access, which loads
+          them or defaults them to None as usual
+
+    Returns: Tuple of the column keys tuple and the values accessor
+
+    """
+    keys = tuple(column.key for column in mapper.column_attrs)
+    loaded, attributes = itemgetter(*keys), attrgetter(*keys)
+    if len(keys) == 1:
+        loaded, attributes = (lambda values, _get=loaded: (_get(values),)), (lambda e, _get=attributes: (_get(e),))
+
+    def values(entity: Entity) -> Tuple:
+        try:
+            return loaded(entity.__dict__)
+        except KeyError:
+            return attributes(entity)
+
+    cls._compiled_columns = (keys, values)
+    return cls._compiled_columns
+
+
+@event.listens_for(Mapper, 'mapper_configured')
+def _on_mapper_configured(mapper: Mapper, cls) -> None:
+    """ Compiles the columns of every Entity once its mapper is configured, so to_dict never inspects the mapper """
+    if issubclass(cls, Entity):
+        _compile_columns(mapper, cls)
+
+
+def to_dicts(entities: Iterable[Entity]) -> List[Dict]:
+    """
+    Bulk counterpart of Entity.to_dict, for serialising result lists
+    Args:
+        entities: Iterable of Entities, usually of the same class
+
+    Returns: List of dicts
+
+    """
+    dicts = []
+    entity_class = keys = values = None
+    for entity in entities:
+        if entity.__class__ is not entity_class:
+            entity_class = entity.__class__
+            keys, values = entity_class._columns()
+        dicts.append(dict(zip(keys, values(entity))))
+    return dicts
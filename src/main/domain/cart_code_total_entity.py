@@ -0,0 +1,25 @@
+""" CartCodeTotal Entity module """
+from sqlalchemy import Column, ForeignKey, Integer, String, UniqueConstraint
+from . import Base, Entity
+
+
+class CartCodeTotal(Base, Entity):
+    """ Incremental pricing state of a cart: one row per item code held by the cart. See "notes" for its columns.
+    Notes:
+        - quantity, subtotal and unit_price aggregate the cart lines of the code (units, base price sum, unit price
+          of its last line), they are kept up to date by every add to or remove from cart
+        - total is the code's contribution to the cart total price once its rules are fired, recomputed by every add
+          to or remove from cart and by every write of the code's rules. None when stale (inserted unpriced, e.g. by
+          Prefill.generate)
+        - subtotal, unit_price and total are in cents (see money module)
+    """
+    __tablename__ = 'cart_code_totals'
+    __table_args__ = (UniqueConstraint('carts_id', 'code'),)
+
+    id = Column(Integer, primary_key=True)
+    carts_id = Column(ForeignKey('carts.id'), nullable=False)
+    code = Column(String, nullable=False, index=True)
+    quantity = Column(Integer, nullable=False)
+    subtotal = Column(Integer, nullable=False)
+    unit_price = Column(Integer, nullable=False)
+    total = Column(Integer)
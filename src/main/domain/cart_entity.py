@@ -1,15 +1,18 @@
 """ Cart Entity module """
-from sqlalchemy import Column, Integer, Float, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey
 from sqlalchemy.orm import relationship, backref
 from . import Base, Entity
 
 
 class Cart(Base, Entity):
-    """ Shopping Cart Entity definition """
+    """ Shopping Cart Entity definition
+    Notes:
+        - total_price is in cents (see money module)
+    """
     __tablename__ = 'carts'
 
     id = Column(Integer, primary_key=True)
-    total_price = Column(Float, default=0.0)
-    user_id = Column(Integer, ForeignKey('users.id'))
+    total_price = Column(Integer, default=0)
+    user_id = Column(Integer, ForeignKey('users.id'), index=True)
     user = relationship('User', back_populates='cart')
     items = relationship('CartItem', back_populates='cart')
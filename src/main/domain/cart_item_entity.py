@@ -1,15 +1,20 @@
 """ CartItem Entity module """
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from . import Base, Entity
 
 
 class CartItem(Base, Entity):
-    """ Shopping Cart - Item Relationship Entity definition """
+    """ Shopping Cart - Item Relationship Entity definition: one line per distinct item in a cart, with its quantity
+    Notes:
+        - Lookups by carts_id (cart loads) are served by the unique constraint index, whose leading column it is
+    """
     __tablename__ = 'items_to_carts'
+    __table_args__ = (UniqueConstraint('carts_id', 'items_id'),)
 
     id = Column(Integer, primary_key=True)
-    items_id = Column(ForeignKey('items.id'))
+    items_id = Column(ForeignKey('items.id'), index=True)
     carts_id = Column(ForeignKey('carts.id'))
+    quantity = Column(Integer, nullable=False, default=1, server_default='1')
     item = relationship('Item', back_populates='carts')
     cart = relationship('Cart', back_populates='items')
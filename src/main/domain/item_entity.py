@@ -6,11 +6,14 @@ from . import Base, Entity
 
 
 class Item(Base, Entity):
-    """ User Entity definition """
+    """ Item Entity definition
+    Notes:
+        - price is in cents (see money module)
+    """
     __tablename__ = 'items'
 
     id = Column(Integer, primary_key=True)
-    code = Column(String)
+    code = Column(String, index=True)
     name = Column(String)
     price = Column(Integer)
     carts = relationship('CartItem', back_populates='item')
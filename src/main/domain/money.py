@@ -0,0 +1,89 @@
+""" Money module: amounts are integer cents (minor currency units), rates are fixed point integers. See "notes".
+Notes:
+    - Every price and total of the domain is an integer number of cents, so they are summed exactly
+    - Fractional results (e.g. a discounted subtotal) are rounded back to cents by an explicit rounding policy
+    - Rounding policies only use integer division and comparisons, so they also apply elementwise to integer arrays
+"""
+from typing import Callable, Dict
+
+CENTS = 100
+
+# Fixed point scale of rates (percentages): rates with up to 9 decimals are represented exactly
+RATE_SCALE = 10 ** 9
+
+ROUND_HALF_EVEN = 'half_even'
+ROUND_HALF_UP = 'half_up'
+ROUND_DOWN = 'down'
+ROUND_UP = 'up'
+DEFAULT_ROUNDING = ROUND_HALF_EVEN
+
+
+def to_cents(amount: float) -> int:
+    """
+    Converts an amount in currency units to cents
+    Args:
+        amount: Amount in currency units (e.g. 3.11)
+
+    Returns: int, the amount in cents rounded half to even (e.g. 311)
+
+    """
+    return round(amount * CENTS)
+
+
+def to_rate(percentage: float) -> int:
+    """
+    Converts a percentage to a fixed point rate
+    Args:
+        percentage: Percentage as a ratio (0.1 means 10%)
+
+    Returns: int, the percentage scaled by RATE_SCALE
+
+    """
+    return round((percentage or 0) * RATE_SCALE)
+
+
+def _half_even(numerator, denominator):
+    """ Rounds numerator / denominator to the nearest integer, ties to the even one """
+    quotient, remainder = divmod(numerator, denominator)
+    return quotient + ((2 * remainder > denominator) | ((2 * remainder == denominator) & (quotient % 2 == 1)))
+
+
+def _half_up(numerator, denominator):
+    """ Rounds numerator / denominator to the nearest integer, ties upwards """
+    quotient, remainder = divmod(numerator, denominator)
+    return quotient + (2 * remainder >= denominator)
+
+
+def _down(numerator, denominator):
+    """ Rounds numerator / denominator downwards (floor) """
+    return numerator // denominator
+
+
+def _up(numerator, denominator):
+    """ Rounds numerator / denominator upwards (ceiling) """
+    return -(-numerator // denominator)
+
+
+ROUNDING_POLICIES: Dict[str, Callable] = {
+    ROUND_HALF_EVEN: _half_even,
+    ROUND_HALF_UP: _half_up,
+    ROUND_DOWN: _down,
+    ROUND_UP: _up,
+}
+
+
+def apply_rate(amount, rate: int, rounding: str = DEFAULT_ROUNDING):
+    """
+    Multiplies cents by a fixed point rate, rounding the result back to cents
+    Args:
+        amount: Cents, an int or an integer array (every element is rounded on its own)
+        rate: Fixed point rate (see to_rate), RATE_SCALE keeps the amount as is
+        rounding: Rounding policy name, one of ROUNDING_POLICIES
+
+    Returns: Cents, of the same kind as amount
+
+    """
+    if rounding not in ROUNDING_POLICIES:
+        raise RuntimeError(f'Unknown rounding policy: {rounding}')
+
+    return ROUNDING_POLICIES[rounding](amount * rate, RATE_SCALE)
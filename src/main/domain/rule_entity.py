@@ -1,17 +1,26 @@
 """ Rule Entity module """
 from sqlalchemy import Column, Integer, String, Float
 from . import Base, Entity
+from .money import DEFAULT_ROUNDING
 
 
 class Rule(Base, Entity):
-    """ Rule Entity definition """
+    """ Rule Entity definition
+    Notes:
+        - version is managed by SQL Alchemy and increased on every update, so compiled rules can be cached safely
+        - rounding is the policy rounding discounted amounts back to cents, one of money.ROUNDING_POLICIES
+    """
     __tablename__ = 'rules'
 
     id = Column(Integer, primary_key=True)
-    item_code = Column(String)
+    item_code = Column(String, index=True)
     name = Column(String)
     description = Column(String)
     firing_condition_operator = Column(String)
     firing_condition_quantity = Column(Integer)
     effect_type = Column(String)
     effect_percentage = Column(Float)
+    rounding = Column(String, nullable=False, default=DEFAULT_ROUNDING, server_default=DEFAULT_ROUNDING)
+    version = Column(Integer, nullable=False)
+
+    __mapper_args__ = {'version_id_col': version}
@@ -0,0 +1,274 @@
+""" Schema migrations module: versioned, forward only upgrades of the database schema """
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Set
+
+from sqlalchemy import Column, DateTime, Integer, String, Table, func, inspect, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateTable
+
+from ..logging.logger import DB_LOGGER
+from ...domain import Base
+from ...domain.money import CENTS, DEFAULT_ROUNDING
+
+
+class Migration(NamedTuple):
+    """ A schema upgrade step: its version, a description and the function applying it """
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+# Applied migrations. Part of the domain metadata, so it is created and dropped along every other table
+SCHEMA_MIGRATIONS = Table(
+    'schema_migrations', Base.metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String, nullable=False),
+    Column('applied_at', DateTime, nullable=False, server_default=func.current_timestamp()),
+)
+
+
+def _baseline(connection: Connection) -> None:
+    """
+    Version 1: the schema as it stood when migrations were introduced. See "notes".
+    Args:
+        connection: SQL Alchemy Connection
+
+    Notes:
+        - Databases created before migrations existed may predate cart line quantities, rule versions and cart code
+          totals, whatever they miss is added. Every step is skipped when already applied
+        - Missing tables are created with their current definition (create_all). Cart code totals are backfilled
+          from the cart lines, stale (total None) so they are priced by the next write of their cart
+
+    Returns: None
+
+    """
+    _add_line_quantities(connection)
+    _add_rule_versions(connection)
+    backfill_code_totals = not inspect(connection).has_table('cart_code_totals')
+    Base.metadata.create_all(connection, checkfirst=True)
+    if backfill_code_totals:
+        _backfill_code_totals(connection)
+
+
+def _column_names(connection: Connection, table_name: str) -> Set[str]:
+    """ Names of the columns of an existing table """
+    return {column['name'] for column in inspect(connection).get_columns(table_name)}
+
+
+def _add_line_quantities(connection: Connection) -> None:
+    """
+    Cart lines get their quantity: one line per unit become one line per distinct item in a cart. See "notes".
+    Args:
+        connection: SQL Alchemy Connection
+
+    Notes:
+        - Lines of the same item in the same cart are merged into the first one, quantity being their count
+        - (carts_id, items_id) becomes unique
+        - SQLite can not add constraints, so the table is rebuilt (see _rebuild_sqlite_table)
+
+    Returns: None
+
+    """
+    if not inspect(connection).has_table('items_to_carts'):
+        return
+    if 'quantity' in _column_names(connection, 'items_to_carts'):
+        return
+
+    if connection.dialect.name == 'sqlite':
+        _rebuild_sqlite_table(connection, Base.metadata.tables['items_to_carts'],
+                              {'id': 'MIN(id)', 'quantity': 'COUNT(*)'}, group_by=('carts_id', 'items_id'))
+    elif connection.dialect.name == 'postgresql':
+        connection.exec_driver_sql('ALTER TABLE items_to_carts ADD COLUMN quantity INTEGER NOT NULL DEFAULT 1')
+        connection.exec_driver_sql(
+            'UPDATE items_to_carts SET quantity = merged.quantity FROM (SELECT MIN(id) AS id, COUNT(*) AS quantity '
+            'FROM items_to_carts GROUP BY carts_id, items_id) AS merged WHERE items_to_carts.id = merged.id'
+        )
+        connection.exec_driver_sql(
+            'DELETE FROM items_to_carts WHERE id NOT IN '
+            '(SELECT MIN(id) FROM items_to_carts GROUP BY carts_id, items_id)'
+        )
+        connection.exec_driver_sql('ALTER TABLE items_to_carts ADD UNIQUE (carts_id, items_id)')
+    else:
+        raise RuntimeError(f'Cart lines migration is not supported by the {connection.dialect.name} dialect')
+
+
+def _backfill_code_totals(connection: Connection) -> None:
+    """
+    Inserts the incremental pricing state (see CartCodeTotal entity) of every cart and item code held, stale
+    Args:
+        connection: SQL Alchemy Connection
+
+    Returns: None
+
+    """
+    lines, items, code_totals = (Base.metadata.tables[name] for name in ('items_to_carts', 'items', 'cart_code_totals'))
+    connection.execute(code_totals.insert().from_select(
+        ['carts_id', 'code', 'quantity', 'subtotal', 'unit_price'],
+        select(lines.c.carts_id, items.c.code, func.sum(lines.c.quantity), func.sum(items.c.price * lines.c.quantity),
+               func.min(items.c.price))
+        .select_from(lines.join(items, lines.c.items_id == items.c.id))
+        .where(lines.c.carts_id.is_not(None), items.c.code.is_not(None))
+        .group_by(lines.c.carts_id, items.c.code)
+    ))
+
+
+def _add_rule_versions(connection: Connection) -> None:
+    """
+    Rules get their version (see Rule entity), existing rules start at 1
+    Args:
+        connection: SQL Alchemy Connection
+
+    Returns: None
+
+    """
+    if inspect(connection).has_table('rules') and 'version' not in _column_names(connection, 'rules'):
+        connection.exec_driver_sql('ALTER TABLE rules ADD COLUMN version INTEGER NOT NULL DEFAULT 1')
+
+
+def _index_lookup_columns(connection: Connection) -> None:
+    """ Version 2: indexes on the hot lookup columns (cart lines by item, items and rules by code, carts by user) """
+    for table_name, column_name in (('items_to_carts', 'items_id'), ('items', 'code'), ('rules', 'item_code'),
+                                    ('carts', 'user_id')):
+        for index in Base.metadata.tables[table_name].indexes:
+            if [column.name for column in index.columns] == [column_name]:
+                index.create(connection, checkfirst=True)
+
+
+# Columns holding money, as currency units up to version 3 and as integer cents since then
+MONEY_COLUMNS = {
+    'items': ('price',),
+    'carts': ('total_price',),
+    'cart_code_totals': ('subtotal', 'unit_price', 'total'),
+}
+
+
+def _money_in_cents(connection: Connection) -> None:
+    """
+    Version 3: money columns become integer cents and rules get their rounding policy. See "notes".
+    Args:
+        connection: SQL Alchemy Connection
+
+    Notes:
+        - Databases already holding rules.rounding were created with this schema, they are left as they are
+        - Amounts are converted to cents rounding half away from zero (SQL ROUND)
+        - SQLite can not alter column types, so money tables are rebuilt (see _rebuild_sqlite_table)
+
+    Returns: None
+
+    """
+    if 'rounding' in _column_names(connection, 'rules'):
+        return
+
+    connection.exec_driver_sql(
+        f"ALTER TABLE rules ADD COLUMN rounding VARCHAR NOT NULL DEFAULT '{DEFAULT_ROUNDING}'"
+    )
+    for table_name, column_names in MONEY_COLUMNS.items():
+        cents = {column_name: f'CAST(ROUND({column_name} * {CENTS}) AS INTEGER)' for column_name in column_names}
+        if connection.dialect.name == 'sqlite':
+            _rebuild_sqlite_table(connection, Base.metadata.tables[table_name], cents)
+        elif connection.dialect.name == 'postgresql':
+            for column_name, expression in cents.items():
+                connection.exec_driver_sql(
+                    f'ALTER TABLE {table_name} ALTER COLUMN {column_name} TYPE INTEGER USING {expression}'
+                )
+        else:
+            raise RuntimeError(f'Money migration is not supported by the {connection.dialect.name} dialect')
+
+
+def _rebuild_sqlite_table(connection: Connection, table: Table, expressions: Dict[str, str],
+                          group_by: Sequence[str] = ()) -> None:
+    """
+    Recreates a SQLite table with its current definition, copying its rows over (foreign keys must be off)
+    Args:
+        connection: SQL Alchemy Connection
+        table: Table, as currently defined
+        expressions: SQL expressions computing the new value of some columns from the old row, by column name
+        group_by: Old columns whose rows are merged into a single new row, expressions must aggregate the others
+
+    Returns: None
+
+    """
+    staging = f'_{table.name}_rebuilt'
+    ddl = str(CreateTable(table).compile(dialect=connection.dialect))
+    connection.exec_driver_sql(ddl.replace(f'CREATE TABLE {table.name} (', f'CREATE TABLE {staging} (', 1))
+
+    column_names = [column.name for column in table.columns]
+    values = [expressions.get(column_name, column_name) for column_name in column_names]
+    grouping = f' GROUP BY {", ".join(group_by)}' if group_by else ''
+    connection.exec_driver_sql(
+        f'INSERT INTO {staging} ({", ".join(column_names)}) SELECT {", ".join(values)} FROM {table.name}{grouping}'
+    )
+    connection.exec_driver_sql(f'DROP TABLE {table.name}')
+    connection.exec_driver_sql(f'ALTER TABLE {staging} RENAME TO {table.name}')
+    for index in table.indexes:
+        index.create(connection)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, 'Baseline schema', _baseline),
+    Migration(2, 'Index hot lookup columns', _index_lookup_columns),
+    Migration(3, 'Money as integer cents, rules rounding policy', _money_in_cents),
+]
+
+
+def current_version(connection: Connection) -> Optional[int]:
+    """
+    Retrieves the schema version of a database
+    Args:
+        connection: SQL Alchemy Connection
+
+    Returns: Latest applied migration version, None for unversioned databases
+
+    """
+    if not inspect(connection).has_table(SCHEMA_MIGRATIONS.name):
+        return None
+    return connection.scalar(select(func.max(SCHEMA_MIGRATIONS.c.version)))
+
+
+def upgrade(engine: Engine, migrations: List[Migration] = None) -> int:
+    """
+    Brings a database schema up to date, within a single transaction. See "notes" for the starting points.
+    Args:
+        engine: SQL Alchemy Engine
+        migrations: Migrations sorted by version, MIGRATIONS by default
+
+    Notes:
+        - Empty databases get the current schema at once (create_all) and every migration is recorded as applied
+        - Databases created before migrations existed are upgraded from the baseline (version 1) on
+        - Versioned databases get the migrations newer than their version applied, in order
+
+    Returns: Schema version after the upgrade
+
+    """
+    migrations = migrations if migrations is not None else MIGRATIONS
+    with engine.begin() as connection:
+        version = current_version(connection)
+        if version is None and inspect(connection).get_table_names():
+            SCHEMA_MIGRATIONS.create(connection)
+            version = 0
+        elif version is None:
+            Base.metadata.create_all(connection)
+            version = _record(connection, migrations)
+
+        pending = [migration for migration in migrations if migration.version > version]
+        for migration in pending:
+            DB_LOGGER.info('Applying schema migration %d: %s', migration.version, migration.description)
+            migration.upgrade(connection)
+            _record(connection, [migration])
+
+        return current_version(connection)
+
+
+def _record(connection: Connection, migrations: List[Migration]) -> int:
+    """
+    Records migrations as applied
+    Args:
+        connection: SQL Alchemy Connection
+        migrations: Applied migrations, sorted by version
+
+    Returns: Version of the last recorded migration
+
+    """
+    connection.execute(SCHEMA_MIGRATIONS.insert(), [
+        {'version': migration.version, 'description': migration.description} for migration in migrations
+    ])
+    return migrations[-1].version
@@ -0,0 +1,28 @@
+""" Keyset pagination module """
+from typing import TypeVar
+from sqlalchemy import Column
+
+Statement = TypeVar('Statement')
+
+
+def keyset(query: Statement, key: Column, after: int = None, limit: int = None) -> Statement:
+    """
+    Paginates a query by a unique, sortable column (keyset or cursor pagination)
+    Args:
+        query: SQL Alchemy Query or Select instance
+        key: Unique column to sort and paginate by (usually the primary key)
+        after: Only rows whose key is greater than this one are retrieved (the last key of the previous page)
+        limit: Maximum number of rows to retrieve, None for no limit
+
+    Notes:
+        - Unlike OFFSET, the database seeks straight to the first row of the page, so every page costs the same
+
+    Returns: SQL Alchemy Query or Select instance (same type as the given one)
+
+    """
+    query = query.order_by(key)
+    if after is not None:
+        query = query.filter(key > after)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
@@ -0,0 +1,245 @@
+""" SQL statement profiler module: per statement latencies, slow query log and N+1 detection """
+import re
+import sys
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from threading import Lock
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional
+
+from greenlet import getcurrent
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ..logging.logger import DB_LOGGER
+
+SLOW_QUERY_SECONDS = 0.1
+
+# Executions of the same statement within a request from which it is reported as a likely N+1 pattern
+N_PLUS_ONE_CALLS = 10
+
+# Modules whose functions are reported as the origin of a statement
+ORIGIN_PACKAGE = '.application.'
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PARAMETER_LISTS = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """
+    Normalises a SQL statement so every execution of the same query shares a fingerprint
+    Args:
+        statement: SQL statement as sent to the database
+
+    Notes:
+        - Literals become ?, lists of parameters (IN clauses, multi row VALUES) become (?...) and whitespace is
+          collapsed
+
+    Returns: Normalised statement
+
+    """
+    normalised = _LITERALS.sub('?', statement)
+    normalised = _PARAMETER_LISTS.sub('(?...)', normalised)
+    return _WHITESPACE.sub(' ', normalised).strip()
+
+
+class StatementStats(object):
+    """ Accumulated executions of a statement fingerprint """
+
+    __slots__ = ('fingerprint', 'calls', 'total_seconds', 'max_seconds', 'max_calls_per_request')
+
+    def __init__(self, statement_fingerprint: str):
+        """
+        Initializer
+        Args:
+            statement_fingerprint: Normalised statement (see fingerprint)
+        """
+        self.fingerprint = statement_fingerprint
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.max_calls_per_request = 0
+
+    def to_dict(self) -> Dict:
+        """
+        JSON serializable representation, latencies in milliseconds
+        Returns: dict
+
+        """
+        return {
+            'fingerprint': self.fingerprint,
+            'calls': self.calls,
+            'total_ms': self.total_seconds * 1e3,
+            'mean_ms': self.total_seconds * 1e3 / self.calls if self.calls else 0.0,
+            'max_ms': self.max_seconds * 1e3,
+            'max_calls_per_request': self.max_calls_per_request,
+        }
+
+
+class StatementProfiler(object):
+    """ Opt-in profiler of every statement executed by the engines it is attached to. See "notes".
+    Notes:
+        - Latency is measured between before_cursor_execute and after_cursor_execute, so it covers the database
+          round trip only. Start times are kept per execution on the connection and dropped by handle_error when the
+          statement fails, so failed statements are not recorded and do not leak
+        - Statements slower than slow_query_seconds are logged as warnings along the application (service) method
+          that issued them. The origin is only looked up for slow statements
+        - Within a request_scope, executions are counted per fingerprint and repeated statements are reported
+    """
+
+    def __init__(self, slow_query_seconds: float = SLOW_QUERY_SECONDS, n_plus_one_calls: int = N_PLUS_ONE_CALLS):
+        """
+        Initializer
+        Args:
+            slow_query_seconds: Latency from which a statement is logged as slow
+            n_plus_one_calls: Executions of a statement within a request from which it is logged as an N+1 suspect
+        """
+        self.slow_query_seconds = slow_query_seconds
+        self.n_plus_one_calls = n_plus_one_calls
+        self._stats: Dict[str, StatementStats] = dict()
+        self._lock = Lock()
+        self._engines: List[Engine] = list()
+        self._request_calls: ContextVar[Optional[Counter]] = ContextVar('request_calls', default=None)
+
+    @property
+    def enabled(self) -> bool:
+        """ Whether the profiler is attached to any engine """
+        return bool(self._engines)
+
+    def attach(self, engine: Engine) -> None:
+        """
+        Starts profiling the statements of an engine (for asyncio engines, their sync_engine)
+        Args:
+            engine: SQL Alchemy Engine
+
+        Returns: None
+
+        """
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(engine, 'handle_error', self._handle_error)
+        self._engines.append(engine)
+
+    def detach(self) -> None:
+        """
+        Stops profiling every attached engine
+        Returns: None
+
+        """
+        for engine in self._engines:
+            event.remove(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.remove(engine, 'after_cursor_execute', self._after_cursor_execute)
+            event.remove(engine, 'handle_error', self._handle_error)
+        self._engines.clear()
+
+    def top(self, limit: int = 10, order_by: str = 'total_seconds') -> List[StatementStats]:
+        """
+        Retrieves the most expensive statements
+        Args:
+            limit: Number of statements to retrieve
+            order_by: StatementStats attribute to sort by: total_seconds, calls, max_seconds or max_calls_per_request
+
+        Returns: List of StatementStats, descending
+
+        """
+        if order_by not in ('total_seconds', 'calls', 'max_seconds', 'max_calls_per_request'):
+            raise RuntimeError(f'Unknown statement stats order: {order_by}')
+
+        with self._lock:
+            stats = list(self._stats.values())
+        return sorted(stats, key=lambda statement_stats: getattr(statement_stats, order_by), reverse=True)[:limit]
+
+    def clear(self) -> None:
+        """
+        Drops every recorded statement
+        Returns: None
+
+        """
+        with self._lock:
+            self._stats.clear()
+
+    @contextmanager
+    def request_scope(self, name: str) -> Iterator[Counter]:
+        """
+        Counts the executions of every statement fingerprint within the context (a request)
+        Args:
+            name: Scope name the N+1 suspects are reported with (usually the request method and path)
+
+        Returns: Iterator yielding the executions by fingerprint
+
+        """
+        calls = Counter()
+        token = self._request_calls.set(calls)
+        try:
+            yield calls
+        finally:
+            self._request_calls.reset(token)
+            with self._lock:
+                for statement_fingerprint, count in calls.items():
+                    stats = self._stats.get(statement_fingerprint)
+                    if stats is not None and count > stats.max_calls_per_request:
+                        stats.max_calls_per_request = count
+            for statement_fingerprint, count in calls.items():
+                if count >= self.n_plus_one_calls:
+                    DB_LOGGER.warning('Likely N+1: %d executions within %s of %s', count, name, statement_fingerprint)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        """ Engine event: keeps the statement start time on the connection, by execution """
+        conn.info.setdefault('profiler_started', dict())[_execution_key(context, cursor)] = perf_counter()
+
+    def _handle_error(self, exception_context) -> None:
+        """ Engine event: drops the start time of a failed statement, if it was still executing """
+        if exception_context.connection is not None:
+            started = exception_context.connection.info.get('profiler_started')
+            if started:
+                started.pop(_execution_key(exception_context.execution_context, exception_context.cursor), None)
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        """ Engine event: records the statement latency """
+        elapsed = perf_counter() - conn.info['profiler_started'].pop(_execution_key(context, cursor))
+        statement_fingerprint = fingerprint(statement)
+        with self._lock:
+            stats = self._stats.get(statement_fingerprint)
+            if stats is None:
+                stats = self._stats[statement_fingerprint] = StatementStats(statement_fingerprint)
+            stats.calls += 1
+            stats.total_seconds += elapsed
+            if elapsed > stats.max_seconds:
+                stats.max_seconds = elapsed
+
+        calls = self._request_calls.get()
+        if calls is not None:
+            calls[statement_fingerprint] += 1
+        if elapsed >= self.slow_query_seconds:
+            DB_LOGGER.warning('Slow query (%.1f ms) from %s: %s', elapsed * 1e3, _origin(), statement_fingerprint)
+
+
+def _execution_key(context, cursor):
+    """ Identifies a statement execution: its execution context, or its cursor for statements executed without one """
+    return context if context is not None else cursor
+
+
+def _origin() -> str:
+    """
+    Finds the application method that issued the statement being executed
+    Notes:
+        - Async statements run in a greenlet of their own: its parent greenlet holds the awaiting coroutines
+
+    Returns: Qualified name of the innermost application function, or 'unknown'
+
+    """
+    current = getcurrent()
+    frames = [sys._getframe(1)] + ([current.parent.gr_frame] if current.parent is not None else [])
+    for frame in frames:
+        while frame is not None:
+            if ORIGIN_PACKAGE in frame.f_globals.get('__name__', ''):
+                return f'{frame.f_globals["__name__"]}.{getattr(frame.f_code, "co_qualname", frame.f_code.co_name)}'
+            frame = frame.f_back
+    return 'unknown'
+
+
+PROFILER = StatementProfiler()
@@ -1,32 +1,197 @@
 """ Database setup module """
-from sqlalchemy import create_engine
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+from sqlalchemy import create_engine, event
 from sqlalchemy.engine import Engine
-from sqlalchemy.orm import sessionmaker, Session
-from ..logging.logger import LOGGER
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import scoped_session, sessionmaker, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from .config import DatabaseSettings
+from .migrations import upgrade
+from .profiler import PROFILER
+from ..logging.logger import DB_LOGGER, SQL_LOGGER
 from ...domain import Base
 from ...domain.cart_entity import Cart
+from ...domain.cart_code_total_entity import CartCodeTotal
 from ...domain.cart_item_entity import CartItem
 from ...domain.item_entity import Item
 from ...domain.rule_entity import Rule
 from ...domain.user_entity import User
 
-# For the shake of simplicity, for the challenge purposes with an in-memory SQLite should be enough
-engine = create_engine('sqlite:///:memory:', echo=True, connect_args={"check_same_thread": False})
+
+def build_engine(settings: DatabaseSettings) -> Engine:
+    """
+    Creates the database engine for the configured backend
+    Args:
+        settings: Database settings
+
+    Notes:
+        - In-memory SQLite keeps its single connection per thread, pooling it would open unrelated databases
+        - File SQLite and server backends get a QueuePool sized by the settings
+        - File SQLite connections are tuned for concurrent readers and a writer (WAL, see _tune_sqlite)
+
+    Returns: Engine
+
+    """
+    _echo(settings)
+    if settings.is_in_memory:
+        return create_engine(settings.engine_url, connect_args={'check_same_thread': False})
+
+    pool_options = {
+        'poolclass': QueuePool,
+        'pool_size': settings.pool_size,
+        'max_overflow': settings.max_overflow,
+        'pool_recycle': settings.pool_recycle,
+        'pool_pre_ping': not settings.is_sqlite,
+    }
+    if not settings.is_sqlite:
+        return create_engine(settings.url, **pool_options)
+
+    _engine = create_engine(settings.url, connect_args={'check_same_thread': False}, **pool_options)
+    event.listen(_engine, 'connect', lambda dbapi_connection, _: _tune_sqlite(dbapi_connection, settings))
+    return _engine
+
+
+def build_async_engine(settings: DatabaseSettings) -> AsyncEngine:
+    """
+    Creates the asyncio database engine for the configured backend (aiosqlite for SQLite, asyncpg for PostgreSQL)
+    Args:
+        settings: Database settings
+
+    Notes:
+        - In-memory SQLite is not pooled: its connections must not outlive the event loop that opened them
+        - File SQLite and server backends are pooled and tuned as their sync counterparts
+
+    Returns: AsyncEngine
+
+    """
+    _echo(settings)
+    if settings.is_in_memory:
+        return create_async_engine(settings.async_engine_url, poolclass=NullPool)
+
+    pool_options = {
+        'poolclass': AsyncAdaptedQueuePool,
+        'pool_size': settings.pool_size,
+        'max_overflow': settings.max_overflow,
+        'pool_recycle': settings.pool_recycle,
+        'pool_pre_ping': not settings.is_sqlite,
+    }
+    _engine = create_async_engine(settings.async_engine_url, **pool_options)
+    if settings.is_sqlite:
+        event.listen(_engine.sync_engine, 'connect',
+                     lambda dbapi_connection, _: _tune_sqlite(dbapi_connection, settings))
+    return _engine
+
+
+def _echo(settings: DatabaseSettings) -> None:
+    """
+    Logs every SQL statement through the sql subsystem logger when echo is enabled
+    Args:
+        settings: Database settings
+
+    Notes:
+        - Unlike create_engine's echo, statements go through the application log pipeline (see configure_logging)
+          instead of an extra stdout handler
+        - When disabled, the sql logger level is left as configured (LOG_LEVEL_SQL)
+
+    Returns: None
+
+    """
+    if settings.echo:
+        SQL_LOGGER.setLevel(logging.INFO)
+
+
+def _tune_sqlite(dbapi_connection, settings: DatabaseSettings) -> None:
+    """
+    Applies the concurrency oriented pragmas to a new file SQLite connection
+    Args:
+        dbapi_connection: Raw sqlite3 connection
+        settings: Database settings
+
+    Notes:
+        - WAL lets readers run alongside a writer, and synchronous=NORMAL is durable enough in WAL mode
+        - A larger page cache and memory mapped I/O cut reads system calls
+
+    Returns: None
+
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f'PRAGMA mmap_size={int(settings.sqlite_mmap_size)}')
+    cursor.execute(f'PRAGMA cache_size={int(settings.sqlite_cache_size)}')
+    cursor.execute(f'PRAGMA busy_timeout={int(settings.sqlite_busy_timeout)}')
+    cursor.close()
+
+
+database_settings = DatabaseSettings.from_env()
+
+# In-memory SQLite (default) for the challenge purposes, see DatabaseSettings to configure a persistent backend
+engine = build_engine(database_settings)
+async_engine = build_async_engine(database_settings)
+
+# Opt-in statement profiling (DATABASE_PROFILE), see the /debug/statements endpoint
+if database_settings.profile:
+    PROFILER.slow_query_seconds = database_settings.slow_query_ms / 1e3
+    PROFILER.attach(engine)
+    PROFILER.attach(async_engine.sync_engine)
+
+# Built once: every session shares the same factory (and its configuration)
+session_factory = sessionmaker(bind=engine)
+
+# Sessions shared within a request or task, see session_scope
+_scope: ContextVar[Optional[object]] = ContextVar('session_scope', default=None)
+scoped_sessions = scoped_session(session_factory, scopefunc=_scope.get)
+
+# Async sessions keep their objects loaded after commit: expired attributes can not be lazily refreshed under asyncio
+async_session_factory = sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+def configure_db(settings: DatabaseSettings) -> None:
+    """
+    Rebuilds the engines for the given settings, binding every session factory to them. See "notes".
+    Args:
+        settings: Database settings
+
+    Notes:
+        - Meant for processes whose database is not the one of their environment, e.g. repricing workers
+        - The previous sync engine is disposed, the previous asyncio engine must be disposed beforehand (it is bound
+          to its event loop)
+
+    Returns: None
+
+    """
+    global database_settings, engine, async_engine
+    PROFILER.detach()
+    engine.dispose()
+
+    database_settings = settings
+    engine = build_engine(settings)
+    async_engine = build_async_engine(settings)
+    if settings.profile:
+        PROFILER.slow_query_seconds = settings.slow_query_ms / 1e3
+        PROFILER.attach(engine)
+        PROFILER.attach(async_engine.sync_engine)
+    session_factory.configure(bind=engine)
+    async_session_factory.configure(bind=async_engine)
 
 
 def init_db() -> None:
     """
-    Initializes database from domain model
+    Initializes database from domain model, applying every pending schema migration (see migrations.upgrade)
     Returns: None
 
     """
-    LOGGER.info(f'Initializing domain model')
+    DB_LOGGER.info('Initializing domain model')
     CartItem.enroll()
     User.enroll()
     Item.enroll()
     Cart.enroll()
+    CartCodeTotal.enroll()
     Rule.enroll()
-    Base.metadata.create_all(engine)
+    upgrade(engine)
 
 
 def shutdown_db() -> None:
@@ -47,12 +212,58 @@ def get_engine() -> Engine:
     return engine
 
 
+def get_database_settings() -> DatabaseSettings:
+    """
+    Obtain a reference to the settings the current database engines were built with
+    Returns: DatabaseSettings
+
+    """
+    return database_settings
+
+
+def get_async_engine() -> AsyncEngine:
+    """
+    Obtain a reference to the current asyncio database running engine
+    Returns: AsyncEngine
+
+    """
+    return async_engine
+
+
+def build_async_session() -> AsyncSession:
+    """
+    Creates and returns new SQL Alchemy AsyncSession
+    Returns: AsyncSession
+
+    """
+    return async_session_factory()
+
+
 def build_session() -> Session:
     """
-    Creates and returns new SQL Alchemy Session
+    Creates and returns new SQL Alchemy Session, or the current scope's Session when running inside a session_scope
     Returns: Session
 
     """
-    _session = sessionmaker(bind=engine)
-    _session.configure(bind=engine)
-    return _session()
+    if _scope.get() is None:
+        return session_factory()
+    return scoped_sessions()
+
+
+@contextmanager
+def session_scope() -> Iterator[None]:
+    """
+    Shares a single Session among every build_session call made within the context (a request or a task), closing it
+    (and releasing its connection) when the context ends
+    Notes:
+        - The scope follows the current context (contextvars), so concurrent requests or tasks never share a Session
+        - Queries returned by services and run after their Transaction ended are released here as well
+    Returns: Iterator
+
+    """
+    token = _scope.set(object())
+    try:
+        yield
+    finally:
+        scoped_sessions.remove()
+        _scope.reset(token)
@@ -1,7 +1,32 @@
 """ Transaction module """
 from __future__ import annotations
-from .setup import build_session
-from ..logging.logger import LOGGER
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, AsyncIterator, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, Result
+from sqlalchemy.sql import Select
+from .setup import build_async_session, build_session
+from ..logging.logger import DB_LOGGER
+from ..metrics.registry import REGISTRY
+
+TRANSACTION_STAGE_SECONDS = REGISTRY.histogram(
+    'db_transaction_stage_seconds', 'Transaction latency by kind (sync, async) and stage (open, commit)',
+    ('kind', 'stage'))
+TRANSACTION_QUERIES = REGISTRY.histogram(
+    'db_transaction_queries', 'SQL statements executed per transaction, by kind (sync, async)', ('kind',),
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+
+# Statement counter of the innermost transaction running in the current context (task or thread)
+_statements: ContextVar[Optional[List[int]]] = ContextVar('statements', default=None)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(conn, cursor, statement, parameters, context, executemany) -> None:
+    """ Counts every statement sent to the database (sync and async engines) within a Transaction """
+    statements = _statements.get()
+    if statements is not None:
+        statements[0] += 1
 
 
 class Transaction(object):
@@ -10,10 +35,12 @@ class Transaction(object):
         - Effectively manage transactions: atomically or within a set of actions to be executed together
         - If all actions were successfully executed, the transaction is committed
         - If any action was unsuccessfully executed, the transaction is rolled back
+        - Either way, the session is closed so its connection goes back to the pool
         - The usage of slots is to avoid unnecessary dict overhead for this instances
+        - Session open and commit latencies, and the number of statements, are recorded as metrics
     """
 
-    __slots__ = ('session',)
+    __slots__ = ('session', '_statements', '_outer_statements')
 
     def __enter__(self) -> Transaction:
         """
@@ -21,13 +48,17 @@ class Transaction(object):
         Returns: Transaction
 
         """
-        LOGGER.info(f'Initializing transaction')
+        DB_LOGGER.debug('Initializing transaction')
+        start = perf_counter()
         self.session = build_session()
+        TRANSACTION_STAGE_SECONDS.observe(perf_counter() - start, 'sync', 'open')
+        self._statements, self._outer_statements = [0], _statements.get()
+        _statements.set(self._statements)
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
         """
-        Auto close: Either commit or rollback this transaction
+        Auto close: Either commit or rollback this transaction, then close its session
         Args:
             exc_type: Type of Exception caught in the context
             exc_val: Value of the Exception caught in the context
@@ -36,13 +67,105 @@ class Transaction(object):
         Returns: None
 
         """
-        if exc_tb is exc_type is exc_val is None:
-            try:
-                self.session.commit()
-                LOGGER.info(f'Transaction finished successfully!')
-            except Exception as ex:
-                LOGGER.error(f'Rolling back transaction due to a database exception: {ex}')
+        try:
+            if exc_tb is exc_type is exc_val is None:
+                try:
+                    start = perf_counter()
+                    self.session.commit()
+                    TRANSACTION_STAGE_SECONDS.observe(perf_counter() - start, 'sync', 'commit')
+                    DB_LOGGER.debug('Transaction finished successfully!')
+                except Exception as ex:
+                    DB_LOGGER.error('Rolling back transaction due to a database exception: %s', ex)
+                    self.session.rollback()
+            else:
+                DB_LOGGER.error('Rolling back transaction due to an Exception: %s', exc_val)
                 self.session.rollback()
-        else:
-            LOGGER.error(f'Rolling back transaction due to an Exception: {exc_val}')
-            self.session.rollback()
+        finally:
+            self.session.close()
+            _statements.set(self._outer_statements)
+            TRANSACTION_QUERIES.observe(self._statements[0], 'sync')
+
+
+class AsyncTransaction(object):
+    """ Asyncio counterpart of the Transaction Context Manager class (same commit, rollback and close semantics)
+    Notes:
+        - Database I/O is awaited, so the event loop keeps serving other requests meanwhile
+        - Objects are not expired on commit, but relationships must be eagerly loaded: there is no lazy loading
+    """
+
+    __slots__ = ('session', '_statements', '_outer_statements')
+
+    async def __aenter__(self) -> AsyncTransaction:
+        """
+        Initializes AsyncTransaction Context Manager
+        Returns: AsyncTransaction
+
+        """
+        DB_LOGGER.debug('Initializing async transaction')
+        start = perf_counter()
+        self.session = build_async_session()
+        TRANSACTION_STAGE_SECONDS.observe(perf_counter() - start, 'async', 'open')
+        self._statements, self._outer_statements = [0], _statements.get()
+        _statements.set(self._statements)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        """
+        Auto close: Either commit or rollback this transaction, then close its session
+        Args:
+            exc_type: Type of Exception caught in the context
+            exc_val: Value of the Exception caught in the context
+            exc_tb: Trace of the Exception caught in the context
+
+        Returns: None
+
+        """
+        try:
+            if exc_tb is exc_type is exc_val is None:
+                try:
+                    start = perf_counter()
+                    await self.session.commit()
+                    TRANSACTION_STAGE_SECONDS.observe(perf_counter() - start, 'async', 'commit')
+                    DB_LOGGER.debug('Async transaction finished successfully!')
+                except Exception as ex:
+                    DB_LOGGER.error('Rolling back async transaction due to a database exception: %s', ex)
+                    await self.session.rollback()
+            else:
+                DB_LOGGER.error('Rolling back async transaction due to an Exception: %s', exc_val)
+                await self.session.rollback()
+        finally:
+            await self.session.close()
+            _statements.set(self._outer_statements)
+            TRANSACTION_QUERIES.observe(self._statements[0], 'async')
+
+
+STREAM_BATCH_SIZE = 1000
+
+
+async def stream_scalars(statement: Select, batch_size: int = STREAM_BATCH_SIZE) -> AsyncIterator[Any]:
+    """
+    Streams the entities selected by a statement within its own AsyncTransaction, fetching them in batches
+    Args:
+        statement: SQL Alchemy Select instance
+        batch_size: Number of rows fetched (and held in memory) at once
+
+    Returns: Asynchronous iterator of entities
+
+    """
+    async with AsyncTransaction() as t:
+        result = await t.session.stream_scalars(statement.execution_options(yield_per=batch_size))
+        async for entity in result:
+            yield entity
+
+
+async def fetch_rows(statement: Select) -> Result:
+    """
+    Executes a Core statement within its own AsyncTransaction, skipping ORM hydration
+    Args:
+        statement: SQL Alchemy Select instance, usually of plain columns
+
+    Returns: Buffered SQL Alchemy Result instance of plain row tuples (see Result.keys for their column names)
+
+    """
+    async with AsyncTransaction() as t:
+        return await t.session.execute(statement)
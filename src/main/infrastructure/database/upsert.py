@@ -0,0 +1,26 @@
+""" Upsert (INSERT ... ON CONFLICT) module """
+from typing import Callable, Dict
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.sql import Insert
+
+DIALECT_INSERTS: Dict[str, Callable] = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+
+def insert_on_conflict(dialect_name: str, entity) -> Insert:
+    """
+    Builds a dialect specific INSERT statement, which supports ON CONFLICT DO UPDATE/NOTHING clauses
+    Args:
+        dialect_name: Name of the SQL Alchemy dialect the statement will run on (e.g. engine.dialect.name)
+        entity: Entity (or Table) to insert into
+
+    Returns: SQL Alchemy Insert instance
+
+    """
+    if dialect_name not in DIALECT_INSERTS:
+        raise RuntimeError(f'Upserts are not supported by the {dialect_name} dialect')
+
+    return DIALECT_INSERTS[dialect_name](entity)
@@ -1,7 +1,131 @@
-""" Logging module """
+""" Logging module. See LoggingSettings "notes" for the available loggers and their settings """
+import atexit
 import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Mapping, Optional
 
-logging.basicConfig(level='DEBUG', format='%(asctime)-15s %(funcName)-20s > %(message)s')
-logging.getLogger('sqlalchemy').propagate = False
+LOG_FORMAT = '%(asctime)-15s %(name)-16s %(funcName)-20s > %(message)s'
 
-LOGGER = logging.getLogger()
+# Subsystem loggers: application code logs through these so each one can be tuned on its own
+APP_LOGGER_NAME = 'amenitiz'
+SUBSYSTEM_LOGGERS = {
+    'db': f'{APP_LOGGER_NAME}.db',
+    'rules': f'{APP_LOGGER_NAME}.rules',
+    'rest': f'{APP_LOGGER_NAME}.rest',
+    'sql': 'sqlalchemy.engine',
+}
+
+
+class LoggingSettings(object):
+    """ Logging settings. See "notes" for the levels and loggers they control.
+    Notes:
+        - level applies to the application logger ('amenitiz'), every subsystem logger inherits it unless overridden
+        - levels overrides a subsystem level by name: db (transactions, schema), rules (pricing engine), rest (API)
+          and sql (every SQL statement emitted by SQL Alchemy, WARNING by default)
+        - Third party libraries log through the root logger, at WARNING
+    """
+
+    __slots__ = ('level', 'levels')
+
+    def __init__(self, level: str = 'INFO', levels: Mapping[str, str] = None):
+        """
+        Initializer
+        Args:
+            level: Application log level name (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+            levels: Log level name by subsystem, see SUBSYSTEM_LOGGERS
+        """
+        self.level = level
+        self.levels = {'sql': 'WARNING', **(levels or dict())}
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = None) -> 'LoggingSettings':
+        """
+        Builds settings from LOG_LEVEL and LOG_LEVEL_<SUBSYSTEM> environment variables, falling back to defaults
+        Args:
+            environ: Environment variables, os.environ by default
+
+        Returns: LoggingSettings
+
+        """
+        environ = environ if environ is not None else os.environ
+        levels = {
+            subsystem: environ[f'LOG_LEVEL_{subsystem.upper()}'].upper()
+            for subsystem in SUBSYSTEM_LOGGERS if f'LOG_LEVEL_{subsystem.upper()}' in environ
+        }
+        return cls(level=environ.get('LOG_LEVEL', cls().level).upper(), levels=levels)
+
+
+class _InProcessQueueHandler(QueueHandler):
+    """ QueueHandler leaving records untouched: formatting is deferred to the listener thread
+    Notes:
+        - The stdlib handler formats every record in the calling thread so it can be pickled, which this in-process
+          queue does not need
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """ Overridden method """
+        return record
+
+
+_listener: Optional[QueueListener] = None
+
+
+def configure_logging(settings: LoggingSettings = None) -> QueueListener:
+    """
+    Applies the given log levels and routes every record through a queue, written to stderr by a background thread
+    Args:
+        settings: Logging settings, read from the environment by default
+
+    Notes:
+        - Logging calls only enqueue records, so log I/O never blocks a request
+        - Calling it again replaces the previous configuration
+
+    Returns: Running QueueListener
+
+    """
+    global _listener
+    settings = settings if settings is not None else LoggingSettings.from_env()
+    shutdown_logging()
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    records = queue.SimpleQueue()
+    _listener = QueueListener(records, stream_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, QueueHandler):
+            root.removeHandler(handler)
+    root.addHandler(_InProcessQueueHandler(records))
+    root.setLevel(logging.WARNING)
+
+    logging.getLogger(APP_LOGGER_NAME).setLevel(settings.level)
+    for subsystem, name in SUBSYSTEM_LOGGERS.items():
+        logging.getLogger(name).setLevel(settings.levels.get(subsystem, logging.NOTSET))
+
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """
+    Stops the QueueListener (if running), once every pending record has been written
+    Returns: None
+
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+configure_logging()
+atexit.register(shutdown_logging)
+
+LOGGER = logging.getLogger(APP_LOGGER_NAME)
+DB_LOGGER = logging.getLogger(SUBSYSTEM_LOGGERS['db'])
+RULES_LOGGER = logging.getLogger(SUBSYSTEM_LOGGERS['rules'])
+REST_LOGGER = logging.getLogger(SUBSYSTEM_LOGGERS['rest'])
+SQL_LOGGER = logging.getLogger(SUBSYSTEM_LOGGERS['sql'])
@@ -0,0 +1 @@
+""" Metrics adapter module """
@@ -0,0 +1,148 @@
+""" Metrics module: in-process histograms exposed in the Prometheus text format """
+from bisect import bisect_left
+from threading import Lock
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+PROMETHEUS_MEDIA_TYPE = 'text/plain; version=0.0.4'
+
+# Upper bounds, in seconds, of the latency buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram(object):
+    """ Thread safe histogram of observations, one series per combination of label values. See "notes".
+    Notes:
+        - Observing costs a bisect and a few additions under a lock, nothing is formatted until rendered
+        - Rendered buckets are cumulative and end with +Inf, as Prometheus expects
+    """
+
+    __slots__ = ('name', 'description', 'label_names', 'buckets', '_series', '_lock')
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        """
+        Initializer
+        Args:
+            name: Metric name
+            description: Metric help text
+            label_names: Names of the labels every observation is tagged with
+            buckets: Sorted bucket upper bounds (+Inf is implicit)
+        """
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List] = dict()
+        self._lock = Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        """
+        Records an observation
+        Args:
+            value: Observed value (seconds for latencies)
+            *label_values: Value of every label, in label_names order
+
+        Returns: None
+
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *label_values: str) -> int:
+        """ Number of observations of the given series """
+        series = self._series.get(label_values)
+        return 0 if series is None else series[2]
+
+    def clear(self) -> None:
+        """
+        Drops every observation
+        Returns: None
+
+        """
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> Iterable[str]:
+        """
+        Renders this histogram in the Prometheus text format
+        Returns: Iterable of lines
+
+        """
+        yield f'# HELP {self.name} {self.description}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+
+        for label_values, counts, total, count in sorted(series):
+            labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, label_values))
+            separator = ',' if labels else ''
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket{{{labels}{separator}le="{_format_bound(bound)}"}} {cumulative}'
+            yield f'{self.name}_sum{{{labels}}} {total}'
+            yield f'{self.name}_count{{{labels}}} {count}'
+
+
+class MetricsRegistry(object):
+    """ Set of metrics rendered together (the /metrics endpoint serves the default REGISTRY) """
+
+    def __init__(self):
+        """ Initializer """
+        self._metrics: Dict[str, Histogram] = dict()
+        self._lock = Lock()
+
+    def histogram(self, name: str, description: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        """
+        Registers a new histogram
+        Args:
+            name: Unique metric name
+            description: Metric help text
+            label_names: Names of the labels every observation is tagged with
+            buckets: Sorted bucket upper bounds (+Inf is implicit)
+
+        Returns: Histogram
+
+        """
+        with self._lock:
+            if name in self._metrics:
+                raise RuntimeError(f'Metric {name} is already registered')
+            metric = self._metrics[name] = Histogram(name, description, label_names, buckets)
+        return metric
+
+    def clear(self) -> None:
+        """
+        Drops the observations of every registered metric
+        Returns: None
+
+        """
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+    def render(self) -> str:
+        """
+        Renders every registered metric in the Prometheus text format
+        Returns: str
+
+        """
+        return '\n'.join(line for metric in list(self._metrics.values()) for line in metric.render()) + '\n'
+
+
+def _format_bound(bound: float) -> str:
+    """ Prometheus representation of a bucket upper bound """
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+def _escape(value: str) -> str:
+    """ Escapes a label value """
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REGISTRY = MetricsRegistry()
@@ -1,20 +1,144 @@
 """ Main module """
+import argparse
 import asyncio
+import os
+import time
+from typing import List
+
 import uvicorn
 
-from src.main.application.prefill_service import Prefill
-from src.main.infrastructure.database.setup import init_db
+from src.main.application.item_service import ItemService
+from src.main.application.parallel_repricing import REPRICING_SHARD_SIZE, ParallelRepricer
+from src.main.application.prefill_service import PREFILL_CHUNK_SIZE, Prefill
+from src.main.application.rules_service import PRICING_LINES, PRICING_MODES
+from src.main.infrastructure.database.setup import database_settings, get_async_engine, init_db
 from src.main.infrastructure.logging.logger import LOGGER
 
 
-def main():
+async def prefill_if_empty() -> None:
+    """
+    Prefills the database with the challenge sample data, unless a persistent database already holds data
+    Returns: None
+
+    """
+    items_query = await ItemService().read_items(limit=1)
+    if items_query.first() is None:
+        await Prefill.all()
+    # Pooled async connections are bound to this event loop, uvicorn runs its own
+    await get_async_engine().dispose()
+
+
+def _count(value: str) -> int:
+    """
+    Parses a command line row count, accepting scientific notation (e.g. 1e6)
+    Args:
+        value: Raw argument value
+
+    Returns: int
+
+    """
+    count = int(float(value))
+    if count < 0:
+        raise argparse.ArgumentTypeError(f'Counts must not be negative, got {value}')
+    return count
+
+
+def _positive_count(value: str) -> int:
+    """
+    Parses a command line count that must be at least 1 (e.g. workers or chunk sizes), see _count
+    Args:
+        value: Raw argument value
+
+    Returns: int
+
+    """
+    count = _count(value)
+    if count < 1:
+        raise argparse.ArgumentTypeError(f'Counts must be at least 1, got {value}')
+    return count
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    """
+    Parses the command line
+    Args:
+        argv: Command line arguments, sys.argv by default
+
+    Returns: argparse.Namespace
+
+    """
+    parser = argparse.ArgumentParser(prog='python -m src.main')
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('serve', help='Serve the REST API (default)')
+    prefill = commands.add_parser('prefill', help='Insert synthetic data (see Prefill.generate)')
+    for name in ('users', 'items', 'carts', 'lines', 'rules'):
+        prefill.add_argument(f'--{name}', type=_count, default=0, help=f'Number of {name} to insert')
+    prefill.add_argument('--seed', type=int, default=0, help='Random seed')
+    prefill.add_argument('--chunk-size', type=_positive_count, default=PREFILL_CHUNK_SIZE,
+                         help='Rows per INSERT statement')
+    reprice = commands.add_parser('reprice', help='Reprice every cart in parallel (see ParallelRepricer)')
+    reprice.add_argument('--workers', type=_positive_count, default=os.cpu_count(),
+                         help='Worker processes, one per CPU')
+    reprice.add_argument('--shard-size', type=_positive_count, default=REPRICING_SHARD_SIZE,
+                         help='Carts per worker task')
+    reprice.add_argument('--mode', choices=PRICING_MODES, default=PRICING_LINES, help='Pricing mode')
+    return parser.parse_args(argv)
+
+
+async def prefill(args: argparse.Namespace) -> None:
+    """
+    Inserts synthetic data as requested by the prefill command
+    Args:
+        args: Parsed prefill command line
+
+    Returns: None
+
+    """
+    start = time.perf_counter()
+    await Prefill.generate(users=args.users, items=args.items, carts=args.carts, lines=args.lines, rules=args.rules,
+                           seed=args.seed, chunk_size=args.chunk_size)
+    LOGGER.info('Prefill finished in %.2fs', time.perf_counter() - start)
+
+
+async def reprice(args: argparse.Namespace) -> None:
+    """
+    Reprices every cart as requested by the reprice command
+    Args:
+        args: Parsed reprice command line
+
+    Returns: None
+
+    """
+    start = time.perf_counter()
+    totals = await ParallelRepricer(workers=args.workers, shard_size=args.shard_size, mode=args.mode).reprice()
+    LOGGER.info('Repriced %d carts in %.2fs', len(totals), time.perf_counter() - start)
+
+
+def main(argv: List[str] = None):
     """ Application entry point """
+    args = parse_args(argv)
+    if args.command == 'prefill':
+        init_db()
+        if database_settings.is_in_memory:
+            LOGGER.warning('In-memory databases are lost on exit, set DATABASE_URL to keep the generated data')
+        asyncio.run(prefill(args))
+        return
+    if args.command == 'reprice':
+        init_db()
+        asyncio.run(reprice(args))
+        return
+
     LOGGER.info('Starting application...')
     init_db()
-    asyncio.run(Prefill.all())
+    asyncio.run(prefill_if_empty())
+    workers = int(os.environ.get('APP_WORKERS', 1))
+    if workers > 1 and database_settings.is_in_memory:
+        LOGGER.warning('In-memory databases are private to each worker, falling back to a single worker')
+        workers = 1
     uvicorn.run(
         'src.main.presentation.rest.setup:app',
         host='0.0.0.0',
-        port=8000,
+        port=int(os.environ.get('APP_PORT', 8000)),
+        workers=workers,
         log_level='debug',
     )
@@ -1,5 +1,9 @@
 """ REST controller: Prefill Service """
+from typing import List, Optional
 from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
+from ..pagination import limit_param, ndjson_response, rows_response
+from ..schemas import CartDetailModel, CartModel
 from ....application.cart_service import CartService
 
 
@@ -11,34 +15,43 @@ router = APIRouter(
 )
 
 
-@router.get('/')
-async def get_carts():
+@router.get('/', response_model=List[CartModel])
+async def get_carts(after: int = None, limit: int = limit_param(), stream: bool = False):
     """
-    Lists all existing carts
-    Warnings:
-        - No pagination implemented, use with caution
-    Returns: JSON Array (through FastAPI decorator)
+    Lists existing carts sorted by id, a page at a time
+    Args:
+        after: Only carts whose id is greater than this one are listed (id of the last cart of the previous page)
+        limit: Page size
+        stream: Whether to stream every cart (from after on, limit is ignored) as NDJSON instead
+
+    Returns: JSON Array (serialised straight from the selected columns) or NDJSON stream
 
     """
-    carts_query = await CartService().read_carts()
-    return carts_query.all()
+    if stream:
+        return ndjson_response(CartService().stream_carts(after=after))
+
+    return rows_response(await CartService().read_cart_rows(after=after, limit=limit))
 
 
-@router.get('/id/')
-async def get_cart(cart_id):
+@router.get('/id/', response_model=Optional[CartDetailModel])
+async def get_cart(cart_id: int):
     """
     Finds a specific Cart by ID
-    Returns: JSON Array (through FastAPI decorator)
+    Returns: JSON Object along the cart items (already shaped as CartDetailModel, so served with no validation) or null
 
     """
     cart_query = await CartService().read_cart({'id': cart_id})
     cart = cart_query.first()
-    if cart is not None:
-        return {**cart.to_dict(), 'items': [cart_item.item.to_dict() for cart_item in cart.items]}
+    if cart is None:
+        return ORJSONResponse(None)
+
+    return ORJSONResponse({**cart.to_dict(), 'items': [
+        {**cart_item.item.to_dict(), 'quantity': cart_item.quantity} for cart_item in cart.items
+    ]})
 
 
 @router.post('/')
-async def post_cart(user_id):
+async def post_cart(user_id: int):
     """
     Lists all existing carts
     Warnings:
@@ -0,0 +1,40 @@
+""" REST controller: diagnostics (statement profiler) """
+from fastapi import APIRouter, HTTPException, Query as QueryParam
+from ....infrastructure.database.profiler import PROFILER
+
+router = APIRouter(
+    prefix='/debug',
+    tags=['debug'],
+    dependencies=[],
+    responses={404: {'description': 'Statement profiling is disabled'}},
+)
+
+
+@router.get('/statements')
+async def get_top_statements(limit: int = QueryParam(10, ge=1, le=1000), order_by: str = 'total_seconds'):
+    """
+    Lists the most expensive SQL statements since startup (requires DATABASE_PROFILE=true)
+    Args:
+        limit: Number of statements to list
+        order_by: total_seconds (default), calls, max_seconds or max_calls_per_request (N+1 patterns show up first)
+
+    Returns: JSON Array of statement fingerprints along their calls and latencies (through FastAPI decorator)
+
+    """
+    if not PROFILER.enabled:
+        raise HTTPException(status_code=404, detail='Statement profiling is disabled, set DATABASE_PROFILE=true')
+
+    try:
+        return [stats.to_dict() for stats in PROFILER.top(limit, order_by)]
+    except RuntimeError as ex:
+        raise HTTPException(status_code=422, detail=str(ex))
+
+
+@router.delete('/statements')
+async def reset_statements():
+    """
+    Drops every profiled statement
+    Returns: None
+
+    """
+    PROFILER.clear()
@@ -1,5 +1,8 @@
 """ REST controller: User Service """
+from typing import List
 from fastapi import APIRouter
+from ..pagination import limit_param, ndjson_response, rows_response
+from ..schemas import ItemModel
 from ....application.item_service import ItemService
 
 
@@ -11,24 +14,29 @@ router = APIRouter(
 )
 
 
-@router.get('/')
-async def get_items():
+@router.get('/', response_model=List[ItemModel])
+async def get_items(after: int = None, limit: int = limit_param(), stream: bool = False):
     """
-    Lists all existing items
-    Warnings:
-        - No pagination implemented, use with caution
-    Returns: JSON Array (through FastAPI decorator)
+    Lists existing items sorted by id, a page at a time
+    Args:
+        after: Only items whose id is greater than this one are listed (id of the last item of the previous page)
+        limit: Page size
+        stream: Whether to stream every item (from after on, limit is ignored) as NDJSON instead
+
+    Returns: JSON Array (serialised straight from the selected columns) or NDJSON stream
 
     """
-    items_query = await ItemService().read_items()
-    return list(items_query)
+    if stream:
+        return ndjson_response(ItemService().stream_items(after=after))
+
+    return rows_response(await ItemService().read_item_rows(after=after, limit=limit))
 
 
 @router.post('/add_to_cart')
-async def add_item_to_cart(item_id, cart_id):
-    await ItemService().add_to_cart(item_id=item_id, cart_id=cart_id)
+async def add_item_to_cart(item_id: int, cart_id: int, quantity: int = 1):
+    await ItemService().add_to_cart(item_id=item_id, cart_id=cart_id, quantity=quantity)
 
 
 @router.post('/remove_from_cart')
-async def add_item_to_cart(item_id, cart_id):
-    await ItemService().remove_from_cart(item_id=item_id, cart_id=cart_id)
+async def add_item_to_cart(item_id: int, cart_id: int, quantity: int = 1):
+    await ItemService().remove_from_cart(item_id=item_id, cart_id=cart_id, quantity=quantity)
@@ -1,6 +1,15 @@
 """ REST controller: User Service """
-from fastapi import APIRouter
-from ....application.rules_service import RuleService, RuleEngine
+from typing import List, Literal
+from fastapi import APIRouter, Body, HTTPException, Query
+from ..pagination import limit_param, ndjson_response, rows_response
+from ..schemas import RuleCandidateModel, RuleModel
+from ....application.priced_cart_cache import PRICED_CARTS
+from ....application.promotion_simulator import PromotionSimulator
+from ....application.rules_service import APPLY_MANY_CHUNK_SIZE, PRICING_LINES, RuleService, RuleEngine
+from ....domain.rule_entity import Rule
+
+# Pricing modes accepted by the API (see rules_service.PRICING_MODES): unknown ones are rejected with 422
+PricingMode = Literal['lines', 'aggregate']
 
 router = APIRouter(
     prefix='/rules',
@@ -10,27 +19,78 @@ router = APIRouter(
 )
 
 
-@router.get('/')
-async def get_rules():
+@router.get('/', response_model=List[RuleModel])
+async def get_rules(after: int = None, limit: int = limit_param(), stream: bool = False):
     """
-    Lists all existing items
-    Warnings:
-        - No pagination implemented, use with caution
-    Returns: JSON Array (through FastAPI decorator)
+    Lists existing rules sorted by id, a page at a time
+    Args:
+        after: Only rules whose id is greater than this one are listed (id of the last rule of the previous page)
+        limit: Page size
+        stream: Whether to stream every rule (from after on, limit is ignored) as NDJSON instead
+
+    Returns: JSON Array (serialised straight from the selected columns) or NDJSON stream
 
     """
-    items_query = await RuleService().read_offer_rules()
-    return items_query.all()
+    if stream:
+        return ndjson_response(RuleService().stream_offer_rules(after=after))
+
+    return rows_response(await RuleService().read_offer_rule_rows(after=after, limit=limit))
 
 
 @router.post('/apply')
-async def apply_rules_to_cart(cart_id: int):
+async def apply_rules_to_cart(cart_id: int, mode: PricingMode = PRICING_LINES):
     """
-    Lists all existing items
-    Warnings:
-        - No pagination implemented, use with caution
-    Returns: JSON Array (through FastAPI decorator)
+    Prices a cart, firing every applicable offer rule
+    Args:
+        cart_id: Cart's ID
+        mode: Pricing mode, lines (default) or aggregate (see RuleEngine)
+
+    Returns: None
 
     """
-    cart = await RuleEngine().apply(cart_id)
+    cart = await RuleEngine(mode=mode).apply(cart_id)
     return cart
+
+
+@router.post('/apply_batch')
+async def apply_rules_to_carts(cart_ids: List[int] = Body(...), chunk_size: int = Query(APPLY_MANY_CHUNK_SIZE, ge=1),
+                               mode: PricingMode = PRICING_LINES):
+    """
+    Reprices many carts at once (non existent carts are skipped)
+    Returns: JSON Object mapping every priced cart id to its new total price (through FastAPI decorator)
+
+    """
+    return await RuleEngine(mode=mode).apply_many(cart_ids, chunk_size=chunk_size)
+
+
+@router.post('/simulate')
+async def simulate_rules(candidates: List[RuleCandidateModel] = Body(...), replace: bool = False,
+                         mode: PricingMode = PRICING_LINES):
+    """
+    Simulates candidate rules over every cart, without writing anything (see PromotionSimulator)
+    Args:
+        candidates: Candidate rules
+        replace: Whether candidates replace every current rule instead of being added to them
+        mode: Pricing mode, lines (default) or aggregate (see RuleEngine)
+
+    Returns: JSON Object with carts, affected_carts, baseline_revenue, simulated_revenue, revenue_delta (cents) and
+        per rule firings (through FastAPI decorator)
+
+    """
+    try:
+        simulation = await PromotionSimulator(mode=mode).simulate(
+            [Rule(**candidate.dict()) for candidate in candidates], replace=replace
+        )
+    except RuntimeError as ex:
+        raise HTTPException(status_code=422, detail=str(ex))
+    return simulation.to_dict()
+
+
+@router.get('/priced_carts')
+async def get_priced_carts_metrics():
+    """
+    Priced carts cache metrics (see RuleEngine.apply)
+    Returns: JSON Object with size, maxsize, hits, misses, hit_ratio and evictions (through FastAPI decorator)
+
+    """
+    return PRICED_CARTS.metrics()
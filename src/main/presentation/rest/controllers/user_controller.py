@@ -1,5 +1,8 @@
 """ REST controller: User Service """
+from typing import List
 from fastapi import APIRouter
+from ..pagination import limit_param, ndjson_response
+from ..schemas import UserModel
 from ....application.user_service import UserService
 
 router = APIRouter(
@@ -10,14 +13,32 @@ router = APIRouter(
 )
 
 
-@router.get('/')
-async def get_users():
+@router.get('/', response_model=List[UserModel])
+async def get_users(after: int = None, limit: int = limit_param(), stream: bool = False):
     """
-    Lists all existing users
-    Warnings:
-        - No pagination implemented, use with caution
-    Returns: JSON Array (through FastAPI decorator)
+    Lists existing users along their cart sorted by id, a page at a time
+    Args:
+        after: Only users whose id is greater than this one are listed (id of the last user of the previous page)
+        limit: Page size
+        stream: Whether to stream every user (from after on, limit is ignored) as NDJSON instead
+
+    Returns: JSON Array (through FastAPI decorator) or NDJSON stream
+
+    """
+    if stream:
+        return ndjson_response(UserService().stream_users(after=after), _serialize)
+
+    user_query = await UserService().read_users(after=after, limit=limit)
+    return [_serialize(user) for user in user_query.all()]
+
+
+def _serialize(user) -> dict:
+    """
+    User representation along its cart
+    Args:
+        user: User Entity
+
+    Returns: dict, its cart is None for users holding no cart
 
     """
-    user_query = await UserService().read_users()
-    return [{**user.to_dict(), 'cart': user.cart[0].to_dict()} for user in user_query.all()]
+    return {**user.to_dict(), 'cart': user.cart[0].to_dict() if user.cart else None}
@@ -0,0 +1,152 @@
+""" REST API middlewares module """
+from time import perf_counter
+from typing import Callable, Dict
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ...infrastructure.database.profiler import PROFILER
+from ...infrastructure.database.setup import session_scope
+from ...infrastructure.logging.logger import REST_LOGGER
+from ...infrastructure.metrics.registry import REGISTRY
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', 'HTTP request latency (until the whole response is sent) by route',
+    ('method', 'route', 'status'))
+
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+class SessionScopeMiddleware(object):
+    """ Runs every HTTP request inside its own database session scope (see session_scope)
+    Notes:
+        - Plain ASGI middleware on purpose: the scope must outlive the endpoint until the whole response (streamed
+          responses included) has been sent
+    """
+
+    def __init__(self, app: ASGIApp):
+        """
+        Initializer
+        Args:
+            app: Wrapped ASGI application
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        ASGI entry point
+        Args:
+            scope: ASGI connection scope
+            receive: ASGI receive channel
+            send: ASGI send channel
+
+        Returns: None
+
+        """
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        with session_scope():
+            await self.app(scope, receive, send)
+
+
+class TimingMiddleware(object):
+    """ Records the latency of every HTTP request by method, route template and status (see HTTP_REQUEST_SECONDS)
+    Notes:
+        - Routes are labelled by their path template (/carts/id/), never by the raw path, to bound the number of series
+        - Every request is logged at DEBUG level (LOG_LEVEL_REST=DEBUG), with its raw path
+        - Plain ASGI middleware on purpose: the latency covers the whole response, streamed responses included
+    """
+
+    def __init__(self, app: ASGIApp):
+        """
+        Initializer
+        Args:
+            app: Wrapped ASGI application
+        """
+        self.app = app
+        self._routes: Dict[Callable, str] = dict()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        ASGI entry point
+        Args:
+            scope: ASGI connection scope
+            receive: ASGI receive channel
+            send: ASGI send channel
+
+        Returns: None
+
+        """
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = perf_counter() - start
+            HTTP_REQUEST_SECONDS.observe(elapsed, scope['method'], self._route(scope), str(status))
+            REST_LOGGER.debug('%s %s %d (%.1f ms)', scope['method'], scope['path'], status, elapsed * 1e3)
+
+    def _route(self, scope: Scope) -> str:
+        """
+        Path template of the route that served a request (the router leaves its endpoint in the scope)
+        Args:
+            scope: ASGI connection scope, once served
+
+        Returns: Route path template, UNMATCHED_ROUTE when no route matched
+
+        """
+        endpoint = scope.get('endpoint')
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+
+        route = self._routes.get(endpoint)
+        if route is None:
+            route = self._routes[endpoint] = next((
+                candidate.path for candidate in scope['app'].routes if getattr(candidate, 'endpoint', None) is endpoint
+            ), UNMATCHED_ROUTE)
+        return route
+
+
+class StatementProfilerMiddleware(object):
+    """ Counts the statements executed by every HTTP request when statement profiling is enabled (see PROFILER)
+    Notes:
+        - Statements executed many times within a request are logged as likely N+1 patterns
+    """
+
+    def __init__(self, app: ASGIApp):
+        """
+        Initializer
+        Args:
+            app: Wrapped ASGI application
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        ASGI entry point
+        Args:
+            scope: ASGI connection scope
+            receive: ASGI receive channel
+            send: ASGI send channel
+
+        Returns: None
+
+        """
+        if scope['type'] != 'http' or not PROFILER.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        with PROFILER.request_scope(f'{scope["method"]} {scope["path"]}'):
+            await self.app(scope, receive, send)
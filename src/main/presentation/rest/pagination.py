@@ -0,0 +1,56 @@
+""" REST API pagination and streaming utilities """
+from typing import Any, AsyncIterator, Callable, Dict
+
+import orjson
+from fastapi import Query as QueryParam
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy.engine import Result
+
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+
+
+def limit_param() -> Any:
+    """
+    Shared declaration of the page size query parameter
+    Returns: FastAPI query parameter
+
+    """
+    return QueryParam(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description='Maximum number of rows to retrieve')
+
+
+def ndjson_response(rows: AsyncIterator[Any], serialize: Callable[[Any], Dict] = None) -> StreamingResponse:
+    """
+    Streams rows as newline delimited JSON (one JSON object per line)
+    Args:
+        rows: Asynchronous iterator of rows, usually a service stream_* method (fetching them in batches)
+        serialize: Turns every row into a JSON serializable dict, Entity.to_dict by default
+
+    Returns: StreamingResponse
+
+    """
+    serialize = serialize if serialize is not None else (lambda row: row.to_dict())
+
+    async def lines():
+        async for row in rows:
+            yield orjson.dumps(serialize(row)) + b'\n'
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
+
+def rows_response(rows: Result) -> ORJSONResponse:
+    """
+    Serialises plain rows straight into a JSON Array of objects, keyed by column name
+    Args:
+        rows: SQL Alchemy Result instance, usually a service read_*_rows method (selecting plain columns)
+
+    Notes:
+        - Returning a Response skips FastAPI's response model validation and reflective encoding: the rows columns must
+          already match the endpoint response model
+
+    Returns: ORJSONResponse
+
+    """
+    keys = tuple(rows.keys())
+    return ORJSONResponse([dict(zip(keys, row)) for row in rows])
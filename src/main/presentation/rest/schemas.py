@@ -0,0 +1,74 @@
+""" REST API models: the documented shape of every Entity served by the API, and of the request bodies """
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from ...domain.money import DEFAULT_ROUNDING
+
+
+class EntityModel(BaseModel):
+    """ Common response model configuration: models can be read straight from Entities """
+
+    class Config:
+        orm_mode = True
+
+
+class ItemModel(EntityModel):
+    """ Item response model, price in cents """
+    id: int
+    code: Optional[str]
+    name: Optional[str]
+    price: Optional[int]
+
+
+class CartItemModel(ItemModel):
+    """ Item response model within a cart, along the number of units in the cart """
+    quantity: int
+
+
+class CartModel(EntityModel):
+    """ Cart response model, total price in cents """
+    id: int
+    total_price: Optional[int]
+    user_id: Optional[int]
+
+
+class CartDetailModel(CartModel):
+    """ Cart response model along its items """
+    items: List[CartItemModel]
+
+
+class UserModel(EntityModel):
+    """ User response model along its cart """
+    id: int
+    name: Optional[str]
+    fullname: Optional[str]
+    nickname: Optional[str]
+    cart: Optional[CartModel]
+
+
+class RuleModel(EntityModel):
+    """ Offer Rule response model """
+    id: int
+    item_code: Optional[str]
+    name: Optional[str]
+    description: Optional[str]
+    firing_condition_operator: Optional[str]
+    firing_condition_quantity: Optional[int]
+    effect_type: Optional[str]
+    effect_percentage: Optional[float]
+    rounding: str
+    version: int
+
+
+class RuleCandidateModel(BaseModel):
+    """ Candidate Offer Rule request model, see PromotionSimulator. The id of an existing rule simulates its update """
+    id: Optional[int]
+    item_code: str
+    name: Optional[str]
+    description: Optional[str]
+    firing_condition_operator: str
+    firing_condition_quantity: int
+    effect_type: str
+    effect_percentage: Optional[float]
+    rounding: str = DEFAULT_ROUNDING
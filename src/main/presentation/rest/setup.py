@@ -1,16 +1,21 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 
+from .middleware import SessionScopeMiddleware, StatementProfilerMiddleware, TimingMiddleware
+from ...infrastructure.metrics.registry import PROMETHEUS_MEDIA_TYPE, REGISTRY
 from .controllers.user_controller import router as user_router
 from .controllers.item_controller import router as item_router
 from .controllers.cart_controller import router as cart_router
 from .controllers.rule_controller import router as rule_router
+from .controllers.debug_controller import router as debug_router
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 app.include_router(user_router)
 app.include_router(item_router)
 app.include_router(cart_router)
 app.include_router(rule_router)
+app.include_router(debug_router)
 
 origins = ["*"]
 
@@ -21,6 +26,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(SessionScopeMiddleware)
+app.add_middleware(StatementProfilerMiddleware)
+app.add_middleware(TimingMiddleware)
 
 
 @app.get('/')
@@ -31,3 +39,13 @@ async def root():
 
     """
     return {'message': 'Welcome!'}
+
+
+@app.get('/metrics', response_class=PlainTextResponse)
+async def metrics():
+    """
+    Latency histograms of HTTP requests (by route), transactions and rules engine stages
+    Returns: Prometheus text exposition format
+
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type=PROMETHEUS_MEDIA_TYPE)
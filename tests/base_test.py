@@ -1,16 +1,63 @@
 """ Base Test class to aid database refresh on Unit Tests"""
+from contextlib import contextmanager
+from typing import Iterator, List
+
 import aiounittest
+from sqlalchemy import event
+
+from src.main.application.item_service import ItemService
+from src.main.application.prefill_service import Prefill
+from src.main.application.priced_cart_cache import PRICED_CARTS
+from src.main.application.rule_catalogue import RULE_CATALOGUE
+from src.main.application.rule_plans import RULE_PLANS
+from src.main.infrastructure.database.setup import get_async_engine, get_engine, init_db, shutdown_db
 
-from src.main.infrastructure.database.setup import init_db, shutdown_db
+# Items (by id) added one by one to carts 1, 2 and 3: challenge samples 1, 2 and 3
+CHALLENGE_SAMPLES = {1: [1, 2, 1, 1, 3], 2: [1, 1], 3: [2, 2, 1, 2]}
 
 
 class BaseTest(aiounittest.AsyncTestCase):
     """ Test utility class. For DRY purposes, init and clean up DB before and after each unit test """
 
     def setUp(self) -> None:
-        """ Initializes DB """
+        """ Initializes DB and drops any rule compiled or cart priced against a previous DB """
         init_db()
+        RULE_PLANS.clear()
+        RULE_CATALOGUE.invalidate()
+        PRICED_CARTS.clear()
 
     def tearDown(self) -> None:
         """ Destroys DB """
         shutdown_db()
+
+    @staticmethod
+    async def arrange_challenge_samples() -> None:
+        """ Creates the challenge rules and items, three carts holding challenge samples 1, 2 and 3 and an empty one """
+        await Prefill.rules()
+        await Prefill.items()
+        await Prefill.users(4)
+        await Prefill.carts()
+        for cart_id, item_ids in CHALLENGE_SAMPLES.items():
+            for item_id in item_ids:
+                await ItemService().add_to_cart(item_id, cart_id)
+
+    @contextmanager
+    def capture_statements(self) -> Iterator[List[str]]:
+        """
+        Captures every SQL statement emitted by the (sync and async) engines inside the context
+        Returns: Iterator yielding the (growing) list of captured statements
+
+        """
+        statements = list()
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engines = (get_engine(), get_async_engine().sync_engine)
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', capture)
+        try:
+            yield statements
+        finally:
+            for engine in engines:
+                event.remove(engine, 'before_cursor_execute', capture)
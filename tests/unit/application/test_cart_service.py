@@ -1,4 +1,7 @@
 """ Unit Test module for cart_service module """
+from sqlalchemy.orm import joinedload
+
+from src.main.application.item_service import ItemService
 from src.main.application.prefill_service import Prefill
 from src.main.application.cart_service import CartService
 from tests.base_test import BaseTest
@@ -63,6 +66,87 @@ class TestCartService(BaseTest):
 
         self.assertEqual(10, len(cart_query.all()))
 
+    async def test_read_carts_paginates_by_id(self):
+        """
+        Checks that carts can be read a page at a time
+        Notes:
+            - Arrange: Prefill multiple users and carts
+            - Act: Read carts after the third one, four at a time
+            - Assert: Carts 4 to 7 are red
+        Returns: None
+
+        """
+        await Prefill.users()
+        await Prefill.carts()
+
+        cart_query = await self.cart_service.read_carts(after=3, limit=4)
+
+        self.assertEqual([4, 5, 6, 7], [cart.id for cart in cart_query.all()])
+
+    async def test_read_cart_rows(self):
+        """
+        Checks that carts can be read as plain rows, a page at a time
+        Notes:
+            - Arrange: Prefill multiple users and carts
+            - Act: Read the rows after the third cart, four at a time
+            - Assert: Rows of carts 4 to 7 hold every cart column
+        Returns: None
+
+        """
+        await Prefill.users()
+        await Prefill.carts()
+
+        rows = await self.cart_service.read_cart_rows(after=3, limit=4)
+
+        self.assertEqual(['id', 'total_price', 'user_id'], list(rows.keys()))
+        self.assertEqual([4, 5, 6, 7], [row.id for row in rows.all()])
+
+    async def test_read_cart_eager_loads_items(self):
+        """
+        Checks that reading a cart and all of its items emits a bounded number of statements
+        Notes:
+            - Arrange: Prefill users, carts and items, add ten units of three items to a cart
+            - Act: Read cart and touch every cart line item
+            - Assert: Three statements (cart, cart lines, items) were emitted, irrespectively of the number of lines
+        Returns: None
+
+        """
+        await Prefill.users(1)
+        await Prefill.carts()
+        await Prefill.items()
+        for item_id in [1, 2, 3] * 3 + [1]:
+            await ItemService().add_to_cart(item_id, 1)
+
+        with self.capture_statements() as statements:
+            cart_query = await self.cart_service.read_cart({'id': 1})
+            lines = {cart_item.item.code: cart_item.quantity for cart_item in cart_query.first().items}
+
+        self.assertEqual({'GR1': 4, 'SR1': 3, 'CF1': 3}, lines)
+        self.assertEqual(3, len(statements))
+
+    async def test_read_cart_joined_loads_items(self):
+        """
+        Checks that the loader strategy can be chosen
+        Notes:
+            - Arrange: Prefill users, carts and items, add one line per item to a cart
+            - Act: Read cart joined loading its items and touch every cart line item
+            - Assert: A single statement was emitted
+        Returns: None
+
+        """
+        await Prefill.users(1)
+        await Prefill.carts()
+        await Prefill.items()
+        for item_id in [1, 2, 3]:
+            await ItemService().add_to_cart(item_id, 1)
+
+        with self.capture_statements() as statements:
+            cart_query = await self.cart_service.read_cart({'id': 1}, loader=joinedload)
+            codes = [cart_item.item.code for cart_item in cart_query.first().items]
+
+        self.assertEqual(['GR1', 'SR1', 'CF1'], codes)
+        self.assertEqual(1, len(statements))
+
     def test_update_cart(self):
         """
         Checks that update cart is not implemented yet
@@ -0,0 +1,146 @@
+""" Unit Test module for columnar_pricing module """
+import random
+
+from src.main.application.columnar_pricing import LOOKUP_CHUNK_SIZE, ColumnarRuleEngine
+from src.main.application.item_service import ItemService
+from src.main.application.prefill_service import Prefill
+from src.main.application.rules_service import PRICING_AGGREGATE, PRICING_LINES, RuleEngine
+from tests.base_test import BaseTest
+
+
+class TestColumnarRuleEngine(BaseTest):
+    """ Unit Test class for ColumnarRuleEngine class """
+
+    async def test_price_carts_challenge_samples(self):
+        """
+        Checks that columnar pricing gives the challenge totals, as RuleEngine.apply does
+        Notes:
+            - Arrange: Create three carts with challenge samples 1, 2 and 3 and an empty one, apply rules to each
+            - Act: Invoke price_carts with every cart id plus a non existent one, in chunks of two
+            - Assert: Totals are the applied ones, the empty cart is priced at 0 and the missing one is skipped
+        Returns: None
+
+        """
+        await self.arrange_challenge_samples()
+
+        applied = await RuleEngine().apply_many([1, 2, 3, 4])
+        cart_ids, totals = await ColumnarRuleEngine().price_carts([5, 4, 3, 2, 1], chunk_size=2)
+
+        self.assertEqual([1, 2, 3, 4], cart_ids.tolist())
+        self.assertEqual([2245, 311, 1661, 0], totals.tolist())
+        self.assertEqual(applied, dict(zip(cart_ids.tolist(), totals.tolist())))
+
+    async def test_price_carts_matches_rule_engine_in_both_modes(self):
+        """
+        Checks that columnar pricing matches RuleEngine on random quantities of the challenge items
+        Notes:
+            - Arrange: Create twenty carts holding random quantities of the challenge items
+            - Act: Invoke price_carts and RuleEngine.apply_many, in lines and aggregate modes
+            - Assert: Totals are the same in each mode
+        Returns: None
+
+        """
+        random.seed(7)
+        await Prefill.rules()
+        await Prefill.items()
+        await Prefill.users(20)
+        await Prefill.carts()
+        for cart_id in range(1, 21):
+            for item_id in random.sample([1, 2, 3], random.randint(0, 3)):
+                await ItemService().add_to_cart(item_id, cart_id, quantity=random.randint(1, 30))
+
+        for mode in (PRICING_LINES, PRICING_AGGREGATE):
+            applied = await RuleEngine(mode=mode).apply_many(range(1, 21))
+            cart_ids, totals = await ColumnarRuleEngine(mode=mode).price_carts()
+
+            self.assertEqual(applied, dict(zip(cart_ids.tolist(), totals.tolist())), mode)
+
+    async def test_price_carts_matches_rule_engine_on_generated_data(self):
+        """
+        Checks that columnar pricing matches RuleEngine with many codes, rules per code and lines per cart
+        Notes:
+            - Arrange: Generate carts, items and rules (of both effect types) with Prefill.generate
+            - Act: Invoke price_carts and RuleEngine.apply_many, in lines and aggregate modes
+            - Assert: Totals are the same in each mode
+        Returns: None
+
+        """
+        await Prefill.generate(users=20, items=30, carts=50, lines=400, rules=60, seed=3)
+
+        for mode in (PRICING_LINES, PRICING_AGGREGATE):
+            applied = await RuleEngine(mode=mode).apply_many(range(1, 51))
+            cart_ids, totals = await ColumnarRuleEngine(mode=mode).price_carts(chunk_size=16)
+
+            self.assertEqual(applied, dict(zip(cart_ids.tolist(), totals.tolist())), mode)
+
+    async def test_price_carts_when_no_cart_exists(self):
+        """
+        Checks that pricing no cart gives empty arrays
+        Notes:
+            - Arrange: N/A
+            - Act: Invoke price_carts with no cart id and with non existent ones
+            - Assert: Both return empty arrays
+        Returns: None
+
+        """
+        for cart_ids in ([], [1, 2]):
+            priced_ids, totals = await ColumnarRuleEngine().price_carts(cart_ids)
+
+            self.assertEqual(([], []), (priced_ids.tolist(), totals.tolist()))
+
+    async def test_price_carts_looks_up_requested_ids_only(self):
+        """
+        Checks that carts, their lines and item codes are looked up by id in bounded chunks, never by id range
+        Notes:
+            - Arrange: Generate five carts
+            - Act: Invoke price_carts with sparse cart ids, missing ones included, over two lookup chunks
+            - Assert: Only the requested existing carts are priced, carts are looked up with one IN per chunk and
+              nothing is selected by id range
+        Returns: None
+
+        """
+        await Prefill.generate(users=5, items=10, carts=5, lines=20, rules=5, seed=4)
+        cart_ids = [5, 1, 3] + list(range(1000, 1000 + LOOKUP_CHUNK_SIZE))
+
+        with self.capture_statements() as statements:
+            priced_ids, totals = await ColumnarRuleEngine().price_carts(cart_ids)
+
+        self.assertEqual([1, 3, 5], priced_ids.tolist())
+        cart_lookups = [statement for statement in statements if statement.startswith('SELECT carts.id')]
+        self.assertEqual(2, sum('carts.id IN' in statement for statement in cart_lookups))
+        self.assertFalse([statement for statement in statements if 'BETWEEN' in statement])
+
+    async def test_price_carts_keeps_large_totals_exact(self):
+        """
+        Checks that cart totals beyond the float64 integer precision are summed exactly
+        Notes:
+            - Arrange: Create a cart holding three units of an item priced 2 ** 52 + 1 cents, and a cheap item
+            - Act: Invoke price_carts
+            - Assert: Total is the exact sum, the RuleEngine one
+        Returns: None
+
+        """
+        await Prefill.users(1)
+        await Prefill.carts()
+        await ItemService().create_item('BIG', 'big', 2 ** 52 + 1)
+        await ItemService().create_item('SMALL', 'small', 2)
+        await ItemService().add_to_cart(1, 1, quantity=3)
+        await ItemService().add_to_cart(2, 1)
+
+        cart_ids, totals = await ColumnarRuleEngine().price_carts()
+
+        self.assertEqual([3 * 2 ** 52 + 5], totals.tolist())
+        self.assertEqual(await RuleEngine().price_carts([1]), dict(zip(cart_ids.tolist(), totals.tolist())))
+
+    def test_unknown_mode_raises_error(self):
+        """
+        Checks that only known pricing modes are accepted
+        Notes:
+            - Arrange: N/A
+            - Act: Build an engine with an unknown mode
+            - Assert: RuntimeError is raised
+        Returns: None
+
+        """
+        with self.assertRaises(RuntimeError):
+            ColumnarRuleEngine(mode='unknown')
@@ -22,7 +22,7 @@ class TestItemService(BaseTest):
         Returns: None
 
         """
-        test_item_data = {'code': 'TST', 'name': 'test_item', 'price': 4.2}
+        test_item_data = {'code': 'TST', 'name': 'test_item', 'price': 420}
 
         await self.item_service.create_item(**test_item_data)
 
@@ -66,6 +66,41 @@ class TestItemService(BaseTest):
 
         self.assertEqual(3, len(cart_query.all()))
 
+    async def test_read_items_paginates_by_id(self):
+        """
+        Checks that items can be read a page at a time
+        Notes:
+            - Arrange: Prefill items
+            - Act: Read the first page and the page after it, two items at a time
+            - Assert: Both pages have the expected items
+        Returns: None
+
+        """
+        await Prefill.items()
+
+        first_page = (await self.item_service.read_items(limit=2)).all()
+        second_page = (await self.item_service.read_items(after=first_page[-1].id, limit=2)).all()
+
+        self.assertEqual(['GR1', 'SR1'], [item.code for item in first_page])
+        self.assertEqual(['CF1'], [item.code for item in second_page])
+
+    async def test_read_item_rows(self):
+        """
+        Checks that items can be read as plain rows, a page at a time
+        Notes:
+            - Arrange: Prefill items
+            - Act: Read the rows after the first item
+            - Assert: Rows hold every item column, in order
+        Returns: None
+
+        """
+        await Prefill.items()
+
+        rows = await self.item_service.read_item_rows(after=1, limit=2)
+
+        self.assertEqual(['id', 'code', 'name', 'price'], list(rows.keys()))
+        self.assertEqual(['SR1', 'CF1'], [code for _, code, _, _ in rows.all()])
+
     def test_update_item(self):
         """
         Checks that updating an item is not implemented yet
@@ -109,10 +144,8 @@ class TestItemService(BaseTest):
         await self.item_service.add_to_cart(2, 1)
         await self.item_service.add_to_cart(3, 1)
 
-        item_query = await self.item_service.read_items()
-        items = item_query.all()
-
-        for item in items:
+        for item_id in (1, 2, 3):
+            item = self.item_service.read_item({'id': item_id}).first()
             self.assertEqual(1, item.carts[0].carts_id)
 
     async def test_remove_from_cart(self):
@@ -138,3 +171,69 @@ class TestItemService(BaseTest):
 
         for cart_item in item.carts:
             self.assertFalse(cart_item.carts_id != 1)
+        self.assertEqual(2, item.carts[0].quantity)
+
+    async def test_add_to_cart_upserts_quantity(self):
+        """
+        Checks that adding an item already in a cart increases its quantity instead of adding a line
+        Notes:
+            - Arrange: Prefill users, carts and items
+            - Act: Add the same item to a cart twice, the second time several units at once
+            - Assert: Cart holds a single line with the sum of both quantities, written with one statement each
+        Returns: None
+
+        """
+        await Prefill.users()
+        await Prefill.carts()
+        await Prefill.items()
+
+        with self.capture_statements() as statements:
+            await self.item_service.add_to_cart(1, 1)
+            await self.item_service.add_to_cart(1, 1, quantity=4)
+
+        item = self.item_service.read_item({'id': 1}).first()
+        line_statements = [statement for statement in statements if statement.startswith('INSERT INTO items_to_carts')]
+        self.assertEqual([(1, 5)], [(cart_item.carts_id, cart_item.quantity) for cart_item in item.carts])
+        self.assertEqual(2, len(line_statements))
+
+    async def test_add_to_cart_when_cart_or_item_not_found_raises_error(self):
+        """
+        Checks that items can only be added to existing carts, and only existing items
+        Notes:
+            - Arrange: Prefill users, carts and items
+            - Act: Add a non existent item to a cart, and an item to a non existent cart
+            - Assert: RuntimeError is raised both times and nothing is added
+        Returns: None
+
+        """
+        await Prefill.users(1)
+        await Prefill.carts()
+        await Prefill.items()
+
+        with self.assertRaises(RuntimeError):
+            await self.item_service.add_to_cart(9, 1)
+        with self.assertRaises(RuntimeError):
+            await self.item_service.add_to_cart(1, 9)
+
+        self.assertEqual([], self.item_service.read_item({'id': 1}).first().carts)
+
+    async def test_remove_from_cart_drops_empty_lines(self):
+        """
+        Checks that removing every unit of an item drops its cart line
+        Notes:
+            - Arrange: Prefill users, carts and items, add three units of an item to a cart
+            - Act: Remove two units, then the remaining one
+            - Assert: Quantity is decremented, then the line is gone
+        Returns: None
+
+        """
+        await Prefill.users()
+        await Prefill.carts()
+        await Prefill.items()
+        await self.item_service.add_to_cart(1, 1, quantity=3)
+
+        await self.item_service.remove_from_cart(1, 1, quantity=2)
+        self.assertEqual(1, self.item_service.read_item({'id': 1}).first().carts[0].quantity)
+
+        await self.item_service.remove_from_cart(1, 1)
+        self.assertEqual([], self.item_service.read_item({'id': 1}).first().carts)
@@ -0,0 +1,113 @@
+""" Unit Test module for parallel_repricing module """
+import os
+import tempfile
+
+from src.main.application.cart_service import CartService
+from src.main.application.parallel_repricing import ParallelRepricer
+from src.main.application.prefill_service import Prefill
+from src.main.application.rules_service import PRICING_AGGREGATE, PRICING_LINES, RuleEngine
+from src.main.infrastructure.database.config import DatabaseSettings
+from src.main.infrastructure.database.setup import (configure_db, get_async_engine, get_database_settings, init_db,
+                                                     shutdown_db)
+from tests.base_test import BaseTest
+
+
+class TestParallelRepricer(BaseTest):
+    """ Unit Test class for ParallelRepricer class """
+
+    async def test_reprice_matches_rule_engine_in_both_modes(self):
+        """
+        Checks that repricing shards gives RuleEngine totals and writes them
+        Notes:
+            - Arrange: Generate carts, items and rules with Prefill.generate
+            - Act: Invoke reprice with several workers on the in-memory database, in lines and aggregate modes
+            - Assert: A fallback warning is logged, totals are the RuleEngine ones and carts hold them
+        Returns: None
+
+        """
+        await Prefill.generate(users=20, items=30, carts=50, lines=400, rules=60, seed=3)
+
+        for mode in (PRICING_LINES, PRICING_AGGREGATE):
+            expected = await RuleEngine(mode=mode).price_carts(list(range(1, 51)))
+            with self.assertLogs('amenitiz.rules', level='WARNING'):
+                totals = await ParallelRepricer(workers=4, shard_size=7, mode=mode, progress=None).reprice()
+
+            self.assertEqual(expected, totals, mode)
+            carts = await CartService().read_carts()
+            self.assertEqual(expected, {cart.id: cart.total_price for cart in carts}, mode)
+
+    async def test_reprice_reports_progress_per_shard(self):
+        """
+        Checks that progress is reported after every written shard and that missing carts are skipped
+        Notes:
+            - Arrange: Generate five carts
+            - Act: Invoke reprice on every cart plus a non existent one, in shards of two
+            - Assert: Progress grows shard by shard up to the requested carts, only existing carts are priced
+        Returns: None
+
+        """
+        await Prefill.generate(users=5, items=6, carts=5, lines=20, rules=2, seed=1)
+        calls = list()
+
+        totals = await ParallelRepricer(workers=1, shard_size=2, progress=lambda *args: calls.append(args)).reprice(
+            [5, 4, 3, 2, 1, 99]
+        )
+
+        self.assertEqual([1, 2, 3, 4, 5], sorted(totals))
+        self.assertEqual([(2, 6), (4, 6), (5, 6)], calls)
+
+    async def test_reprice_in_worker_processes(self):
+        """
+        Checks that spawned workers price shards against the driver database
+        Notes:
+            - Arrange: Point the engines to a temporary file database, generate carts, items and rules
+            - Act: Invoke reprice with two workers
+            - Assert: Totals are the RuleEngine ones and carts hold them
+        Returns: None
+
+        """
+        settings = get_database_settings()
+        shutdown_db()
+        await get_async_engine().dispose()
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                configure_db(DatabaseSettings(url=f'sqlite:///{os.path.join(directory, "test.db")}', echo=False))
+                init_db()
+                await Prefill.generate(users=10, items=20, carts=40, lines=300, rules=30, seed=5)
+                expected = await RuleEngine().price_carts(list(range(1, 41)))
+
+                totals = await ParallelRepricer(workers=2, shard_size=10, progress=None).reprice()
+                carts = await CartService().read_carts()
+                await get_async_engine().dispose()
+        finally:
+            configure_db(settings)
+            init_db()
+
+        self.assertEqual(expected, totals)
+        self.assertEqual(expected, {cart.id: cart.total_price for cart in carts})
+
+    def test_shard_partitions_sorted_unique_ids(self):
+        """
+        Checks that cart ids are split into shards of consecutive ids
+        Notes:
+            - Arrange: N/A
+            - Act: Shard unsorted ids holding a duplicate, in shards of two
+            - Assert: Shards hold sorted unique ids, the last one the remainder
+        Returns: None
+
+        """
+        self.assertEqual([[1, 2], [3, 5], [8]], ParallelRepricer(shard_size=2).shard([8, 3, 1, 5, 2, 3]))
+
+    def test_invalid_settings_raise_error(self):
+        """
+        Checks that only known pricing modes and positive shard sizes are accepted
+        Notes:
+            - Arrange: N/A
+            - Act: Build repricers with an unknown mode and with an empty shard size
+            - Assert: RuntimeError is raised
+        Returns: None
+
+        """
+        for options in ({'mode': 'unknown'}, {'shard_size': 0}):
+            with self.assertRaises(RuntimeError):
+                ParallelRepricer(**options)
@@ -1,6 +1,8 @@
 """ Unit Test module for prefill_service module """
+from sqlalchemy.orm import selectinload
+
 from src.main.application.cart_service import CartService
-from src.main.application.rules_service import RuleService
+from src.main.application.rules_service import PRICING_AGGREGATE, RuleEngine, RuleService
 from src.main.application.item_service import ItemService
 from src.main.application.prefill_service import Prefill
 from src.main.application.user_service import UserService
@@ -58,3 +60,48 @@ class TestPrefill(BaseTest):
         self.assertEqual(3, len(items_query.all()))
         self.assertEqual(3, len(rules_query.all()))
         self.assertEqual(10, len(carts_query.all()))
+
+    async def test_generate(self):
+        await Prefill.users(2)
+        await Prefill.generate(users=20, items=15, carts=10, lines=35, rules=5, seed=1, chunk_size=4)
+
+        users_query = await self.user_service.read_users()
+        items_query = await self.item_service.read_items()
+        rules_query = await self.rule_service.read_offer_rules()
+        carts_query = await self.cart_service.read_carts(loader=selectinload)
+        carts = carts_query.all()
+
+        self.assertEqual(22, len(users_query.all()))
+        self.assertEqual(15, len(items_query.all()))
+        self.assertEqual(5, len(rules_query.all()))
+        self.assertEqual([4] * 5 + [3] * 5, [len(cart.items) for cart in carts])
+        self.assertTrue(all(len({cart_item.items_id for cart_item in cart.items}) == len(cart.items) for cart in carts))
+
+    async def test_generate_carts_are_repriced_consistently(self):
+        await Prefill.generate(users=5, items=10, carts=5, lines=20, rules=10, seed=2)
+        engine = RuleEngine(mode=PRICING_AGGREGATE)
+
+        stale = await engine.check_totals(range(1, 6))
+        await self.item_service.add_to_cart(1, 1)
+        await engine.apply_many(range(2, 6))
+        repriced = await engine.check_totals(range(1, 6))
+        self.rule_service.create_offer_rule('I1', 'never', None, '>=', 1000, 'one_free', None)
+
+        self.assertEqual(5, len(stale))
+        self.assertEqual({}, repriced)
+        self.assertEqual({}, await engine.check_totals(range(1, 6)))
+
+    async def test_generate_when_lines_do_not_fit_raises_error(self):
+        with self.assertRaises(RuntimeError):
+            await Prefill.generate(users=1, items=2, carts=1, lines=3)
+
+    async def test_generate_rules_for_existing_codes(self):
+        await Prefill.items()
+        await Prefill.generate(items=4, rules=20, seed=3)
+        await Prefill.generate(rules=20, seed=3)
+
+        rules_query = await self.rule_service.read_offer_rules()
+        codes = [rule.item_code for rule in rules_query.all()]
+
+        self.assertTrue(set(codes[:20]) <= {'I4', 'I5', 'I6', 'I7'})
+        self.assertTrue(set(codes[20:]) <= {'GR1', 'SR1', 'CF1', 'I4', 'I5', 'I6', 'I7'})
@@ -0,0 +1,66 @@
+""" Unit Test module for priced_cart_cache module """
+import unittest
+
+from src.main.application.priced_cart_cache import PricedCartCache
+
+
+class TestPricedCartCache(unittest.TestCase):
+    """ Unit Test class for PricedCartCache class """
+
+    def test_get_after_put_hits(self):
+        """
+        Checks that cached totals are served and counted
+        Notes:
+            - Arrange: Cache a total
+            - Act: Look it up, then look up an unknown fingerprint
+            - Assert: First lookup hits, second misses, metrics reflect both
+        Returns: None
+
+        """
+        cache = PricedCartCache()
+        cache.put(1, ('GR1', 2), 3.11)
+
+        self.assertEqual(3.11, cache.get(1, ('GR1', 2)))
+        self.assertIsNone(cache.get(1, ('GR1', 3)))
+        self.assertEqual({'size': 1, 'maxsize': cache.maxsize, 'hits': 1, 'misses': 1, 'hit_ratio': 0.5,
+                          'evictions': 0}, cache.metrics())
+
+    def test_put_evicts_least_recently_used(self):
+        """
+        Checks that the cache stays bounded, evicting the least recently used total
+        Notes:
+            - Arrange: Fill a cache of two totals and look up the oldest one
+            - Act: Cache a third total
+            - Assert: The total not looked up was evicted
+        Returns: None
+
+        """
+        cache = PricedCartCache(maxsize=2)
+        cache.put(1, 'a', 1.0)
+        cache.put(1, 'b', 2.0)
+        cache.get(1, 'a')
+
+        cache.put(1, 'c', 3.0)
+
+        self.assertEqual(2, len(cache))
+        self.assertEqual(1, cache.evictions)
+        self.assertIsNone(cache.get(1, 'b'))
+        self.assertEqual(1.0, cache.get(1, 'a'))
+
+    def test_newer_version_clears_cache(self):
+        """
+        Checks that rule catalogue changes invalidate every cached total, and stale versions are ignored
+        Notes:
+            - Arrange: Cache a total for a version
+            - Act: Look it up with a newer version, then cache and look up totals with the older version
+            - Assert: Nothing is served for any other version than the newest one
+        Returns: None
+
+        """
+        cache = PricedCartCache()
+        cache.put(1, 'a', 1.0)
+
+        self.assertIsNone(cache.get(2, 'a'))
+        cache.put(1, 'a', 1.0)
+        self.assertIsNone(cache.get(1, 'a'))
+        self.assertEqual(0, len(cache))
@@ -0,0 +1,123 @@
+""" Unit Test module for promotion_simulator module """
+from src.main.application.cart_service import CartService
+from src.main.application.prefill_service import Prefill
+from src.main.application.promotion_simulator import PromotionSimulator
+from src.main.application.rules_service import PRICING_AGGREGATE, PRICING_LINES, RuleEngine, RuleService
+from src.main.domain.rule_entity import Rule
+from tests.base_test import BaseTest
+
+COFFEE_HALF_PRICE = {
+    'item_code': 'CF1', 'name': 'coffee-half-price', 'firing_condition_operator': '>=', 'firing_condition_quantity': 1,
+    'effect_type': 'update_prices', 'effect_percentage': 0.5,
+}
+
+
+class TestPromotionSimulator(BaseTest):
+    """ Unit Test class for PromotionSimulator class """
+
+    async def test_simulate_added_rule(self):
+        """
+        Checks revenue, affected carts and firings of a candidate rule added to the current ones
+        Notes:
+            - Arrange: Create the challenge samples carts
+            - Act: Simulate a half price coffee rule
+            - Assert: Only the first cart gets cheaper, firings are counted per rule and nothing is written
+        Returns: None
+
+        """
+        await self.arrange_challenge_samples()
+        stored_totals = [cart.total_price for cart in await CartService().read_carts()]
+
+        simulation = await PromotionSimulator().simulate([Rule(**COFFEE_HALF_PRICE)])
+
+        self.assertEqual({'carts': 4, 'affected_carts': 1, 'baseline_revenue': 4217, 'simulated_revenue': 3656,
+                          'revenue_delta': -561}, {key: value for key, value in simulation.to_dict().items()
+                                                   if key != 'rules'})
+        self.assertEqual([
+            {'id': 1, 'name': 'buy-one-get-one-free', 'item_code': 'GR1', 'candidate': False, 'baseline_carts': 2,
+             'simulated_carts': 2},
+            {'id': 2, 'name': 'bulk-strawberries', 'item_code': 'SR1', 'candidate': False, 'baseline_carts': 1,
+             'simulated_carts': 1},
+            {'id': 3, 'name': 'coffee-addiction', 'item_code': 'CF1', 'candidate': False, 'baseline_carts': 0,
+             'simulated_carts': 0},
+            {'id': None, 'name': 'coffee-half-price', 'item_code': 'CF1', 'candidate': True, 'baseline_carts': 0,
+             'simulated_carts': 1},
+        ], [rule.to_dict() for rule in simulation.rules])
+        self.assertEqual(stored_totals, [cart.total_price for cart in await CartService().read_carts()])
+        self.assertEqual(3, RuleService().read_offer_rule({}).count())
+
+    async def test_simulate_updated_and_replaced_rules(self):
+        """
+        Checks candidates holding the id of a current rule, and candidates replacing the whole rule set
+        Notes:
+            - Arrange: Create the challenge samples carts
+            - Act: Simulate raising the green tea rule threshold to 4 units, then no rule at all
+            - Assert: The updated rule stops firing, without rules every cart is charged its base price
+        Returns: None
+
+        """
+        await self.arrange_challenge_samples()
+        green_tea = Rule(id=1, item_code='GR1', name='buy-three-get-one-free', firing_condition_operator='>=',
+                         firing_condition_quantity=4, effect_type='one_free')
+
+        updated = await PromotionSimulator().simulate([green_tea])
+        replaced = await PromotionSimulator().simulate([], replace=True)
+
+        self.assertEqual((2, 622), (updated.affected_carts, updated.revenue_delta))
+        self.assertEqual([(1, False, 2, 0), (1, True, 0, 0)],
+                         [(rule.id, rule.candidate, rule.baseline_carts, rule.simulated_carts)
+                          for rule in updated.rules if rule.item_code == 'GR1'])
+        self.assertEqual((3, 3 * 311 + 500 + 1123 + 2 * 311 + 3 * 500 + 311), (replaced.affected_carts,
+                                                                               replaced.simulated_revenue))
+
+    async def test_simulate_matches_applied_rules(self):
+        """
+        Checks that simulated revenue is the one pricing carts after inserting the candidate rules gives
+        Notes:
+            - Arrange: Generate carts, items and rules with Prefill.generate
+            - Act: Simulate candidate rules in chunks, insert them and price every cart, in lines and aggregate modes
+            - Assert: Baseline and simulated revenues and affected carts are the priced ones
+        Returns: None
+
+        """
+        await Prefill.generate(users=20, items=30, carts=50, lines=400, rules=10, seed=3)
+        candidates = [
+            {'item_code': 'I7', 'name': 'candidate_7', 'firing_condition_operator': '>', 'firing_condition_quantity': 1,
+             'effect_type': 'one_free', 'effect_percentage': None, 'description': None},
+            {'item_code': 'I12', 'name': 'candidate_12', 'firing_condition_operator': '>=',
+             'firing_condition_quantity': 2, 'effect_type': 'update_prices', 'effect_percentage': 0.15,
+             'description': None},
+        ]
+
+        for mode in (PRICING_LINES, PRICING_AGGREGATE):
+            simulation = await PromotionSimulator(mode=mode, chunk_size=16).simulate(
+                Rule(**candidate) for candidate in candidates
+            )
+            before = await RuleEngine(mode=mode).price_carts(list(range(1, 51)))
+            for candidate in candidates:
+                RuleService().create_offer_rule(**candidate)
+            after = await RuleEngine(mode=mode).price_carts(list(range(1, 51)))
+            for candidate in candidates:
+                RuleService().delete_rule(RuleService().read_offer_rule({'name': candidate['name']}).first().id)
+
+            self.assertEqual(sum(before.values()), simulation.baseline_revenue, mode)
+            self.assertEqual(sum(after.values()), simulation.simulated_revenue, mode)
+            self.assertEqual(sum(before[cart_id] != after[cart_id] for cart_id in before), simulation.affected_carts,
+                             mode)
+
+    async def test_simulate_rejects_invalid_candidates(self):
+        """
+        Checks that candidates are checked before any cart is priced
+        Notes:
+            - Arrange: N/A
+            - Act: Simulate candidates with an unknown operator, effect type or rounding policy, no item code, or a
+              price update percentage out of [0, 1]
+            - Assert: RuntimeError is raised
+        Returns: None
+
+        """
+        for invalid in ({'firing_condition_operator': '=>'}, {'effect_type': 'two_free'}, {'rounding': 'nearest'},
+                        {'item_code': None}, {'effect_percentage': 1.5}, {'effect_percentage': -0.1},
+                        {'effect_percentage': None}):
+            with self.assertRaises(RuntimeError):
+                await PromotionSimulator().simulate([Rule(**{**COFFEE_HALF_PRICE, **invalid})])
@@ -0,0 +1,178 @@
+""" Unit Test module for rule_catalogue module """
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+from sqlalchemy import select
+
+from src.main.application.prefill_service import Prefill
+from src.main.application.rule_catalogue import RuleCatalogue
+from src.main.application.rule_plans import RulePlanCache
+from src.main.domain.rule_entity import Rule
+from src.main.infrastructure.database.transaction import AsyncTransaction, Transaction
+from tests.base_test import BaseTest
+from tests.unit.application.test_rules_service import TEST_RULE
+
+
+class FakeClock(object):
+    """ Manually driven clock """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestRuleCatalogue(BaseTest):
+    """ Unit Test class for RuleCatalogue class """
+
+    async def test_get_indexes_rules_by_item_code(self):
+        """
+        Checks that the snapshot maps every item code to its compiled rules
+        Notes:
+            - Arrange: Prefill rules
+            - Act: Get the catalogue snapshot
+            - Assert: Every challenge item code has its rule and the snapshot is read-only
+        Returns: None
+
+        """
+        catalogue = RuleCatalogue(plans=RulePlanCache())
+        await Prefill.rules()
+
+        with Transaction() as t:
+            snapshot = catalogue.get(t.session)
+
+        self.assertEqual({'GR1', 'SR1', 'CF1'}, set(snapshot))
+        self.assertEqual('buy-one-get-one-free', snapshot['GR1'][0].name)
+        with self.assertRaises(TypeError):
+            snapshot['GR1'] = ()
+
+    async def test_get_counts_hits_and_misses(self):
+        """
+        Checks that only the first read (and reads after an invalidation) go to the database
+        Notes:
+            - Arrange: Prefill rules
+            - Act: Read the catalogue three times, invalidating it before the last read
+            - Assert: Two misses and one hit were counted, version increased
+        Returns: None
+
+        """
+        catalogue = RuleCatalogue(plans=RulePlanCache())
+        await Prefill.rules()
+
+        with Transaction() as t:
+            catalogue.get(t.session)
+            catalogue.get(t.session)
+            version = catalogue.version
+            catalogue.invalidate()
+            catalogue.get(t.session)
+
+        self.assertEqual(1, catalogue.hits)
+        self.assertEqual(2, catalogue.misses)
+        self.assertLess(version, catalogue.version)
+
+    async def test_get_reloads_after_ttl(self):
+        """
+        Checks the TTL fallback picks up writes the catalogue was not told about
+        Notes:
+            - Arrange: Read an empty catalogue, then prefill rules without invalidating it
+            - Act: Read the catalogue before and after its TTL elapses
+            - Assert: Stale snapshot is served until the TTL elapses
+        Returns: None
+
+        """
+        clock = FakeClock()
+        catalogue = RuleCatalogue(ttl=10, plans=RulePlanCache(), clock=clock)
+
+        with Transaction() as t:
+            self.assertEqual(0, len(catalogue.get(t.session)))
+        await Prefill.rules()
+
+        with Transaction() as t:
+            clock.now = 5
+            self.assertEqual(0, len(catalogue.get(t.session)))
+            clock.now = 11
+            self.assertEqual(3, len(catalogue.get(t.session)))
+
+    async def test_ttl_reload_keeps_version_of_unchanged_rules(self):
+        """
+        Checks that only reloads reading other rules increase the catalogue version
+        Notes:
+            - Arrange: Prefill rules, read the catalogue
+            - Act: Read it again once its TTL elapses, then update a rule behind its back and read it once more
+              after the TTL elapses again
+            - Assert: The first reload keeps the version, the second one increases it. Versions come along snapshots
+        Returns: None
+
+        """
+        clock = FakeClock()
+        catalogue = RuleCatalogue(ttl=10, plans=RulePlanCache(), clock=clock)
+        await Prefill.rules()
+
+        async with AsyncTransaction() as t:
+            loaded, _ = await catalogue.get_versioned_async(t.session)
+            clock.now = 11
+            refreshed, _ = await catalogue.get_versioned_async(t.session)
+        with Transaction() as t:
+            t.session.query(Rule).filter_by(id=1).first().firing_condition_quantity = 3
+        async with AsyncTransaction() as t:
+            clock.now = 22
+            changed, snapshot = await catalogue.get_versioned_async(t.session)
+
+        self.assertEqual((loaded, loaded + 1), (refreshed, changed))
+        self.assertEqual(catalogue.version, changed)
+        self.assertFalse(snapshot['GR1'][0].fires(2))
+
+    async def test_rules_read_while_invalidated_keep_previous_version(self):
+        """
+        Checks that rules loaded while the catalogue is invalidated are tagged with the version they were read at
+        Notes:
+            - Arrange: Prefill rules, mock a session invalidating the catalogue while its rules are read
+            - Act: Read the catalogue through that session
+            - Assert: Snapshot is served along the version before the invalidation, and not installed
+        Returns: None
+
+        """
+        catalogue = RuleCatalogue(plans=RulePlanCache())
+        await Prefill.rules()
+        version = catalogue.version
+
+        async with AsyncTransaction() as t:
+            rules = (await t.session.execute(select(Rule))).scalars().all()
+
+        async def execute(statement):
+            catalogue.invalidate()
+            result = MagicMock()
+            result.scalars.return_value.all.return_value = rules
+            return result
+
+        session = MagicMock()
+        session.execute = execute
+        served, snapshot = await catalogue.get_versioned_async(session)
+
+        self.assertEqual(version, served)
+        self.assertLess(served, catalogue.version)
+        self.assertEqual({'GR1', 'SR1', 'CF1'}, set(snapshot))
+        self.assertEqual(1, catalogue.misses)
+
+    def test_get_is_thread_safe(self):
+        """
+        Checks that concurrent readers share one load
+        Notes:
+            - Arrange: Mock a session returning one rule (in-memory SQLite databases are not shared across threads)
+            - Act: Read the catalogue from several threads
+            - Assert: Only one miss was counted and every thread got the same snapshot
+        Returns: None
+
+        """
+        catalogue = RuleCatalogue(plans=RulePlanCache())
+        session = MagicMock()
+        session.query.return_value.all.return_value = [Rule(id=1, version=1, **TEST_RULE)]
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            snapshots = list(executor.map(lambda _: catalogue.get(session), range(0, 20)))
+
+        self.assertEqual(1, catalogue.misses)
+        self.assertEqual(19, catalogue.hits)
+        self.assertEqual(1, session.query.call_count)
+        self.assertTrue(all(snapshot is snapshots[0] for snapshot in snapshots))
@@ -0,0 +1,179 @@
+""" Unit Test module for rule_plans module """
+from src.main.application.prefill_service import Prefill
+from src.main.application.rule_plans import CompiledRule, RulePlanCache
+from src.main.application.rules_service import RuleService
+from src.main.domain.rule_entity import Rule
+from src.main.infrastructure.database.transaction import Transaction
+from tests.base_test import BaseTest
+from tests.unit.application.test_rules_service import TEST_RULE
+
+
+class TestCompiledRule(BaseTest):
+    """ Unit Test class for CompiledRule class """
+
+    def test_fires_follows_firing_condition(self):
+        """
+        Checks that the compiled predicate honours the rule operator and quantity
+        Notes:
+            - Arrange: Compile TEST_RULE (>= 10)
+            - Act: Evaluate the predicate around the threshold
+            - Assert: Only quantities reaching the threshold fire
+        Returns: None
+
+        """
+        plan = CompiledRule(Rule(**TEST_RULE))
+
+        self.assertFalse(plan.fires(9))
+        self.assertTrue(plan.fires(10))
+        self.assertTrue(plan.fires(11))
+
+    def test_fires_when_operator_not_whitelisted_raises_error(self):
+        """
+        Checks that non whitelisted operators are never evaluated
+        Notes:
+            - Arrange: Compile a rule whose operator is arbitrary python code
+            - Act: Evaluate the predicate
+            - Assert: RuntimeError is raised
+        Returns: None
+
+        """
+        rule_copy = dict(TEST_RULE)
+        rule_copy['firing_condition_operator'] = '>= 0 or __import__("os") or'
+        plan = CompiledRule(Rule(**rule_copy))
+
+        with self.assertRaises(RuntimeError):
+            plan.fires(1)
+
+    def test_resolve_dispatches_effect_type(self):
+        """
+        Checks that both known effect types are resolved
+        Notes:
+            - Arrange: Compile an update_prices and a one_free rule
+            - Act: Resolve both with the same cart line
+            - Assert: Lines subtotal is discounted (as a single line) and one unit is dropped, respectively
+        Returns: None
+
+        """
+        rule_copy = dict(TEST_RULE)
+        rule_copy['effect_type'] = 'one_free'
+
+        self.assertEqual([(100, 1)], CompiledRule(Rule(**TEST_RULE)).resolve([(100, 2)]))
+        self.assertEqual([(100, 1)], CompiledRule(Rule(**rule_copy)).resolve([(100, 2)]))
+        self.assertEqual([(200, 1)], CompiledRule(Rule(**rule_copy)).resolve([(200, 1), (100, 1)]))
+
+    def test_resolve_aggregate_dispatches_effect_type(self):
+        """
+        Checks that both known effect types are resolved on aggregated prices
+        Notes:
+            - Arrange: Compile an update_prices and a one_free rule
+            - Act: Resolve both with the same subtotal and unit price
+            - Assert: Subtotal is discounted and one unit price is dropped, respectively
+        Returns: None
+
+        """
+        rule_copy = dict(TEST_RULE)
+        rule_copy['effect_type'] = 'one_free'
+
+        self.assertEqual(200, CompiledRule(Rule(**TEST_RULE)).resolve_aggregate(400, 100))
+        self.assertEqual(300, CompiledRule(Rule(**rule_copy)).resolve_aggregate(400, 100))
+
+    def test_resolve_rounds_with_rule_policy(self):
+        """
+        Checks that discounted amounts are rounded back to cents with the rule rounding policy
+        Notes:
+            - Arrange: Compile a 10% off rule per rounding policy
+            - Act: Discount 1.05 (94.5 cents once discounted), from lines and from aggregates
+            - Assert: Each policy rounds the half cent its own way, lines and aggregates agree
+        Returns: None
+
+        """
+        expected = {'half_even': 94, 'half_up': 95, 'down': 94, 'up': 95}
+
+        for rounding, cents in expected.items():
+            plan = CompiledRule(Rule(**dict(TEST_RULE, effect_percentage=0.1, rounding=rounding)))
+            self.assertEqual([(cents, 1)], plan.resolve([(35, 2), (35, 1)]), rounding)
+            self.assertEqual(cents, plan.resolve_aggregate(105, 35), rounding)
+
+
+class TestRulePlanCache(BaseTest):
+    """ Unit Test class for RulePlanCache class """
+
+    async def test_get_reuses_plan_until_rule_version_changes(self):
+        """
+        Checks that plans are cached by rule id and version
+        Notes:
+            - Arrange: Prefill rules, load one of them
+            - Act: Get its plan twice, update the rule and get its plan again
+            - Assert: Same plan is reused until the rule is updated
+        Returns: None
+
+        """
+        plans = RulePlanCache()
+        await Prefill.rules()
+
+        with Transaction() as t:
+            rule = t.session.query(Rule).filter_by(item_code='GR1').first()
+            first_plan = plans.get(rule)
+
+            self.assertIs(first_plan, plans.get(rule))
+
+            rule.firing_condition_quantity = 3
+            t.session.flush()
+            second_plan = plans.get(rule)
+
+        self.assertIsNot(first_plan, second_plan)
+        self.assertTrue(first_plan.fires(2))
+        self.assertFalse(second_plan.fires(2))
+
+    def test_get_does_not_cache_transient_rules(self):
+        """
+        Checks that rules with no id are compiled but not cached
+        Notes:
+            - Arrange: Build a transient Rule
+            - Act: Get its plan
+            - Assert: Nothing is cached
+        Returns: None
+
+        """
+        plans = RulePlanCache()
+
+        plans.get(Rule(**TEST_RULE))
+
+        self.assertEqual(0, len(plans))
+
+    def test_clear(self):
+        """
+        Checks that clearing the cache drops every plan
+        Notes:
+            - Arrange: Create a rule and cache its plan
+            - Act: Clear the cache
+            - Assert: Cache is empty
+        Returns: None
+
+        """
+        plans = RulePlanCache()
+        RuleService().create_offer_rule(**TEST_RULE)
+        rule = RuleService().read_offer_rule({'id': 1}).first()
+        plans.get(rule)
+
+        plans.clear()
+
+        self.assertEqual(0, len(plans))
+
+    def test_evict(self):
+        """
+        Checks that evicting a rule only drops that rule's plans
+        Notes:
+            - Arrange: Cache the plans of two persisted-like rules
+            - Act: Evict the first one
+            - Assert: Only the second plan remains
+        Returns: None
+
+        """
+        plans = RulePlanCache()
+        plans.get(Rule(id=1, version=1, **TEST_RULE))
+        plans.get(Rule(id=2, version=1, **TEST_RULE))
+
+        plans.evict(1)
+
+        self.assertEqual(1, len(plans))
@@ -1,13 +1,20 @@
 """ Unit Test module for rule_service module """
 import random
 
+from sqlalchemy import func, select
+
 from src.main.application.cart_service import CartService
 from src.main.application.item_service import ItemService
 from src.main.application.user_service import UserService
+from src.main.domain.cart_code_total_entity import CartCodeTotal
+from src.main.domain.money import RATE_SCALE, apply_rate, to_rate
 from src.main.domain.rule_entity import Rule
 from src.main.domain.item_entity import Item
-from src.main.application.rules_service import RuleService, RuleEngine
+from src.main.application.priced_cart_cache import PricedCartCache
+from src.main.application.rule_plans import CompiledRule, index_by_item_code
+from src.main.application.rules_service import APPLY_STAGE_SECONDS, PRICING_AGGREGATE, RuleService, RuleEngine
 from src.main.application.prefill_service import Prefill
+from src.main.infrastructure.database.setup import get_engine
 from tests.base_test import BaseTest
 
 TEST_RULE = {
@@ -82,30 +89,98 @@ class TestRuleService(BaseTest):
 
         rule_query = await self.rule_service.read_offer_rules()
 
-        self.assertEqual(3, rule_query.count())
+        self.assertEqual(3, len(rule_query.all()))
+
+    async def test_read_offer_rules_paginates_by_id(self):
+        """
+        Notes:
+            - Arrange: Prefill rules
+            - Act: Read rules after the first one, one at a time
+            - Assert: Only the second rule is red
+        Returns: None
+
+        """
+        await Prefill.rules()
+
+        rule_query = await self.rule_service.read_offer_rules(after=1, limit=1)
+
+        self.assertEqual(['SR1'], [rule.item_code for rule in rule_query.all()])
+
+    async def test_read_offer_rule_rows(self):
+        """
+        Notes:
+            - Arrange: Prefill rules
+            - Act: Read rule rows after the first one, one at a time
+            - Assert: Only the second rule row is red, holding every rule column
+        Returns: None
+
+        """
+        await Prefill.rules()
+
+        rows = (await self.rule_service.read_offer_rule_rows(after=1, limit=1)).all()
+
+        self.assertEqual(['SR1'], [row.item_code for row in rows])
+        self.assertEqual(1, rows[0].version)
 
     def test_update_offer_rule(self):
         """
+        Checks that updating a rule only changes the given fields and bumps its version
         Notes:
-            - Arrange:
-            - Act:
-            - Assert:
+            - Arrange: Create a rule
+            - Act: Update its firing condition quantity
+            - Assert: Quantity and version changed, the rest of fields are kept
         Returns: None
 
         """
-        with self.assertRaises(NotImplementedError):
-            self.rule_service.update_offer_rule(0)
+        self.rule_service.create_offer_rule(**TEST_RULE)
+
+        self.rule_service.update_offer_rule(1, firing_condition_quantity=20)
+
+        actual_rule = self.rule_service.read_offer_rule({'id': 1}).first()
+        self.assertEqual(20, actual_rule.firing_condition_quantity)
+        self.assertEqual(TEST_RULE['name'], actual_rule.name)
+        self.assertEqual(2, actual_rule.version)
+
+    def test_update_offer_rule_when_rule_not_found_raises_error(self):
+        """
+        Checks that updating a non existent rule raises exception
+        Notes:
+            - Arrange: N/A
+            - Act: Update an arbitrary id on a database with no rules
+            - Assert: RuntimeError is raised
+        Returns: None
+
+        """
+        with self.assertRaises(RuntimeError):
+            self.rule_service.update_offer_rule(0, name='name')
 
     def test_delete_rule(self):
         """
+        Checks that deleting a rule removes it from the database
         Notes:
-            - Arrange:
-            - Act:
-            - Assert:
+            - Arrange: Create a rule
+            - Act: Delete it
+            - Assert: Rule does not exist anymore
+        Returns: None
+
+        """
+        self.rule_service.create_offer_rule(**TEST_RULE)
+
+        self.rule_service.delete_rule(1)
+
+        self.assertEqual(0, self.rule_service.read_offer_rule({'id': 1}).count())
+
+    def test_delete_rule_when_rule_not_found_raises_error(self):
+        """
+        Checks that deleting a non existent rule raises exception
+        Notes:
+            - Arrange: N/A
+            - Act: Delete an arbitrary id on a database with no rules
+            - Assert: RuntimeError is raised
         Returns: None
 
         """
-        with self.assertRaises(NotImplementedError):
+        with self.assertRaises(RuntimeError):
             self.rule_service.delete_rule(0)
 
 
@@ -127,7 +202,7 @@ class TestRuleEngine(BaseTest):
         Notes:
             - Arrange: Create a cart with 3 green tea, one strawberries and one coffee
             - Act: Invoke apply
-            - Assert: Total Cart price is 22.45
+            - Assert: Total Cart price is (cents) 2245
         Returns: None
 
         """
@@ -136,7 +211,7 @@ class TestRuleEngine(BaseTest):
         await Prefill.users(1)
         await Prefill.carts()
 
-        # 1 2 1 1 3 | GR1,SR1,GR1,GR1,CF1 -> 22.45€
+        # 1 2 1 1 3 | GR1,SR1,GR1,GR1,CF1 -> 2245 (22.45€)
         await self.item_service.add_to_cart(1, 1)
         await self.item_service.add_to_cart(2, 1)
         await self.item_service.add_to_cart(1, 1)
@@ -148,7 +223,7 @@ class TestRuleEngine(BaseTest):
         cart_query = await self.cart_service.read_cart({'id': 1})
         actual_cart = cart_query.first()
 
-        self.assertEqual(22.45, actual_cart.total_price)
+        self.assertEqual(2245, actual_cart.total_price)
 
     async def test_apply_challenge_sample_2(self):
         """
@@ -156,7 +231,7 @@ class TestRuleEngine(BaseTest):
         Notes:
             - Arrange: Create a cart two strawberries
             - Act: Invoke apply
-            - Assert: Total Cart price is 3.11
+            - Assert: Total Cart price is (cents) 311
         Returns: None
 
         """
@@ -165,7 +240,7 @@ class TestRuleEngine(BaseTest):
         await Prefill.users(1)
         await Prefill.carts()
 
-        # 1 1 | GR1,GR1 -> 3.11€
+        # 1 1 | GR1,GR1 -> 311 (3.11€)
         await self.item_service.add_to_cart(1, 1)
         await self.item_service.add_to_cart(1, 1)
 
@@ -174,7 +249,7 @@ class TestRuleEngine(BaseTest):
         cart_query = await self.cart_service.read_cart({'id': 1})
         actual_cart = cart_query.first()
 
-        self.assertEqual(3.11, actual_cart.total_price)
+        self.assertEqual(311, actual_cart.total_price)
 
     async def test_apply_challenge_sample_3(self):
         """
@@ -182,7 +257,7 @@ class TestRuleEngine(BaseTest):
         Notes:
             - Arrange: Create a cart with one green tea and two strawberries
             - Act: Invoke apply
-            - Assert: Total Cart price is 16.61
+            - Assert: Total Cart price is (cents) 1661
         Returns: None
 
         """
@@ -191,7 +266,7 @@ class TestRuleEngine(BaseTest):
         await Prefill.users(1)
         await Prefill.carts()
 
-        # 2 2 1 2 | SR1,SR1,GR1,SR1 -> 16.61€
+        # 2 2 1 2 | SR1,SR1,GR1,SR1 -> 1661 (16.61€)
         await self.item_service.add_to_cart(2, 1)
         await self.item_service.add_to_cart(2, 1)
         await self.item_service.add_to_cart(1, 1)
@@ -202,7 +277,7 @@ class TestRuleEngine(BaseTest):
         cart_query = await self.cart_service.read_cart({'id': 1})
         actual_cart = cart_query.first()
 
-        self.assertEqual(16.61, actual_cart.total_price)
+        self.assertEqual(1661, actual_cart.total_price)
 
     async def test_apply_challenge_sample_4(self):
         """
@@ -210,7 +285,7 @@ class TestRuleEngine(BaseTest):
         Notes:
             - Arrange: Create a cart with one green tea, one strawberries and three coffees
             - Act: Invoke apply
-            - Assert: Total Cart price is 30.57
+            - Assert: Total Cart price is (cents) 3057
         Returns: None
 
         """
@@ -219,7 +294,7 @@ class TestRuleEngine(BaseTest):
         await Prefill.users(1)
         await Prefill.carts()
 
-        # 1 3 2 3 3 | GR1,CF1,SR1,CF1,CF1 -> 30.57€
+        # 1 3 2 3 3 | GR1,CF1,SR1,CF1,CF1 -> 3057 (30.57€)
         await self.item_service.add_to_cart(1, 1)
         await self.item_service.add_to_cart(3, 1)
         await self.item_service.add_to_cart(2, 1)
@@ -231,7 +306,310 @@ class TestRuleEngine(BaseTest):
         cart_query = await self.cart_service.read_cart({'id': 1})
         actual_cart = cart_query.first()
 
-        self.assertEqual(30.57, actual_cart.total_price)
+        self.assertEqual(3057, actual_cart.total_price)
+
+    async def test_apply_after_rule_update(self):
+        """
+        Checks that apply honours rule updates instead of serving a stale rules catalogue
+        Notes:
+            - Arrange: Create a cart with two green teas and apply rules once
+            - Act: Update green tea rule to need three items, invoke apply again
+            - Assert: Total Cart price is (cents) 622
+        Returns: None
+
+        """
+        await Prefill.rules()
+        await Prefill.items()
+        await Prefill.users(1)
+        await Prefill.carts()
+        await self.item_service.add_to_cart(1, 1)
+        await self.item_service.add_to_cart(1, 1)
+        await self.rule_engine.apply(1)
+
+        self.rule_service.update_offer_rule(1, firing_condition_quantity=3)
+        await self.rule_engine.apply(1)
+
+        cart_query = await self.cart_service.read_cart({'id': 1})
+        actual_cart = cart_query.first()
+
+        self.assertEqual(622, actual_cart.total_price)
+
+    async def test_apply_prices_from_quantities(self):
+        """
+        Checks that carts holding many units of an item are priced from its quantity
+        Notes:
+            - Arrange: Create a cart with 500 coffees added at once and two green teas added one by one
+            - Act: Invoke apply
+            - Assert: Cart holds two lines and its total price is the discounted coffees plus one green tea
+        Returns: None
+
+        """
+        await Prefill.rules()
+        await Prefill.items()
+        await Prefill.users(1)
+        await Prefill.carts()
+        await self.item_service.add_to_cart(3, 1, quantity=500)
+        await self.item_service.add_to_cart(1, 1)
+        await self.item_service.add_to_cart(1, 1)
+
+        await self.rule_engine.apply(1)
+
+        cart_query = await self.cart_service.read_cart({'id': 1})
+        actual_cart = cart_query.first()
+
+        self.assertEqual({'CF1': 500, 'GR1': 2},
+                         {cart_item.item.code: cart_item.quantity for cart_item in actual_cart.items})
+        self.assertEqual(apply_rate(500 * 1123, RATE_SCALE - to_rate(0.3333333)) + 311, actual_cart.total_price)
+
+    async def test_apply_many(self):
+        """
+        Checks that batch pricing gives the same totals as pricing carts one by one
+        Notes:
+            - Arrange: Create three carts with challenge samples 1, 2 and 3 and an empty one
+            - Act: Invoke apply_many with every cart id plus a non existent one, in chunks of two
+            - Assert: Totals are the challenge ones, stored in the database, and the missing cart is skipped
+        Returns: None
+
+        """
+        await self.arrange_challenge_samples()
+
+        totals = await self.rule_engine.apply_many([1, 2, 3, 4, 5], chunk_size=2)
+
+        cart_query = await self.cart_service.read_carts()
+        self.assertEqual({1: 2245, 2: 311, 3: 1661, 4: 0}, totals)
+        self.assertEqual([2245, 311, 1661, 0], [cart.total_price for cart in cart_query.all()])
+
+    async def test_apply_many_prices_code_states(self):
+        """
+        Checks that batch pricing leaves no stale incremental pricing state behind
+        Notes:
+            - Arrange: Generate carts, whose incremental pricing states are stale
+            - Act: Invoke apply_many, then create a rule on I1 that never fires
+            - Assert: Every state is priced, and every cart holds the total a full repricing gives
+        Returns: None
+
+        """
+        await Prefill.generate(users=5, items=5, carts=3, lines=9, seed=1)
+
+        await self.rule_engine.apply_many([1, 2, 3])
+        with get_engine().connect() as connection:
+            stale = connection.scalar(select(func.count()).where(CartCodeTotal.total.is_(None)))
+        self.rule_service.create_offer_rule('I1', 'never', None, '>=', 1000, 'one_free', None)
+
+        self.assertEqual(0, stale)
+        self.assertEqual({}, await self.rule_engine.check_totals([1, 2, 3]))
+
+    async def test_apply_many_aggregate_mode_prices_code_states(self):
+        """
+        Checks that aggregate batch pricing writes states matching the cart totals they were priced with
+        Notes:
+            - Arrange: Generate carts with rules, whose incremental pricing states are stale
+            - Act: Invoke apply_many in aggregate mode
+            - Assert: No state is stale, and every cart total is the sum of its states totals
+        Returns: None
+
+        """
+        await Prefill.generate(users=5, items=5, carts=3, lines=9, rules=4, seed=1)
+
+        totals = await RuleEngine(mode=PRICING_AGGREGATE).apply_many([1, 2, 3])
+        with get_engine().connect() as connection:
+            stale = connection.scalar(select(func.count()).where(CartCodeTotal.total.is_(None)))
+            states = dict(connection.execute(
+                select(CartCodeTotal.carts_id, func.sum(CartCodeTotal.total)).group_by(CartCodeTotal.carts_id)
+            ).all())
+
+        self.assertEqual(0, stale)
+        self.assertEqual(totals, {cart_id: states.get(cart_id, 0) for cart_id in totals})
+
+    async def test_apply_aggregate_mode_parity(self):
+        """
+        Checks that aggregate pricing gives the same totals as pricing cart lines
+        Notes:
+            - Arrange: Create twenty carts holding random quantities of the challenge items, plus the challenge samples
+            - Act: Invoke apply_many in both pricing modes, and apply on the first cart in aggregate mode
+            - Assert: Totals are the same in both modes
+        Returns: None
+
+        """
+        random.seed(11)
+        await Prefill.rules()
+        await Prefill.items()
+        await Prefill.users(20)
+        await Prefill.carts()
+        for cart_id in range(1, 21):
+            for item_id in random.sample([1, 2, 3], random.randint(0, 3)):
+                await self.item_service.add_to_cart(item_id, cart_id, quantity=random.randint(1, 30))
+
+        lines_totals = await self.rule_engine.apply_many(range(1, 21))
+        aggregate_totals = await RuleEngine(mode=PRICING_AGGREGATE).apply_many(range(1, 21))
+        await RuleEngine(mode=PRICING_AGGREGATE).apply(1)
+
+        cart_query = await self.cart_service.read_cart({'id': 1})
+        self.assertEqual(lines_totals, aggregate_totals)
+        self.assertEqual(lines_totals[1], cart_query.first().total_price)
+
+    async def test_cart_total_price_is_kept_current(self):
+        """
+        Checks that adding to and removing from carts keeps their total price current, without applying rules
+        Notes:
+            - Arrange: Create challenge sample 1 cart
+            - Act: Read its total price, remove a green tea and a coffee and read it again
+            - Assert: Totals are the challenge ones and the consistency checker finds no mismatch
+        Returns: None
+
+        """
+        await Prefill.rules()
+        await Prefill.items()
+        await Prefill.users(1)
+        await Prefill.carts()
+        for item_id in [1, 2, 1, 1, 3]:
+            await self.item_service.add_to_cart(item_id, 1)
+
+        cart_query = await self.cart_service.read_cart({'id': 1})
+        self.assertEqual(2245, cart_query.first().total_price)
+
+        await self.item_service.remove_from_cart(1, 1)
+        await self.item_service.remove_from_cart(3, 1, quantity=5)
+
+        cart_query = await self.cart_service.read_cart({'id': 1})
+        self.assertEqual(811, cart_query.first().total_price)
+        self.assertEqual({}, await RuleEngine().check_totals([1]))
+
+    async def test_rule_changes_reprice_carts(self):
+        """
+        Checks that rule writes keep the total price of the carts holding their item codes current
+        Notes:
+            - Arrange: Create two carts with two green teas and a strawberry
+            - Act: Update green tea rule to need three items, create a strawberry rule, delete it
+            - Assert: After every write carts hold the totals a full repricing gives
+        Returns: None
+
+        """
+        await Prefill.rules()
+        await Prefill.items()
+        await Prefill.users(2)
+        await Prefill.carts()
+        for cart_id in (1, 2):
+            await self.item_service.add_to_cart(1, cart_id, quantity=2)
+            await self.item_service.add_to_cart(2, cart_id)
+
+        totals = list()
+        for write in (lambda: self.rule_service.update_offer_rule(1, firing_condition_quantity=3),
+                      lambda: self.rule_service.create_offer_rule('SR1', 'strawberry', None, '>=', 1, 'update_prices',
+                                                                  0.5),
+                      lambda: self.rule_service.delete_rule(4)):
+            write()
+            cart_query = await self.cart_service.read_carts()
+            totals.append([cart.total_price for cart in cart_query.all()])
+            self.assertEqual({}, await RuleEngine().check_totals([1, 2]))
+
+        self.assertEqual([[1122, 1122], [872, 872], [1122, 1122]], totals)
+
+    async def test_rule_changes_price_stale_states(self):
+        """
+        Checks that rule writes price the stale states of the carts holding their item codes
+        Notes:
+            - Arrange: Generate carts, whose incremental pricing states are stale
+            - Act: Create a rule on I1 that never fires, so I1 states are fresh and the others stale
+            - Assert: Carts holding I1 hold the totals a full repricing gives, the other one is left unpriced
+        Returns: None
+
+        """
+        await Prefill.generate(users=5, items=5, carts=3, lines=9, seed=1)
+
+        self.rule_service.create_offer_rule('I1', 'never', None, '>=', 1000, 'one_free', None)
+
+        cart_query = await self.cart_service.read_carts()
+        self.assertEqual([8904, 0, 15103], [cart.total_price for cart in cart_query.all()])
+        self.assertEqual({}, await RuleEngine().check_totals([1, 3]))
+
+    async def test_removing_the_free_unit_reprices_code(self):
+        """
+        Checks that removing the line whose unit was made free frees a unit of the line left last
+        Notes:
+            - Arrange: Create two items of the same code priced 100 and 50 cents and a buy-one-get-one-free rule
+            - Act: Add the first item twice and the second one, then remove the second one
+            - Assert: Totals are the ones a full repricing gives, in lines and aggregate modes
+        Returns: None
+
+        """
+        await Prefill.users(1)
+        await Prefill.carts()
+        await self.item_service.create_item('X', 'expensive', 100)
+        await self.item_service.create_item('X', 'cheap', 50)
+        self.rule_service.create_offer_rule('X', 'bogof', None, '>=', 2, 'one_free', None)
+        for item_id in (1, 1, 2):
+            await self.item_service.add_to_cart(item_id, 1)
+        added = (await self.cart_service.read_cart({'id': 1})).first().total_price
+
+        await self.item_service.remove_from_cart(2, 1)
+
+        cart_query = await self.cart_service.read_cart({'id': 1})
+        self.assertEqual((200, 100), (added, cart_query.first().total_price))
+        self.assertEqual({}, await RuleEngine().check_totals([1]))
+        self.assertEqual({1: 100}, await RuleEngine(mode=PRICING_AGGREGATE).price_carts([1]))
+
+    async def test_apply_serves_unchanged_contents_from_cache(self):
+        """
+        Checks that carts with already priced contents are served from the priced carts cache until rules change
+        Notes:
+            - Arrange: Create two carts with the same two green teas
+            - Act: Apply both, update the green tea rule and apply the first one again
+            - Assert: Second cart is a cache hit, the rule update forces a repricing (of both carts, see RuleService)
+        Returns: None
+
+        """
+        priced_carts = PricedCartCache()
+        engine = RuleEngine(priced_carts=priced_carts)
+        await Prefill.rules()
+        await Prefill.items()
+        await Prefill.users(2)
+        await Prefill.carts()
+        for cart_id in (1, 2):
+            await self.item_service.add_to_cart(1, cart_id, quantity=2)
+
+        await engine.apply(1)
+        await engine.apply(2)
+        self.rule_service.update_offer_rule(1, firing_condition_quantity=3)
+        await engine.apply(1)
+
+        cart_query = await self.cart_service.read_carts()
+        self.assertEqual([622, 622], [cart.total_price for cart in cart_query.all()])
+        self.assertEqual((1, 2), (priced_carts.hits, priced_carts.misses))
+
+    async def test_apply_records_stage_metrics(self):
+        """
+        Checks that every stage of apply is timed
+        Notes:
+            - Arrange: Prefill rules, items, users and carts, clear the stage metrics
+            - Act: Apply rules to a cart
+            - Assert: Every stage was observed once
+        Returns: None
+
+        """
+        await Prefill.rules()
+        await Prefill.items()
+        await Prefill.users(1)
+        await Prefill.carts()
+        APPLY_STAGE_SECONDS.clear()
+
+        await RuleEngine().apply(1)
+
+        for stage in ('rules_load', 'items_load', 'evaluation', 'write_back'):
+            self.assertEqual(1, APPLY_STAGE_SECONDS.count(stage))
+
+    def test_unknown_pricing_mode_raises_error(self):
+        """
+        Checks that engines can only be built for known pricing modes
+        Notes:
+            - Arrange: N/A
+            - Act: Build an engine with an unknown mode
+            - Assert: RuntimeError is raised
+        Returns: None
+
+        """
+        with self.assertRaises(RuntimeError):
+            RuleEngine(mode='unknown')
 
     async def test_apply_when_cart_not_found_raises_error(self):
         """
@@ -246,63 +624,76 @@ class TestRuleEngine(BaseTest):
         with self.assertRaises(RuntimeError):
             await self.rule_engine.apply(1)
 
-    def test__sorted_group_by(self):
+    def test__bucket_by_code(self):
         """
-        Checks that sorted_group_by always groups the same given the same list shuffled
+        Checks that bucket_by_code always groups the same given the same list shuffled
         Notes:
-            - Arrange: Build an arbitrary list of objects, shuffle it multiple times
-            - Act: Invoke sorted_group_by with the list and an arbitrary expression (must be the same expression though)
-            - Assert: Groups are always the same
+            - Arrange: Build an arbitrary list of cart lines with two different codes, shuffle it multiple times
+            - Act: Invoke bucket_by_code with the list
+            - Assert: Buckets are always the same
         Returns: None
 
         """
-        test_list = [{'a': True}, {'a': True}, {'a': True}, {'a': False}, {'a': False}]
+        test_list = [('A', 100, 3), ('B', 200, 2)]
 
         for _ in range(0, 9):
             random.shuffle(test_list)
-            groups = self.rule_engine._sorted_group_by(test_list, lambda a: a['a'] is True)
-            actual = {}
-            for key, group in groups:
-                actual.update({key: list(group)})
+            actual = self.rule_engine._bucket_by_code(test_list)
 
-            self.assertEqual(2, len(actual[False]))
-            self.assertEqual(3, len(actual[True]))
+            self.assertEqual({'A': [(100, 3)], 'B': [(200, 2)]}, actual)
 
-    def test__firing_evaluator_when_condition_unmet_it_returns_false(self):
+    def test__price_only_meets_rules_of_each_code(self):
+        """
+        Checks that pricing fires the rules of each code and keeps base prices for codes with no fired rule
+        Notes:
+            - Arrange: Build cart lines of three codes and index one firing and one unmet rule
+            - Act: Invoke price
+            - Assert: Only the firing rule changes the total price
+        Returns: None
+
+        """
+        lines = [('M22', 100, 10), ('GR1', 311, 1), ('CF1', 1123, 1)]
+        unmet_rule = dict(TEST_RULE)
+        unmet_rule['item_code'] = 'GR1'
+        plans_by_code = index_by_item_code(CompiledRule(Rule(**rule)) for rule in (TEST_RULE, unmet_rule))
+
+        self.assertEqual(1934, self.rule_engine._price(self.rule_engine._bucket_by_code(lines), plans_by_code))
+
+    def test_compiled_rule_when_condition_unmet_it_does_not_fire(self):
         """
         Notes:
             - Arrange: Build a list of items (< Rule quantity) and create Rule according to TEST_RULE definition
-            - Act: Invoke firing_evaluator with the given list and Rule
-            - Assert: firing_evaluator returns False
+            - Act: Fire the compiled Rule on the number of items
+            - Assert: Rule does not fire
         Returns: None
 
         """
-        items = [Item(name=f'name', code='M22', price=float('1.0')) for _ in range(0,9)]
+        items = [Item(name=f'name', code='M22', price=100) for _ in range(0,9)]
         rule = Rule(**TEST_RULE)
 
-        self.assertFalse(self.rule_engine._rule_firing_evaluator(items, rule))
+        self.assertFalse(CompiledRule(rule).fires(len(items)))
 
-    def test__firing_evaluator_when_condition_met_it_returns_true(self):
+    def test_compiled_rule_when_condition_met_it_fires(self):
         """
-        Checks that firing_evaluator returns true when condition is met
+        Checks that compiled rules fire when their condition is met
         Notes:
             - Arrange: Build a list of items (> Rule quantity) and create Rule according to TEST_RULE definition
-            - Act: Invoke firing_evaluator with the given list and Rule
-            - Assert: firing_evaluator returns True
+            - Act: Fire the compiled Rule on the number of items
+            - Assert: Rule fires
         Returns: None
 
         """
-        items = [Item(name='name', code='M22', price=float('1.0')) for _ in range(0, 11)]
+        items = [Item(name='name', code='M22', price=100) for _ in range(0, 11)]
         rule = Rule(**TEST_RULE)
 
-        self.assertTrue(self.rule_engine._rule_firing_evaluator(items, rule))
+        self.assertTrue(CompiledRule(rule).fires(len(items)))
 
-    def test__rule_effect_resolver_one_free(self):
+    def test_compiled_rule_resolves_one_free(self):
         """
-        Checks that effect resolver correctly applies effects of type one_free
+        Checks that compiled rules correctly apply effects of type one_free
         Notes:
-            - Arrange: Build a list of Items with price 1.0 and create Rule according to TEST_RULE definition
-            - Act: Invoke effect_resolver with the given list and Rule
+            - Arrange: Create Rule according to TEST_RULE definition, with a one_free effect
+            - Act: Resolve the compiled Rule on lines of 2 and 3 units priced 100 (cents)
             - Assert: One of the items price is not considered
         Returns: None
 
@@ -311,33 +702,29 @@ class TestRuleEngine(BaseTest):
         rule_copy['effect_type'] = 'one_free'
         rule = Rule(**rule_copy)
 
-        items = [Item(name='name', code='M22', price=float('1.0')) for _ in range(0, 2)]
-        self.assertEqual(1.0, sum(self.rule_engine._rule_effect_resolver(items, rule)))
-
-        items = [Item(name='name', code='M22', price=float('1.0')) for _ in range(0, 3)]
-        self.assertEqual(2.0, sum(self.rule_engine._rule_effect_resolver(items, rule)))
+        self.assertEqual(100, sum(price * quantity for price, quantity in CompiledRule(rule).resolve([(100, 2)])))
+        self.assertEqual(200, sum(price * quantity for price, quantity in CompiledRule(rule).resolve([(100, 3)])))
 
-    def test__rule_effect_resolver_update_price(self):
+    def test_compiled_rule_resolves_update_price(self):
         """
-        Checks that effect resolver correctly applies effects of type update_price
+        Checks that compiled rules correctly apply effects of type update_price
         Notes:
-            - Arrange: Build a list of Items with price 1.0 and create Rule according to TEST_RULE definition
-            - Act: Invoke effect_resolver with the given list and Rule
-            - Assert: Total price is 5.0
+            - Arrange: Create Rule according to TEST_RULE definition
+            - Act: Resolve the compiled Rule on a line of 10 units priced 100 (cents)
+            - Assert: Total price is 500 (cents)
         Returns: None
 
         """
-        items = [Item(name='name', code='M22', price=float('1.0')) for _ in range(0, 10)]
         rule = Rule(**TEST_RULE)
 
-        self.assertEqual(5.0, sum(self.rule_engine._rule_effect_resolver(items, rule)))
+        self.assertEqual(500, sum(price * quantity for price, quantity in CompiledRule(rule).resolve([(100, 10)])))
 
-    def test__rule_effect_resolver_when_nonexistent_effect_type_raises_error(self):
+    def test_compiled_rule_when_nonexistent_effect_type_raises_error(self):
         """
         Checks that non existent effect types given a Rule raises RunTime error
         Notes:
             - Arrange: Update a Rule with a non defined effect type
-            - Act: Invoke rule effect with the mentioned rule
+            - Act: Resolve the mentioned rule compiled
             - Assert: RunTime exception is raised
         Returns: None
 
@@ -345,7 +732,6 @@ class TestRuleEngine(BaseTest):
         rule_copy = dict(TEST_RULE)
         rule_copy['effect_type'] = 'unknown'
         rule = Rule(**rule_copy)
-        items = [Item(name='name', code='M22', price=float('1.0')) for _ in range(0, 2)]
 
         with self.assertRaises(RuntimeError):
-            _ = self.rule_engine._rule_effect_resolver(items, rule)
+            _ = CompiledRule(rule).resolve([(100, 2)])
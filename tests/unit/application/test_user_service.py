@@ -61,7 +61,43 @@ class TestUserService(BaseTest):
 
         user_query = await self.user_service.read_users()
 
-        self.assertEqual(11, user_query.count())
+        self.assertEqual(11, len(user_query.all()))
+
+    async def test_read_users_paginates_by_id(self):
+        """
+        Checks that users can be read a page at a time
+        Notes:
+            - Arrange: Prefill multiple users
+            - Act: Read users after the tenth one
+            - Assert: Only the eleventh user is red
+        Returns: None
+
+        """
+        await Prefill.users(11)
+
+        user_query = await self.user_service.read_users(after=10, limit=5)
+
+        self.assertEqual([11], [user.id for user in user_query.all()])
+
+    async def test_read_users_eager_loads_carts(self):
+        """
+        Checks that reading users along their carts emits a bounded number of statements
+        Notes:
+            - Arrange: Prefill multiple users and carts
+            - Act: Read users and touch every user cart
+            - Assert: Two statements (users, carts) were emitted, irrespectively of the number of users
+        Returns: None
+
+        """
+        await Prefill.users(11)
+        await Prefill.carts()
+
+        with self.capture_statements() as statements:
+            user_query = await self.user_service.read_users()
+            carts = [user.cart[0] for user in user_query.all()]
+
+        self.assertEqual(11, len(carts))
+        self.assertEqual(2, len(statements))
 
     def test_update_user(self):
         """
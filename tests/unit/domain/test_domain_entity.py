@@ -1,6 +1,9 @@
 """ Unit Test module for domain __init__ module """
 from src.main.infrastructure.logging.logger import LOGGER
+from src.main.domain import to_dicts
+from src.main.domain.item_entity import Item
 from src.main.domain.user_entity import User
+from src.main.infrastructure.database.transaction import Transaction
 from tests.base_test import BaseTest
 
 
@@ -20,3 +23,51 @@ class TestEntity(BaseTest):
         with self.assertLogs(LOGGER, 'DEBUG') as cm:
             User.enroll()
             self.assertEqual('Enrolling User', cm.records[0].msg)
+
+    def test_to_dict(self):
+        """
+        Checks to_dict maps every column to its value
+        Notes:
+            - Arrange: Build a transient Item
+            - Act: Turn it into a dict
+            - Assert: Every column is present, unset ones as None
+        Returns: None
+
+        """
+        item = Item(code='C1', name='name', price=1.5)
+
+        self.assertEqual({'id': None, 'code': 'C1', 'name': 'name', 'price': 1.5}, item.to_dict())
+
+    def test_to_dict_loads_expired_columns(self):
+        """
+        Checks to_dict falls back to attribute access for columns not loaded in the instance
+        Notes:
+            - Arrange: Persist an Item and expire it
+            - Act: Turn it into a dict
+            - Assert: Columns are reloaded from the database
+        Returns: None
+
+        """
+        with Transaction() as t:
+            item = Item(code='C1', name='name', price=2)
+            t.session.add(item)
+            t.session.flush()
+            t.session.expire(item)
+
+            self.assertEqual({'id': item.id, 'code': 'C1', 'name': 'name', 'price': 2}, item.to_dict())
+
+    def test_to_dicts(self):
+        """
+        Checks to_dicts matches to_dict for every entity, whatever its class
+        Notes:
+            - Arrange: Build transient Items and a User
+            - Act: Turn them into dicts in bulk
+            - Assert: Same dicts as one by one
+        Returns: None
+
+        """
+        entities = [Item(id=1, code='C1', name='a', price=1.0), Item(id=2, code='C2', name='b', price=2.0),
+                    User(id=1, name='name', fullname='full', nickname='nick')]
+
+        self.assertEqual([entity.to_dict() for entity in entities], to_dicts(entities))
+        self.assertEqual([], to_dicts([]))
@@ -0,0 +1,68 @@
+""" Unit Test module for domain money module """
+from unittest import TestCase
+
+from src.main.domain.money import RATE_SCALE, apply_rate, to_cents, to_rate
+
+
+class TestMoney(TestCase):
+    """ Unit Test class for money module """
+
+    def test_to_cents(self):
+        """
+        Checks that currency units are converted to exact cents
+        Notes:
+            - Arrange: N/A
+            - Act: Convert amounts whose float representation is inexact
+            - Assert: Cents are the nearest integers
+        Returns: None
+
+        """
+        self.assertEqual(311, to_cents(3.11))
+        self.assertEqual(1123, to_cents(11.23))
+        self.assertEqual(29, to_cents(0.29))
+
+    def test_to_rate(self):
+        """
+        Checks that percentages are converted to fixed point rates, None meaning no rate
+        Notes:
+            - Arrange: N/A
+            - Act: Convert percentages
+            - Assert: Rates are scaled by RATE_SCALE
+        Returns: None
+
+        """
+        self.assertEqual(RATE_SCALE // 10, to_rate(0.1))
+        self.assertEqual(333333300, to_rate(0.3333333))
+        self.assertEqual(0, to_rate(None))
+
+    def test_apply_rate_rounding_policies(self):
+        """
+        Checks every rounding policy on ties and on non ties
+        Notes:
+            - Arrange: Half a cent (ties) and a quarter of a cent (non ties) results
+            - Act: Apply rates with every policy
+            - Assert: Results are rounded according to each policy
+        Returns: None
+
+        """
+        half = RATE_SCALE // 2
+
+        self.assertEqual([2, 4], [apply_rate(amount, half, 'half_even') for amount in (5, 7)])
+        self.assertEqual([3, 4], [apply_rate(amount, half, 'half_up') for amount in (5, 7)])
+        self.assertEqual([2, 3], [apply_rate(amount, half, 'down') for amount in (5, 7)])
+        self.assertEqual([3, 4], [apply_rate(amount, half, 'up') for amount in (5, 7)])
+        self.assertEqual(1, apply_rate(5, RATE_SCALE // 4, 'half_even'))
+        self.assertEqual(2, apply_rate(7, RATE_SCALE // 4, 'half_up'))
+
+    def test_apply_rate_unknown_rounding_raises_error(self):
+        """
+        Checks that only whitelisted rounding policies are applied
+        Notes:
+            - Arrange: N/A
+            - Act: Apply a rate with an unknown policy
+            - Assert: RuntimeError is raised
+        Returns: None
+
+        """
+        with self.assertRaises(RuntimeError):
+            apply_rate(100, RATE_SCALE, 'nearest')
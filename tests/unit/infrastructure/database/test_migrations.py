@@ -0,0 +1,208 @@
+""" Unit Test module for database.migrations module """
+import os
+import tempfile
+
+from sqlalchemy import create_engine, inspect, select
+
+from src.main.application.cart_service import CartService
+from src.main.application.item_service import ItemService
+from src.main.application.rules_service import RuleEngine
+from src.main.domain import Base
+from src.main.domain.cart_code_total_entity import CartCodeTotal
+from src.main.domain.cart_entity import Cart
+from src.main.domain.cart_item_entity import CartItem
+from src.main.domain.item_entity import Item
+from src.main.domain.rule_entity import Rule
+from src.main.infrastructure.database.migrations import MIGRATIONS, SCHEMA_MIGRATIONS, current_version, upgrade
+from src.main.infrastructure.database.config import DatabaseSettings
+from src.main.infrastructure.database.setup import (configure_db, get_async_engine, get_database_settings, get_engine,
+                                                     init_db, shutdown_db)
+from tests.base_test import BaseTest
+
+HOT_LOOKUP_INDEXES = {'ix_items_to_carts_items_id', 'ix_items_code', 'ix_rules_item_code', 'ix_carts_user_id'}
+
+# Schema created by Base.metadata.create_all before migrations existed
+BASELINE_TABLES = [
+    'CREATE TABLE items (id INTEGER NOT NULL, code VARCHAR, name VARCHAR, price INTEGER, PRIMARY KEY (id))',
+    'CREATE TABLE rules (id INTEGER NOT NULL, item_code VARCHAR, name VARCHAR, description VARCHAR, '
+    'firing_condition_operator VARCHAR, firing_condition_quantity INTEGER, effect_type VARCHAR, '
+    'effect_percentage FLOAT, PRIMARY KEY (id))',
+    'CREATE TABLE users (id INTEGER NOT NULL, name VARCHAR, fullname VARCHAR, nickname VARCHAR, PRIMARY KEY (id))',
+    'CREATE TABLE carts (id INTEGER NOT NULL, total_price FLOAT, user_id INTEGER, PRIMARY KEY (id), '
+    'FOREIGN KEY(user_id) REFERENCES users (id))',
+    'CREATE TABLE items_to_carts (id INTEGER NOT NULL, items_id INTEGER, carts_id INTEGER, PRIMARY KEY (id), '
+    'FOREIGN KEY(items_id) REFERENCES items (id), FOREIGN KEY(carts_id) REFERENCES carts (id))',
+]
+
+
+class TestMigrations(BaseTest):
+    """ Unit Test class for database.migrations module """
+
+    def test_upgrade_empty_database(self):
+        """
+        Checks that empty databases get the current schema with every migration recorded
+        Notes:
+            - Arrange: init_db (BaseTest) upgrades the empty test database
+            - Act: Upgrade it again
+            - Assert: Database is at the latest version, every migration was recorded once
+        Returns: None
+
+        """
+        version = upgrade(get_engine())
+
+        with get_engine().connect() as connection:
+            versions = connection.execute(select(SCHEMA_MIGRATIONS.c.version)).scalars().all()
+        self.assertEqual(MIGRATIONS[-1].version, version)
+        self.assertEqual([migration.version for migration in MIGRATIONS], versions)
+
+    async def test_upgrade_unversioned_database(self):
+        """
+        Checks that databases created before migrations existed are upgraded from the baseline
+        Notes:
+            - Arrange: Create a file database with the schema before migrations existed (one cart line per unit, no
+              rule versions nor cart code totals, money as currency units), holding a cart and a rule
+            - Act: Upgrade it, then add a coffee to the cart through the application
+            - Assert: Every migration is recorded, lines are merged into quantities, rules are versioned, money is in
+              cents, cart code totals are backfilled stale and hot lookup columns are indexed. The cart is then
+              repriced as a whole
+        Returns: None
+
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            engine = create_engine(f'sqlite:///{os.path.join(directory, "test.db")}')
+            with engine.begin() as connection:
+                for statement in BASELINE_TABLES:
+                    connection.exec_driver_sql(statement)
+                connection.exec_driver_sql("INSERT INTO items VALUES (1, 'GR1', 'Green Tea', 3.11)")
+                connection.exec_driver_sql("INSERT INTO items VALUES (2, 'SR1', 'Strawberries', 5)")
+                connection.exec_driver_sql("INSERT INTO items VALUES (3, 'CF1', 'Coffee', 11.23)")
+                connection.exec_driver_sql('INSERT INTO carts VALUES (1, 8.11, NULL)')
+                connection.exec_driver_sql('INSERT INTO items_to_carts VALUES (1, 1, 1), (2, 2, 1), (3, 1, 1)')
+                connection.exec_driver_sql("INSERT INTO rules VALUES (1, 'GR1', 'r', 'd', '>=', 2, 'one_free', NULL)")
+
+            version = upgrade(engine)
+
+            with engine.connect() as connection:
+                lines = connection.execute(
+                    select(CartItem.id, CartItem.items_id, CartItem.quantity).order_by(CartItem.id)
+                ).all()
+                rule = connection.execute(select(Rule.version, Rule.rounding)).one()
+                cart = connection.execute(select(Cart.total_price)).one()
+                code_totals = connection.execute(
+                    select(CartCodeTotal.carts_id, CartCodeTotal.code, CartCodeTotal.quantity, CartCodeTotal.subtotal,
+                           CartCodeTotal.unit_price, CartCodeTotal.total).order_by(CartCodeTotal.code)
+                ).all()
+                indexes = {index['name'] for table in ('items_to_carts', 'items', 'rules', 'carts')
+                           for index in inspect(connection).get_indexes(table)}
+                recorded = connection.execute(select(SCHEMA_MIGRATIONS.c.version)).scalars().all()
+            engine.dispose()
+
+            settings = get_database_settings()
+            shutdown_db()
+            await get_async_engine().dispose()
+            try:
+                configure_db(DatabaseSettings(url=f'sqlite:///{os.path.join(directory, "test.db")}', echo=False))
+                init_db()
+                await ItemService().add_to_cart(3, 1)
+                repriced = (await CartService().read_carts()).one().total_price
+                mismatches = await RuleEngine().check_totals([1])
+                await get_async_engine().dispose()
+            finally:
+                configure_db(settings)
+                init_db()
+
+        self.assertEqual(MIGRATIONS[-1].version, version)
+        self.assertEqual([migration.version for migration in MIGRATIONS], recorded)
+        self.assertEqual([(1, 1, 2), (2, 2, 1)], [tuple(line) for line in lines])
+        self.assertEqual((1, 'half_even'), tuple(rule))
+        self.assertEqual((811,), tuple(cart))
+        self.assertEqual([(1, 'GR1', 2, 622, 311, None), (1, 'SR1', 1, 500, 500, None)],
+                         [tuple(code_total) for code_total in code_totals])
+        self.assertEqual((1934, {}), (repriced, mismatches))
+        self.assertTrue(HOT_LOOKUP_INDEXES <= indexes)
+
+    def test_upgrade_converts_money_to_cents(self):
+        """
+        Checks that databases holding money as currency units are converted to integer cents
+        Notes:
+            - Arrange: Create a file database at version 2, whose money tables hold float prices and totals
+            - Act: Upgrade it
+            - Assert: Amounts are cents in INTEGER columns, rules got the default rounding policy, indexes survived
+        Returns: None
+
+        """
+        legacy_tables = [
+            'CREATE TABLE items (id INTEGER PRIMARY KEY, code VARCHAR, name VARCHAR, price INTEGER)',
+            'CREATE TABLE carts (id INTEGER PRIMARY KEY, total_price FLOAT, user_id INTEGER REFERENCES users (id))',
+            'CREATE TABLE cart_code_totals (id INTEGER PRIMARY KEY, carts_id INTEGER NOT NULL REFERENCES carts (id), '
+            'code VARCHAR NOT NULL, quantity INTEGER NOT NULL, subtotal FLOAT NOT NULL, unit_price FLOAT NOT NULL, '
+            'total FLOAT, UNIQUE (carts_id, code))',
+            'CREATE TABLE rules (id INTEGER PRIMARY KEY, item_code VARCHAR, name VARCHAR, description VARCHAR, '
+            'firing_condition_operator VARCHAR, firing_condition_quantity INTEGER, effect_type VARCHAR, '
+            'effect_percentage FLOAT, version INTEGER NOT NULL)',
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            engine = create_engine(f'sqlite:///{os.path.join(directory, "test.db")}')
+            with engine.begin() as connection:
+                Base.metadata.create_all(connection)
+                for table in ('items', 'carts', 'cart_code_totals', 'rules'):
+                    connection.exec_driver_sql(f'DROP TABLE {table}')
+                for statement in legacy_tables:
+                    connection.exec_driver_sql(statement)
+                connection.execute(SCHEMA_MIGRATIONS.insert(), [{'version': 1, 'description': 'Baseline schema'},
+                                                                {'version': 2, 'description': 'Indexes'}])
+                connection.exec_driver_sql("INSERT INTO items VALUES (1, 'GR1', 'Green Tea', 3.11)")
+                connection.exec_driver_sql('INSERT INTO carts VALUES (1, 22.45, NULL)')
+                connection.exec_driver_sql("INSERT INTO cart_code_totals VALUES (1, 1, 'GR1', 2, 6.22, 3.11, NULL)")
+                connection.exec_driver_sql("INSERT INTO rules VALUES (1, 'GR1', 'r', 'd', '>=', 2, 'one_free', "
+                                           "NULL, 1)")
+
+            upgrade(engine)
+
+            with engine.connect() as connection:
+                item = connection.execute(select(Item.price)).one()
+                cart = connection.execute(select(Cart.total_price)).one()
+                code_total = connection.exec_driver_sql(
+                    'SELECT subtotal, unit_price, total FROM cart_code_totals').one()
+                rounding = connection.execute(select(Rule.rounding)).scalar()
+                types = {(table, column['name']): str(column['type']) for table in ('items', 'carts')
+                         for column in inspect(connection).get_columns(table)}
+                indexes = {index['name'] for index in inspect(connection).get_indexes('carts')}
+            engine.dispose()
+
+        self.assertEqual((311,), tuple(item))
+        self.assertEqual((2245,), tuple(cart))
+        self.assertIsInstance(cart.total_price, int)
+        self.assertEqual((622, 311, None), tuple(code_total))
+        self.assertEqual('half_even', rounding)
+        self.assertEqual('INTEGER', types[('carts', 'total_price')])
+        self.assertIn('ix_carts_user_id', indexes)
+
+    def test_hot_queries_use_indexes(self):
+        """
+        Checks that the hot lookups are index searches, never full table scans
+        Notes:
+            - Arrange: Build the cart lines, cart aggregates and by code or owner lookups
+            - Act: EXPLAIN QUERY PLAN every one of them
+            - Assert: Every table is searched through an index or its primary key
+        Returns: None
+
+        """
+        statements = [
+            RuleEngine._lines_statement([1, 2]),
+            RuleEngine._aggregates_statement([1, 2]),
+            select(CartItem.quantity).where(CartItem.items_id == 1),
+            select(Item.id).where(Item.code == 'GR1'),
+            select(Rule.id).where(Rule.item_code == 'GR1'),
+            select(Cart.id).where(Cart.user_id == 1),
+        ]
+
+        with get_engine().connect() as connection:
+            for statement in statements:
+                sql = str(statement.compile(get_engine(), compile_kwargs={'literal_binds': True}))
+                plan = [row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}')]
+
+                steps = [step for step in plan if not step.startswith('USE TEMP B-TREE')]
+                self.assertTrue(steps, sql)
+                for step in steps:
+                    self.assertRegex(step, r'^SEARCH \w+ USING (COVERING )?(INDEX|INTEGER PRIMARY KEY)', sql)
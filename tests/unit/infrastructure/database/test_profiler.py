@@ -0,0 +1,136 @@
+""" Unit Test module for profiler module """
+from sqlalchemy.exc import OperationalError
+
+from src.main.application.item_service import ItemService
+from src.main.application.prefill_service import Prefill
+from src.main.infrastructure.database.profiler import StatementProfiler, fingerprint
+from src.main.infrastructure.database.setup import get_async_engine, get_engine
+from src.main.infrastructure.logging.logger import DB_LOGGER
+from tests.base_test import BaseTest
+
+
+class TestFingerprint(BaseTest):
+    """ Unit Test class for fingerprint function """
+
+    def test_fingerprint_normalises_literals_and_lists(self):
+        """
+        Checks that executions of the same query share a fingerprint
+        Notes:
+            - Arrange: Two statements differing in literals, parameter lists and whitespace
+            - Act: Fingerprint them
+            - Assert: Both fingerprints are equal and normalised
+        Returns: None
+
+        """
+        first = fingerprint("SELECT * FROM items WHERE code = 'GR1' AND id IN (?, ?) LIMIT 10")
+        second = fingerprint("SELECT *  FROM items\n WHERE code = 'CF1' AND id IN (?, ?, ?) LIMIT 5")
+
+        self.assertEqual('SELECT * FROM items WHERE code = ? AND id IN (?...) LIMIT ?', first)
+        self.assertEqual(first, second)
+
+
+class TestStatementProfiler(BaseTest):
+    """ Unit Test class for StatementProfiler class """
+
+    def setUp(self) -> None:
+        """ Overridden method. Attaches a profiler, logging every statement as slow, to both engines """
+        super().setUp()
+        self.profiler = StatementProfiler(slow_query_seconds=0.0, n_plus_one_calls=2)
+        self.profiler.attach(get_engine())
+        self.profiler.attach(get_async_engine().sync_engine)
+
+    def tearDown(self) -> None:
+        """ Overridden method. Detaches the profiler """
+        self.profiler.detach()
+        super().tearDown()
+
+    async def test_slow_queries_are_logged_with_their_origin(self):
+        """
+        Checks that slow statements are logged along the service method that issued them
+        Notes:
+            - Arrange: Prefill items, forget their statements
+            - Act: Read items through the async engine
+            - Assert: Statement is logged as slow from ItemService.read_items and counted
+        Returns: None
+
+        """
+        await Prefill.items()
+        self.profiler.clear()
+
+        with self.assertLogs(DB_LOGGER, 'WARNING') as cm:
+            await ItemService().read_items(limit=2)
+
+        self.assertIn('ItemService.read_items: SELECT items.id', cm.output[0])
+        self.assertEqual(1, self.profiler.top(1, 'calls')[0].calls)
+
+    async def test_request_scope_reports_repeated_statements(self):
+        """
+        Checks that statements repeated within a request are counted and logged as N+1 suspects
+        Notes:
+            - Arrange: Prefill items
+            - Act: Read an item twice within a request scope
+            - Assert: Both executions are counted for the request, and reported
+        Returns: None
+
+        """
+        await Prefill.items()
+
+        with self.assertLogs(DB_LOGGER, 'WARNING') as cm:
+            with self.profiler.request_scope('GET /items/') as calls:
+                await ItemService().read_items(limit=2)
+                await ItemService().read_items(limit=2)
+
+        top = self.profiler.top(1, 'max_calls_per_request')[0]
+        self.assertEqual([2], list(calls.values()))
+        self.assertEqual(2, top.max_calls_per_request)
+        self.assertTrue(any('Likely N+1: 2 executions within GET /items/' in line for line in cm.output))
+
+    def test_failed_statements_are_dropped(self):
+        """
+        Checks that statements raising an error leave no start time behind
+        Notes:
+            - Arrange: N/A
+            - Act: Run a statement on a missing table, then a valid one, on the same connection
+            - Assert: Only the valid statement is recorded, no start time is left on the connection
+        Returns: None
+
+        """
+        with get_engine().connect() as connection:
+            with self.assertRaises(OperationalError):
+                connection.exec_driver_sql('SELECT * FROM missing_table')
+            connection.exec_driver_sql('SELECT 1')
+            started = connection.info['profiler_started']
+
+        self.assertEqual({}, started)
+        self.assertEqual(['SELECT ?'], [stats.fingerprint for stats in self.profiler.top()])
+
+    def test_top_when_order_unknown_raises_error(self):
+        """
+        Checks that statements can only be sorted by their stats
+        Notes:
+            - Arrange: N/A
+            - Act: Get the top statements by an unknown attribute
+            - Assert: RuntimeError is raised
+        Returns: None
+
+        """
+        with self.assertRaises(RuntimeError):
+            self.profiler.top(order_by='fingerprint')
+
+    def test_detach(self):
+        """
+        Checks that a detached profiler records nothing
+        Notes:
+            - Arrange: Detach the profiler
+            - Act: Run a statement
+            - Assert: Profiler is disabled and empty
+        Returns: None
+
+        """
+        self.profiler.detach()
+
+        with get_engine().connect() as connection:
+            connection.exec_driver_sql('SELECT 1')
+
+        self.assertFalse(self.profiler.enabled)
+        self.assertEqual([], self.profiler.top())
@@ -1,7 +1,14 @@
 """ Unit Test module for database.setup module """
+import os
+import tempfile
+from unittest.mock import MagicMock
+
 from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
-from src.main.infrastructure.database.setup import get_engine
+from src.main.infrastructure.database.config import DatabaseSettings
+from src.main.infrastructure.database.setup import (build_async_engine, build_engine, build_session, get_engine,
+                                                     session_scope)
 from tests.base_test import BaseTest
 
 
@@ -19,3 +26,80 @@ class TestSetUp(BaseTest):
 
         """
         self.assertTrue(isinstance(get_engine(), Engine))
+
+    def test_build_session_outside_scope_returns_new_sessions(self):
+        """
+        Checks that every session built out of a session scope is a brand new one
+        Notes:
+            - Arrange: N/A
+            - Act: Build two sessions
+            - Asserts: Sessions are different
+        Returns: None
+
+        """
+        self.assertIsNot(build_session(), build_session())
+
+    def test_session_scope_shares_and_closes_session(self):
+        """
+        Checks that sessions built within a scope are shared and closed when the scope ends
+        Notes:
+            - Arrange: Open a session scope
+            - Act: Build two sessions, exit the scope
+            - Asserts: Same session was built twice and it was closed, a new scope gets a new session
+        Returns: None
+
+        """
+        with session_scope():
+            session = build_session()
+            self.assertIs(session, build_session())
+            session.close = MagicMock()
+
+        self.assertTrue(session.close.called)
+        with session_scope():
+            self.assertIsNot(session, build_session())
+
+    def test_build_engine_file_sqlite(self):
+        """
+        Checks that file SQLite engines are pooled and tuned for concurrency
+        Notes:
+            - Arrange: Settings for a temporary file database
+            - Act: Build the engine and open a connection
+            - Asserts: Engine uses a QueuePool and connections run in WAL mode with synchronous=NORMAL
+        Returns: None
+
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            settings = DatabaseSettings(url=f'sqlite:///{os.path.join(directory, "test.db")}', echo=False, pool_size=2)
+            engine = build_engine(settings)
+
+            with engine.connect() as connection:
+                journal_mode = connection.exec_driver_sql('PRAGMA journal_mode').scalar()
+                synchronous = connection.exec_driver_sql('PRAGMA synchronous').scalar()
+            engine.dispose()
+
+        self.assertIsInstance(engine.pool, QueuePool)
+        self.assertEqual(2, engine.pool.size())
+        self.assertEqual('wal', journal_mode)
+        self.assertEqual(1, synchronous)
+
+    async def test_build_async_engine_file_sqlite(self):
+        """
+        Checks that file SQLite async engines are pooled and tuned as their sync counterparts
+        Notes:
+            - Arrange: Settings for a temporary file database
+            - Act: Build the async engine and open a connection
+            - Asserts: Engine uses an asyncio QueuePool and connections run in WAL mode
+        Returns: None
+
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            settings = DatabaseSettings(url=f'sqlite:///{os.path.join(directory, "test.db")}', echo=False, pool_size=2)
+            engine = build_async_engine(settings)
+
+            async with engine.connect() as connection:
+                journal_mode = (await connection.exec_driver_sql('PRAGMA journal_mode')).scalar()
+            await engine.dispose()
+
+        self.assertIsInstance(engine.pool, AsyncAdaptedQueuePool)
+        self.assertEqual(2, engine.pool.size())
+        self.assertEqual('wal', journal_mode)
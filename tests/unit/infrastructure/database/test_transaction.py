@@ -1,7 +1,11 @@
 """ Unit Test module for transaction module """
-from unittest.mock import MagicMock, Mock
+from unittest.mock import AsyncMock, MagicMock, Mock
 
-from src.main.infrastructure.database.transaction import Transaction
+from sqlalchemy import text
+
+from src.main.infrastructure.database.transaction import (
+    TRANSACTION_QUERIES, TRANSACTION_STAGE_SECONDS, AsyncTransaction, Transaction
+)
 from tests.base_test import BaseTest
 
 
@@ -45,3 +49,118 @@ class TestTransaction(BaseTest):
             setattr(t.session, 'rollback', mock_rollback)
 
         self.assertTrue(mock_rollback.called)
+
+    def test_transaction_closes_session(self):
+        """
+        Checks transaction always closes its session, whether it is committed or rolled back
+        Notes:
+            - Arrange: N/A
+            - Act: Run a successful and a failing transaction
+            - Asserts: Both sessions were closed
+        Returns: None
+
+        """
+        with Transaction() as t:
+            mock_close_on_commit = MagicMock()
+            setattr(t.session, 'close', mock_close_on_commit)
+
+        with self.assertRaises(RuntimeError):
+            with Transaction() as t:
+                mock_close_on_rollback = MagicMock()
+                setattr(t.session, 'close', mock_close_on_rollback)
+                raise RuntimeError('Testing close')
+
+        self.assertTrue(mock_close_on_commit.called)
+        self.assertTrue(mock_close_on_rollback.called)
+
+
+class TestAsyncTransaction(BaseTest):
+    """ Unit Test class for AsyncTransaction class """
+
+    async def test_async_transaction_commits(self):
+        """
+        Checks async transaction actually finishes committing session
+        Notes:
+            - Arrange: N/A
+            - Act: N/A
+            - Asserts: session is committed and not rolled back when everything goes fine
+        Returns: None
+
+        """
+        async with AsyncTransaction() as t:
+            mock_rollback = AsyncMock()
+            mock_commit = AsyncMock()
+            setattr(t.session, 'commit', mock_commit)
+            setattr(t.session, 'rollback', mock_rollback)
+
+        self.assertTrue(mock_commit.awaited)
+        self.assertFalse(mock_rollback.called)
+
+    async def test_async_transaction_rollsback(self):
+        """
+        Checks async transaction rolls back if any Exception is raised while committing
+        Notes:
+            - Arrange: N/A
+            - Act: N/A
+            - Asserts: session is rolled back when an exception occurs
+        Returns: None
+
+        """
+        async with AsyncTransaction() as t:
+            mock_rollback = AsyncMock()
+            mock_commit = AsyncMock(side_effect=Exception('Testing rollback'))
+            setattr(t.session, 'commit', mock_commit)
+            setattr(t.session, 'rollback', mock_rollback)
+
+        self.assertTrue(mock_rollback.awaited)
+
+    async def test_async_transaction_closes_session(self):
+        """
+        Checks async transaction always closes its session, whether it is committed or rolled back
+        Notes:
+            - Arrange: N/A
+            - Act: Run a successful and a failing async transaction
+            - Asserts: Both sessions were closed
+        Returns: None
+
+        """
+        async with AsyncTransaction() as t:
+            mock_close_on_commit = AsyncMock()
+            setattr(t.session, 'close', mock_close_on_commit)
+
+        with self.assertRaises(RuntimeError):
+            async with AsyncTransaction() as t:
+                mock_close_on_rollback = AsyncMock()
+                setattr(t.session, 'close', mock_close_on_rollback)
+                raise RuntimeError('Testing close')
+
+        self.assertTrue(mock_close_on_commit.awaited)
+        self.assertTrue(mock_close_on_rollback.awaited)
+
+    async def test_transactions_record_metrics(self):
+        """
+        Checks transactions record their open and commit latencies and how many statements they executed
+        Notes:
+            - Arrange: Clear the transaction metrics
+            - Act: Run a sync transaction of two statements and an async one nesting a sync one
+            - Asserts: Stages are observed once per transaction, statements are counted by the innermost transaction
+        Returns: None
+
+        """
+        TRANSACTION_STAGE_SECONDS.clear()
+        TRANSACTION_QUERIES.clear()
+
+        with Transaction() as t:
+            t.session.execute(text('SELECT 1'))
+            t.session.execute(text('SELECT 2'))
+        async with AsyncTransaction() as t:
+            await t.session.execute(text('SELECT 1'))
+            with Transaction() as inner:
+                inner.session.execute(text('SELECT 2'))
+
+        self.assertEqual(2, TRANSACTION_STAGE_SECONDS.count('sync', 'open'))
+        self.assertEqual(2, TRANSACTION_STAGE_SECONDS.count('sync', 'commit'))
+        self.assertEqual(1, TRANSACTION_STAGE_SECONDS.count('async', 'commit'))
+        self.assertIn('db_transaction_queries_bucket{kind="sync",le="2.0"} 2', list(TRANSACTION_QUERIES.render()))
+        self.assertIn('db_transaction_queries_sum{kind="sync"} 3.0', list(TRANSACTION_QUERIES.render()))
+        self.assertIn('db_transaction_queries_sum{kind="async"} 1.0', list(TRANSACTION_QUERIES.render()))
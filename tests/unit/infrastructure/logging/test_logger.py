@@ -0,0 +1,89 @@
+""" Unit Test module for logging.logger module """
+import io
+import logging
+import unittest
+from contextlib import redirect_stderr
+
+from src.main.infrastructure.logging.logger import (
+    DB_LOGGER, LOGGER, RULES_LOGGER, SQL_LOGGER, LoggingSettings, configure_logging, shutdown_logging
+)
+
+
+class TestLoggingSettings(unittest.TestCase):
+    """ Unit Test class for LoggingSettings class """
+
+    def test_from_env_defaults(self):
+        """
+        Checks that missing environment variables fall back to INFO, and WARNING for SQL statements
+        Notes:
+            - Arrange: N/A
+            - Act: Build settings from an empty environment
+            - Assert: Default levels are set
+        Returns: None
+
+        """
+        settings = LoggingSettings.from_env({})
+
+        self.assertEqual('INFO', settings.level)
+        self.assertEqual({'sql': 'WARNING'}, settings.levels)
+
+    def test_from_env(self):
+        """
+        Checks that the application and subsystem levels are parsed
+        Notes:
+            - Arrange: Build an environment tuning the db and sql subsystems
+            - Act: Build settings from it
+            - Assert: Levels are parsed, unknown subsystems are ignored
+        Returns: None
+
+        """
+        settings = LoggingSettings.from_env({
+            'LOG_LEVEL': 'warning', 'LOG_LEVEL_DB': 'debug', 'LOG_LEVEL_SQL': 'INFO', 'LOG_LEVEL_OTHER': 'DEBUG',
+        })
+
+        self.assertEqual('WARNING', settings.level)
+        self.assertEqual({'db': 'DEBUG', 'sql': 'INFO'}, settings.levels)
+
+
+class TestConfigureLogging(unittest.TestCase):
+    """ Unit Test class for configure_logging function """
+
+    def tearDown(self) -> None:
+        """ Restores the environment configuration """
+        configure_logging()
+
+    def test_configure_logging_tunes_subsystems(self):
+        """
+        Checks that every subsystem logger can be tuned on its own
+        Notes:
+            - Arrange: Settings at WARNING with the db subsystem at DEBUG
+            - Act: Configure logging
+            - Assert: Only db debug records are enabled
+        Returns: None
+
+        """
+        configure_logging(LoggingSettings(level='WARNING', levels={'db': 'DEBUG'}))
+
+        self.assertTrue(DB_LOGGER.isEnabledFor(logging.DEBUG))
+        self.assertFalse(RULES_LOGGER.isEnabledFor(logging.INFO))
+        self.assertFalse(LOGGER.isEnabledFor(logging.INFO))
+        self.assertFalse(SQL_LOGGER.isEnabledFor(logging.INFO))
+
+    def test_configure_logging_writes_through_queue(self):
+        """
+        Checks that records are formatted and written by the listener
+        Notes:
+            - Arrange: Configure logging with stderr captured
+            - Act: Log a lazily formatted message and shut logging down (flushing it)
+            - Assert: Formatted message was written
+        Returns: None
+
+        """
+        stderr = io.StringIO()
+        with redirect_stderr(stderr):
+            configure_logging(LoggingSettings(level='INFO'))
+        RULES_LOGGER.info('Priced %d carts', 3)
+        shutdown_logging()
+
+        self.assertIn('amenitiz.rules', stderr.getvalue())
+        self.assertIn('> Priced 3 carts', stderr.getvalue())
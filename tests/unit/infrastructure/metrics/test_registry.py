@@ -0,0 +1,87 @@
+""" Unit Test module for metrics.registry module """
+import unittest
+
+from src.main.infrastructure.metrics.registry import Histogram, MetricsRegistry
+
+
+class TestHistogram(unittest.TestCase):
+    """ Unit Test class for Histogram class """
+
+    def test_render(self):
+        """
+        Checks that observations are rendered as cumulative buckets in the Prometheus text format
+        Notes:
+            - Arrange: Histogram with two buckets
+            - Act: Observe a value per bucket, plus one over every bucket
+            - Assert: Buckets are cumulative, end with +Inf and series carry their labels
+        Returns: None
+
+        """
+        histogram = Histogram('latency_seconds', 'Latency', ('route',), buckets=(0.1, 1.0))
+
+        histogram.observe(0.05, '/a')
+        histogram.observe(0.5, '/a')
+        histogram.observe(2.0, '/a')
+
+        self.assertEqual([
+            '# HELP latency_seconds Latency',
+            '# TYPE latency_seconds histogram',
+            'latency_seconds_bucket{route="/a",le="0.1"} 1',
+            'latency_seconds_bucket{route="/a",le="1.0"} 2',
+            'latency_seconds_bucket{route="/a",le="+Inf"} 3',
+            'latency_seconds_sum{route="/a"} 2.55',
+            'latency_seconds_count{route="/a"} 3',
+        ], list(histogram.render()))
+
+    def test_render_escapes_label_values(self):
+        """
+        Checks that label values are escaped
+        Notes:
+            - Arrange: Histogram with a label
+            - Act: Observe a value whose label holds quotes
+            - Assert: Quotes are escaped
+        Returns: None
+
+        """
+        histogram = Histogram('latency_seconds', 'Latency', ('route',), buckets=(1.0,))
+
+        histogram.observe(0.5, '/"a"')
+
+        self.assertIn('latency_seconds_count{route="/\\"a\\""} 1', list(histogram.render()))
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    """ Unit Test class for MetricsRegistry class """
+
+    def test_histogram_when_already_registered_raises_error(self):
+        """
+        Checks that metric names are unique
+        Notes:
+            - Arrange: Register a histogram
+            - Act: Register another one with the same name
+            - Assert: RuntimeError is raised
+        Returns: None
+
+        """
+        registry = MetricsRegistry()
+        registry.histogram('latency_seconds', 'Latency')
+
+        with self.assertRaises(RuntimeError):
+            registry.histogram('latency_seconds', 'Latency')
+
+    def test_clear(self):
+        """
+        Checks that clearing the registry drops every observation but keeps the metrics
+        Notes:
+            - Arrange: Register a histogram and observe a value
+            - Act: Clear the registry
+            - Assert: Only the histogram header is rendered
+        Returns: None
+
+        """
+        registry = MetricsRegistry()
+        registry.histogram('latency_seconds', 'Latency').observe(0.5)
+
+        registry.clear()
+
+        self.assertEqual('# HELP latency_seconds Latency\n# TYPE latency_seconds histogram\n', registry.render())
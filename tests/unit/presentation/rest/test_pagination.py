@@ -0,0 +1,50 @@
+""" Unit test module for presentation.rest.pagination module """
+import json
+
+from src.main.application.item_service import ItemService
+from src.main.application.prefill_service import Prefill
+from src.main.presentation.rest.pagination import NDJSON_MEDIA_TYPE, ndjson_response, rows_response
+from tests.base_test import BaseTest
+
+
+class TestPagination(BaseTest):
+    """ Unit Test class for REST pagination utilities """
+
+    async def test_ndjson_response(self):
+        """
+        Checks that query rows are streamed as one JSON object per line
+        Notes:
+            - Arrange: Prefill items
+            - Act: Stream every item
+            - Assert: Every item is streamed, in order, as a JSON line
+        Returns: None
+
+        """
+        await Prefill.items()
+
+        response = ndjson_response(ItemService().stream_items())
+        lines = [line async for line in response.body_iterator]
+
+        self.assertEqual(NDJSON_MEDIA_TYPE, response.media_type)
+        self.assertEqual(['GR1', 'SR1', 'CF1'], [json.loads(line)['code'] for line in lines])
+        self.assertTrue(all(line.endswith(b'\n') for line in lines))
+
+    async def test_rows_response(self):
+        """
+        Checks that plain rows are serialised as a JSON Array of objects keyed by column name
+        Notes:
+            - Arrange: Prefill items
+            - Act: Serialise the first two item rows
+            - Assert: Body is the JSON Array of both items
+        Returns: None
+
+        """
+        await Prefill.items()
+
+        response = rows_response(await ItemService().read_item_rows(limit=2))
+
+        self.assertEqual('application/json', response.media_type)
+        self.assertEqual([
+            {'id': 1, 'code': 'GR1', 'name': 'Green Tea', 'price': 311},
+            {'id': 2, 'code': 'SR1', 'name': 'Strawberries', 'price': 500},
+        ], json.loads(response.body))
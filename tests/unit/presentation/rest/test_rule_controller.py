@@ -0,0 +1,44 @@
+""" Unit test module for presentation.rest.controllers.rule_controller module """
+from typing import get_args
+
+from src.main.application.rules_service import PRICING_MODES
+from src.main.presentation.rest.controllers.rule_controller import PricingMode
+from tests.unit.presentation.base_rest_test import BaseRestTest
+
+
+class TestRuleController(BaseRestTest):
+    """ Unit Test class for the rules REST controller """
+
+    def test_unknown_pricing_mode_is_rejected(self):
+        """
+        Checks that pricing endpoints reject unknown modes as invalid requests
+        Notes:
+            - Arrange: N/A
+            - Act: Apply, apply in batch and simulate rules with an unknown mode
+            - Assert: Every request is answered with 422, and the accepted modes are the engine ones
+        Returns: None
+
+        """
+        responses = [
+            self.rest_client.post('/rules/apply?cart_id=1&mode=bogus'),
+            self.rest_client.post('/rules/apply_batch?mode=bogus', json=[1]),
+            self.rest_client.post('/rules/simulate?mode=bogus', json=[]),
+        ]
+
+        self.assertEqual([422, 422, 422], [response.status_code for response in responses])
+        self.assertEqual(PRICING_MODES, get_args(PricingMode))
+
+    def test_empty_chunk_size_is_rejected(self):
+        """
+        Checks that batch pricing rejects chunk sizes below 1 as invalid requests
+        Notes:
+            - Arrange: N/A
+            - Act: Apply rules in batch in chunks of 0 and -1 carts
+            - Assert: Every request is answered with 422
+        Returns: None
+
+        """
+        responses = [self.rest_client.post(f'/rules/apply_batch?chunk_size={chunk_size}', json=[1])
+                     for chunk_size in (0, -1)]
+
+        self.assertEqual([422, 422], [response.status_code for response in responses])
@@ -1,4 +1,5 @@
 """ Unit test module for presentation.rest.setup module"""
+from src.main.infrastructure.logging.logger import REST_LOGGER
 from tests.unit.presentation.base_rest_test import BaseRestTest
 
 
@@ -14,3 +15,39 @@ class Test(BaseRestTest):
         response = self.rest_client.get('/')
         self.assertEqual(200, response.status_code)
         self.assertEqual({'message': 'Welcome!'}, response.json())
+
+    def test_metrics(self):
+        """
+        Checks that request latencies are exposed by route template in the Prometheus text format
+        Notes:
+            - Arrange: Serve the root route
+            - Act: Scrape the metrics
+            - Assert: Root route latency is exposed, along the other histograms
+        Returns: None
+
+        """
+        self.rest_client.get('/')
+
+        response = self.rest_client.get('/metrics')
+
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.headers['content-type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="/",status="200"}', response.text)
+        self.assertIn('# TYPE db_transaction_stage_seconds histogram', response.text)
+        self.assertIn('# TYPE rule_engine_apply_stage_seconds histogram', response.text)
+
+    def test_requests_are_logged(self):
+        """
+        Checks that served requests are logged by the REST logger
+        Notes:
+            - Arrange: N/A
+            - Act: Serve the root route and an unknown one
+            - Assert: Both requests are logged at DEBUG level, with their method, path and status
+        Returns: None
+
+        """
+        with self.assertLogs(REST_LOGGER, 'DEBUG') as cm:
+            self.rest_client.get('/')
+            self.rest_client.get('/unknown')
+
+        self.assertEqual(['GET / 200', 'GET /unknown 404'], [record.getMessage().split(' (')[0] for record in cm.records])
@@ -0,0 +1,32 @@
+""" Unit test module for presentation.rest.controllers.user_controller module """
+import json
+
+from src.main.application.cart_service import CartService
+from src.main.application.prefill_service import Prefill
+from src.main.application.user_service import UserService
+from src.main.presentation.rest.controllers.user_controller import _serialize
+from src.main.presentation.rest.pagination import ndjson_response
+from tests.base_test import BaseTest
+
+
+class TestUserController(BaseTest):
+    """ Unit Test class for the users REST controller """
+
+    async def test_stream_users_without_cart(self):
+        """
+        Checks that users holding no cart are streamed too
+        Notes:
+            - Arrange: Prefill two users, add a cart to the first one only
+            - Act: Stream every user
+            - Assert: Both users are streamed, the second one without cart
+        Returns: None
+
+        """
+        await Prefill.users(2)
+        await CartService().create_cart(1)
+
+        response = ndjson_response(UserService().stream_users(), _serialize)
+        users = [json.loads(line) async for line in response.body_iterator]
+
+        self.assertEqual([1, 2], [user['id'] for user in users])
+        self.assertEqual([1, None], [user['cart'] and user['cart']['user_id'] for user in users])
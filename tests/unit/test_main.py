@@ -0,0 +1,40 @@
+""" Unit Test module for main module """
+import contextlib
+import io
+import unittest
+
+from src.main.main import parse_args
+
+
+class TestParseArgs(unittest.TestCase):
+    """ Unit Test class for command line parsing """
+
+    def test_parse_counts(self):
+        """
+        Checks that counts accept scientific notation
+        Notes:
+            - Arrange: N/A
+            - Act: Parse prefill and reprice command lines
+            - Assert: Counts are parsed as integers
+        Returns: None
+
+        """
+        prefill = parse_args(['prefill', '--users', '1e3', '--chunk-size', '500'])
+        reprice = parse_args(['reprice', '--workers', '2', '--shard-size', '1e4'])
+
+        self.assertEqual((1000, 500), (prefill.users, prefill.chunk_size))
+        self.assertEqual((2, 10000), (reprice.workers, reprice.shard_size))
+
+    def test_empty_workers_and_chunks_are_rejected(self):
+        """
+        Checks that worker, shard and chunk counts below 1 are rejected at parsing
+        Notes:
+            - Arrange: N/A
+            - Act: Parse command lines with 0 workers, 0 shard size and 0 chunk size
+            - Assert: Parsing exits with a usage error
+        Returns: None
+
+        """
+        for argv in (['reprice', '--workers', '0'], ['reprice', '--shard-size', '0'], ['prefill', '--chunk-size', '0']):
+            with self.assertRaises(SystemExit), contextlib.redirect_stderr(io.StringIO()):
+                parse_args(argv)